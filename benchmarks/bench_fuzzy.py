@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for translation memory near-match lookups: times building
+the n-gram index and looking up edited and unrelated strings.
+
+Usage:
+    python benchmarks/bench_fuzzy.py [--entries N] [--queries N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add src to path so we can import translation_memory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from translation_memory import NGramIndex
+
+
+def make_corpus(entries: int, rng: random.Random):
+    """Build UI-like sentences from a Zipf-distributed vocabulary"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [''.join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(8000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def sentence():
+        return ' '.join(rng.choices(vocabulary, weights, k=rng.randint(1, 14))).capitalize()
+
+    corpus = [sentence() for _ in range(entries)]
+    return corpus, vocabulary, weights, sentence
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000, help="Translations in the memory")
+    parser.add_argument("--queries", type=int, default=2000, help="Lookups to time")
+    parser.add_argument("--threshold", type=float, default=0.7, help="Minimum similarity")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    corpus, vocabulary, weights, sentence = make_corpus(args.entries, rng)
+
+    index = NGramIndex()
+    started = time.perf_counter()
+    for msgid in corpus:
+        index.add(msgid, msgid.upper())
+    build = time.perf_counter() - started
+    print(f"{len(index)} entries indexed in {build:.2f}s ({build / len(index) * 1e6:.1f} us/entry)")
+
+    # Half are existing strings with one word replaced, half are new sentences
+    queries = []
+    for _ in range(args.queries // 2):
+        words = rng.choice(corpus).split()
+        words[rng.randrange(len(words))] = rng.choices(vocabulary, weights)[0]
+        queries.append(' '.join(words))
+    queries.extend(sentence() for _ in range(args.queries - len(queries)))
+
+    started = time.perf_counter()
+    found = sum(1 for query in queries if index.search(query, args.threshold))
+    seconds = time.perf_counter() - started
+    print(f"{len(queries)} lookups, {found} matched: {seconds / len(queries) * 1e3:.3f} ms/lookup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
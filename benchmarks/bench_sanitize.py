@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for PO sanitizing: checks the fast quote-escaping path
+against the original character-by-character implementation.
+
+Usage:
+    python benchmarks/bench_sanitize.py [--repeat N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+# Add src to path so we can import po_translator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from po_translator import _CONTINUATION_LINE, _KEYWORD_LINE, _escape_inner_quotes
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+
+
+def escape_inner_quotes_reference(content: str) -> str:
+    """The original character-walking implementation, kept as the parity baseline"""
+    result = []
+    i = 0
+    while i < len(content):
+        if content[i] == '\\':
+            result.append(content[i])
+            if i + 1 < len(content):
+                result.append(content[i + 1])
+                i += 2
+            else:
+                i += 1
+        elif content[i] == '"':
+            result.append('\\"')
+            i += 1
+        else:
+            result.append(content[i])
+            i += 1
+    return ''.join(result)
+
+
+def string_values(paths):
+    """Extract the string values sanitizing works on from PO files"""
+    values = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                match = _KEYWORD_LINE.match(line) or _CONTINUATION_LINE.match(line)
+                if match:
+                    values.append(match.groups()[-1])
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000, help="Times the value set is processed")
+    args = parser.parse_args()
+
+    values = string_values(sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.po'))))
+    mismatches = [v for v in values if _escape_inner_quotes(v) != escape_inner_quotes_reference(v)]
+    print(f"{len(values)} fixture values, {len(mismatches)} mismatches")
+    if mismatches:
+        for value in mismatches:
+            print(f"  MISMATCH: {value!r}")
+        return 1
+
+    for name, func in (("reference", escape_inner_quotes_reference), ("fast path", _escape_inner_quotes)):
+        seconds = timeit.timeit(lambda: [func(v) for v in values], number=args.repeat)
+        per_value = seconds / (args.repeat * len(values)) * 1e6
+        print(f"{name:>10}: {seconds:.3f}s total, {per_value:.2f} us/value")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+End-to-end benchmark: translates synthetic catalogs against the local mock
+server and reports throughput, API calls, bytes and peak memory for
+sanitizing, parsing and translate_po_file.
+
+Usage:
+    python benchmarks/bench_translate.py [--sizes 1000,10000] [--batch-sizes 20,50]
+        [--concurrency 1,4] [--latency S] [--error-rate F] [--rate-limit-rate F]
+        [--truncate-rate F] [--protocol numbered|json] [--streaming] [--stream-window N]
+
+Peak memory is that of the whole process; compare --stream-window runs in
+separate processes.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+# Add src to path so we can import po_translator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from po_translator import POTranslator, load_po_file, sanitize_po_file
+from mock_server import MockLLMServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, in MB (None where unknown)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_catalog(path: str, entries: int, rng: random.Random):
+    """Write a PO file with UI-like messages, some repeated, plural or with unescaped quotes"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [''.join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('msgid ""\nmsgstr ""\n"Content-Type: text/plain; charset=UTF-8\\n"\n\n')
+        for i in range(entries):
+            words = rng.choices(vocabulary, weights, k=rng.randint(1, 14))
+            if i % 50 == 7:
+                words.insert(1, '"quoted"')  # Left unescaped, for the sanitizer
+            message = ' '.join(words).capitalize()
+            f.write(f'#: src/file{i % 97}.c:{i}\n')
+            if i % 25 == 3:
+                f.write(f'msgid "{message} (%d item)"\nmsgid_plural "{message} (%d items)"\n'
+                        f'msgstr[0] ""\nmsgstr[1] ""\n\n')
+            else:
+                f.write(f'msgctxt "ctx{i}"\n' if i % 10 == 0 else '')
+                f.write(f'msgid "{message}"\nmsgstr ""\n\n')
+
+
+def timed(func, *args, **kwargs) -> tuple:
+    """Call func and return (result, seconds)"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated catalog sizes (up to 200000)")
+    parser.add_argument("--batch-sizes", default="20", help="Comma-separated batch sizes to compare")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels to compare")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock seconds per response")
+    parser.add_argument("--latency-per-item", type=float, default=0.0, help="Mock seconds per text")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Fraction of truncated responses")
+    parser.add_argument("--protocol", choices=("numbered", "json"), default="numbered")
+    parser.add_argument("--streaming", action="store_true", help="Stream responses")
+    parser.add_argument("--stream-window", type=int, default=0,
+                        help="Read and write files in windows of N entries (0 = load whole files)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    workdir = tempfile.mkdtemp(prefix="po-bench-")
+
+    try:
+        with MockLLMServer(latency=args.latency, latency_per_item=args.latency_per_item,
+                           error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                           truncate_rate=args.truncate_rate) as server:
+            print(f"{'entries':>8} {'batch':>5} {'conc':>4} {'sanitize s':>10} {'parse s':>8} "
+                  f"{'start s':>7} {'translate s':>11} {'entries/s':>9} {'calls':>6} {'429':>4} {'500':>4} "
+                  f"{'MB sent':>8} {'MB recv':>8} {'peak MB':>8}")
+            for entries in sizes:
+                input_path = os.path.join(workdir, f"bench-{entries}.po")
+                write_catalog(input_path, entries, random.Random(entries))
+
+                sanitized_path = input_path + ".sanitized"
+                _, sanitize_seconds = timed(sanitize_po_file, input_path, sanitized_path)
+                _, parse_seconds = timed(load_po_file, input_path)
+                os.unlink(sanitized_path)
+
+                for batch_size in batch_sizes:
+                    for concurrency in concurrency_levels:
+                        translator = POTranslator(api_provider="custom", api_key="fake", api_base=server.url)
+                        translator.set_model("custom-model")
+                        translator.set_batch_size(batch_size)
+                        translator.set_concurrency(concurrency)
+                        translator.set_protocol(args.protocol)
+                        translator.set_streaming(args.streaming)
+                        translator.set_catalog_streaming(args.stream_window > 0, args.stream_window or 1)
+                        translator.set_checkpointing(False)
+                        server.reset_stats()
+
+                        # Time until the first batch can be sent
+                        started = []
+
+                        def progress(done, total, message, clock=time.perf_counter()):
+                            if not started and message.endswith("Starting batch translation..."):
+                                started.append(time.perf_counter() - clock)
+
+                        output_path = os.path.join(workdir, f"bench-{entries}-{batch_size}-{concurrency}.po")
+                        stats, seconds = timed(
+                            translator.translate_po_file, input_path, output_path, "en", "zh", progress,
+                            error_callback=lambda error_msg, batch_num, total_batches: 'retry'
+                        )
+                        translator.close()
+                        os.unlink(output_path)
+
+                        requests = server.stats
+                        peak = peak_rss_mb()
+                        # Nothing sent (e.g. everything already translated), or no resource module
+                        start = f"{started[0]:.2f}" if started else "n/a"
+                        peak = "n/a" if peak is None else f"{peak:.1f}"
+                        print(f"{entries:>8} {batch_size:>5} {concurrency:>4} {sanitize_seconds:>10.2f} "
+                              f"{parse_seconds:>8.2f} {start:>7} {seconds:>11.2f} {stats['total'] / seconds:>9.0f} "
+                              f"{requests['requests']:>6} {requests['rate_limited']:>4} {requests['errors']:>4} "
+                              f"{requests['bytes_received'] / 1e6:>8.2f} {requests['bytes_sent'] / 1e6:>8.2f} "
+                              f"{peak:>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API, for
+benchmarks. It "translates" by prefixing every text with the target
+language and can add latency, errors, 429s and truncated responses.
+
+Usage:
+    with MockLLMServer(latency=0.2, rate_limit_rate=0.05) as server:
+        translator = POTranslator(api_provider="custom", api_key="fake", api_base=server.url)
+        ...
+        print(server.stats)
+
+    python benchmarks/mock_server.py [--port N] [--latency S] ...  # Serve until interrupted
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_NUMBERED_LINE = re.compile(r'^(\d+)\.\s*(.*)$')
+_TARGET_LANG = re.compile(r' to (\S+?)\.?\n')
+_NPLURALS = re.compile(r'exactly (\d+) strings')
+
+
+def parse_prompt(prompt: str) -> tuple:
+    """
+    Pick the target language, protocol and texts out of a translation prompt
+
+    Returns:
+        Tuple of (target language, plural form count, protocol, list of
+        (id, text)), where a text may be a list of plural forms
+    """
+    match = _TARGET_LANG.search(prompt)
+    target_lang = match.group(1) if match else "xx"
+    match = _NPLURALS.search(prompt)
+    nplurals = int(match.group(1)) if match else 2
+
+    if "Texts to translate:" in prompt:
+        body = prompt.split("Texts to translate:", 1)[1].rsplit("Translations:", 1)[0]
+        items = []
+        for line in body.strip().split('\n'):
+            match = _NUMBERED_LINE.match(line)
+            if match:
+                items.append((match.group(1), match.group(2)))
+            elif items:
+                items[-1] = (items[-1][0], items[-1][1] + '\n' + line)
+        return target_lang, nplurals, "numbered", items
+
+    data = json.loads(prompt[prompt.rindex('\n{'):])
+    return target_lang, nplurals, "json", list(data.items())
+
+
+def fake_translation(text, target_lang: str, nplurals: int):
+    """Translate a text (or the forms of a plural message) by tagging it with the language"""
+    if isinstance(text, list) or text.startswith('["'):
+        singular, plural = text if isinstance(text, list) else json.loads(text)
+        forms = [f"[{target_lang}] {singular if i == 0 and nplurals > 1 else plural}" for i in range(nplurals)]
+        return forms if isinstance(text, list) else json.dumps(forms, ensure_ascii=False)
+    return f"[{target_lang}] {text}"
+
+
+class MockLLMServer:
+    """
+    OpenAI-compatible chat completions server on a background thread
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        latency: Seconds before each response
+        latency_per_item: Additional seconds per text in the batch
+        error_rate: Fraction of requests answered with a 500
+        rate_limit_rate: Fraction of requests answered with a 429
+        retry_after: Retry-After header of 429 responses
+        truncate_rate: Fraction of responses cut off at the token limit
+        seed: Random seed, so failures are reproducible
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, latency_per_item: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: str = "0",
+                 truncate_rate: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.latency_per_item = latency_per_item
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.reset_stats()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server._handle(self, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Chat completions URL of the server"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def reset_stats(self):
+        """Zero the request counters"""
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "bytes_received": 0,
+                "bytes_sent": 0,
+                "items": 0,
+                "errors": 0,
+                "rate_limited": 0,
+                "truncated": 0,
+            }
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: bytes):
+        self._count(requests=1, bytes_received=len(body))
+        with self._lock:
+            roll = self._random.random()
+            truncate = self._random.random() < self.truncate_rate
+
+        if roll < self.rate_limit_rate:
+            self._count(rate_limited=1)
+            return self._send(handler, 429, {"error": {"message": "Rate limit exceeded"}},
+                              {"Retry-After": self.retry_after})
+        if roll < self.rate_limit_rate + self.error_rate:
+            self._count(errors=1)
+            return self._send(handler, 500, {"error": {"message": "Internal server error"}})
+
+        payload = json.loads(body)
+        target_lang, nplurals, protocol, items = parse_prompt(payload["messages"][-1]["content"])
+        self._count(items=len(items))
+        time.sleep(self.latency + self.latency_per_item * len(items))
+
+        translations = [(key, fake_translation(text, target_lang, nplurals)) for key, text in items]
+        if truncate and translations:
+            self._count(truncated=1)
+            translations = translations[:max(1, len(translations) // 2)]
+        if protocol == "json":
+            content = json.dumps(dict(translations), ensure_ascii=False)
+        else:
+            content = "\n".join(f"{key}. {translation}" for key, translation in translations)
+        if truncate:
+            content = content[:-max(1, len(content) // 20)]
+        finish_reason = "length" if truncate else "stop"
+
+        if payload.get("stream"):
+            return self._send_stream(handler, content, finish_reason)
+        self._send(handler, 200, {
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 2},
+        })
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, result: dict, headers: dict = None):
+        data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        self._count(bytes_sent=len(data))
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _send_stream(self, handler: BaseHTTPRequestHandler, content: str, finish_reason: str):
+        # One event per line of the completion
+        pieces = [line + "\n" for line in content.split("\n")]
+        pieces[-1] = pieces[-1][:-1]
+        events = []
+        for i, piece in enumerate(pieces):
+            choice = {"index": 0, "delta": {"content": piece},
+                      "finish_reason": finish_reason if i == len(pieces) - 1 else None}
+            events.append(f"data: {json.dumps({'choices': [choice]}, ensure_ascii=False)}\n\n")
+        events.append("data: [DONE]\n\n")
+        data = "".join(events).encode("utf-8")
+        self._count(bytes_sent=len(data))
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Fraction of truncated responses")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.port, args.latency, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, truncate_rate=args.truncate_rate)
+    print(f"Serving on {server.url} (Ctrl+C to stop)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -50,9 +50,13 @@ setup(
         "polib==1.2.0",
         "requests==2.31.0",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.8"],
+    },
     entry_points={
         "console_scripts": [
             "po-translator=src.main:main",
+            "po-translator-cli=src.cli:main",
         ],
     },
     keywords="po translation localization i18n l10n ai openai deepseek",
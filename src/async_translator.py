@@ -0,0 +1,441 @@
+"""
+PO Translator (PO翻译器) - Asyncio Translation Engine
+Non-blocking variant of POTranslator for event-loop based callers
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+Usage:
+    translator = AsyncPOTranslator(api_provider="openai", api_key=key)
+    translator.set_model("gpt-4o-mini")
+    task = asyncio.ensure_future(translator.translate_po_file("app.pot", "app-zh.po", "en", "zh"))
+    ...
+    task.cancel()  # Stops dispatching, cancels in-flight requests, keeps the journal
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from error_policy import BatchError, classify_request_error, classify_status
+from metrics import RunMetrics, current_metrics, timed_phase
+from po_translator import ContextWindowError, POTranslator, TranslationRun, _body_size, load_po_file
+
+try:
+    import aiohttp
+except ImportError:  # Optional; without it blocking requests run on worker threads
+    aiohttp = None
+
+_TIMEOUT_ERRORS = (asyncio.TimeoutError, requests.exceptions.Timeout)
+_CONNECTION_ERRORS = (requests.exceptions.ConnectionError,)
+_REQUEST_ERRORS = (requests.exceptions.RequestException,)
+if aiohttp is not None:
+    _CONNECTION_ERRORS += (aiohttp.ClientConnectionError,)
+    _REQUEST_ERRORS += (aiohttp.ClientError,)
+
+
+class AsyncPOTranslator(POTranslator):
+    """
+    POTranslator whose batch and file translation are coroutines
+
+    Batches are dispatched as tasks on the running event loop, keeping up to
+    `concurrency` of them in flight. Requests go through aiohttp when it is
+    installed, otherwise through the pooled requests sessions on a thread
+    pool. Cancelling the `translate_po_file` task stops the run: in-flight
+    requests are cancelled and finished translations stay in the checkpoint
+    journal, so the run can be resumed.
+
+    Only `translate_po_file` is async. The blocking entry points of
+    POTranslator that would drive these coroutine batches from threads
+    (`translate_po_file_multi`, `update_po_file`) raise TypeError; use a
+    POTranslator for those.
+    """
+
+    def __init__(self, api_provider: str = "openai", api_key: str = "", api_base: str = ""):
+        super().__init__(api_provider, api_key, api_base)
+        self._client = None
+        self._executor = None
+
+    def clone(self) -> "AsyncPOTranslator":
+        """Copy the configuration for an independent run, without the HTTP clients"""
+        clone = super().clone()
+        clone._client = None
+        clone._executor = None
+        return clone
+
+    async def aclose(self):
+        """Close the aiohttp session, worker threads and pooled connections"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.close()
+
+    def translate_po_file_multi(self, *args, **kwargs):
+        """Not available: batches of this engine are coroutines (use POTranslator)"""
+        raise TypeError("AsyncPOTranslator has no translate_po_file_multi; use POTranslator for it")
+
+    def update_po_file(self, *args, **kwargs):
+        """Not available: batches of this engine are coroutines (use POTranslator)"""
+        raise TypeError("AsyncPOTranslator has no update_po_file; use POTranslator for it")
+
+    def _get_client(self):
+        """Get the aiohttp session, creating it on the running event loop"""
+        if self._client is None or self._client.closed:
+            self._client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=max(self.pool_size, self.concurrency)),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            )
+        return self._client
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool that runs blocking requests when aiohttp is missing"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(self.pool_size, self.concurrency))
+        return self._executor
+
+    async def _post(self, endpoint: str, headers: Dict, payload: Dict) -> tuple:
+        """
+        Send one request
+
+        Body sizes are counted into the active metrics, as the threaded engine does.
+
+        Returns:
+            Tuple of (status code, headers, parsed JSON body or None)
+        """
+        verify_ssl = self.api_provider != "huawei_maas"
+        metrics = current_metrics()
+
+        if aiohttp is not None:
+            if metrics is not None:
+                # The body aiohttp sends for json=payload
+                metrics.count(bytes_sent=len(json.dumps(payload).encode("utf-8")))
+            # None is aiohttp's default verification; older versions take True as "don't verify"
+            ssl = None if verify_ssl else False
+            async with self._get_client().post(endpoint, headers=headers, json=payload, ssl=ssl) as response:
+                if response.status >= 400:
+                    # Raised by the caller unless it is a 429 to wait out
+                    return response.status, response.headers, None
+                content = await response.read()
+            if metrics is not None:
+                metrics.count(bytes_received=len(content))
+            return response.status, response.headers, json.loads(content)
+
+        session = self._get_session(endpoint)
+        post = functools.partial(
+            session.post,
+            endpoint,
+            headers=headers,
+            json=payload,
+            timeout=(self.connect_timeout, self.read_timeout),
+            verify=verify_ssl
+        )
+        response = await asyncio.get_event_loop().run_in_executor(self._get_executor(), post)
+        if metrics is not None:
+            metrics.count(bytes_sent=_body_size(response.request.body))
+        if response.status_code >= 400:
+            return response.status_code, response.headers, None
+        if metrics is not None:
+            metrics.count(bytes_received=_body_size(response.content))
+        return response.status_code, response.headers, response.json()
+
+    async def _request_translations_async(self, texts: List[str], source_lang: str,
+                                          target_lang: str) -> List[Optional[str]]:
+        """
+        Send one batch to the provider's endpoint and parse the response
+
+        Raises:
+            requests.exceptions.RequestException: On HTTP errors or connection errors without aiohttp
+            aiohttp.ClientError: On connection errors with aiohttp
+        """
+        endpoint, headers, payload, tokens = self._build_request(texts, source_lang, target_lang)
+        limiter = self._get_rate_limiter()
+        metrics = current_metrics()
+
+        for attempt in range(self.max_rate_limit_retries + 1):
+            wait = limiter.try_acquire(tokens)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = limiter.try_acquire(tokens)
+
+            with timed_phase("http"):
+                status, response_headers, result = await self._post(endpoint, headers, payload)
+            if metrics is not None:
+                metrics.count(http_requests=1, retries=1 if attempt else 0)
+            if status != 429 or attempt == self.max_rate_limit_retries:
+                break
+
+            # Rate limited: wait as told (or back off with jitter) and hold back other batches too
+            limiter.pause(self._rate_limit_delay(attempt, response_headers.get("Retry-After")))
+
+        if status >= 400:
+            raise requests.exceptions.HTTPError(f"{status} Error for url: {endpoint}")
+        return self._parse_completion(result, texts)
+
+    async def translate_batch_openai_compatible(self, texts: List[str], source_lang: str,
+                                                target_lang: str) -> tuple:
+        """
+        Translate multiple texts in a single API call
+
+        Texts missing from the response are requested again on their own
+        (up to `gap_retries` follow-up calls) instead of resending the batch.
+
+        Returns:
+            Tuple of (translations list with None for texts missing from the
+            response, success boolean, error message)
+        """
+        try:
+            translations = await self._request_translations_async(texts, source_lang, target_lang)
+        except ContextWindowError as e:
+            # Nothing was sent; resending the same texts cannot succeed
+            return texts, False, BatchError(str(e), "client")
+        except _TIMEOUT_ERRORS:
+            return texts, False, BatchError("API request timed out (possible sleep/hibernation)", "timeout")
+        except _CONNECTION_ERRORS as e:
+            return texts, False, BatchError(f"Connection error: {str(e)}", "connection")
+        except requests.exceptions.RequestException as e:
+            return texts, False, BatchError(f"API request failed: {str(e)}", *classify_request_error(e))
+        except _REQUEST_ERRORS as e:
+            status = getattr(e, "status", None)
+            kind = classify_status(status) if isinstance(status, int) else "connection"
+            return texts, False, BatchError(f"API request failed: {str(e)}", kind, status)
+        except Exception as e:
+            return texts, False, BatchError(f"Unexpected error: {str(e)}")
+
+        for _ in range(self.gap_retries):
+            missing = [i for i, translation in enumerate(translations) if translation is None]
+            if not missing or len(missing) == len(texts):
+                break
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.count(gap_requests=1)
+            try:
+                refill = await self._request_translations_async(
+                    [texts[i] for i in missing], source_lang, target_lang
+                )
+            except Exception:
+                # Keep what the first response delivered
+                break
+            for i, translation in zip(missing, refill):
+                translations[i] = translation
+
+        return translations, True, None
+
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> tuple:
+        """
+        Translate multiple texts
+
+        Returns:
+            Tuple of (translations list, success boolean, error message)
+        """
+        if not texts:
+            return [], True, None
+
+        return await self.translate_batch_openai_compatible(texts, source_lang, target_lang)
+
+    async def _ask_error_callback_async(self, error_callback: Callable, error_msg: str,
+                                        batch_num: int, run: TranslationRun, lock: asyncio.Lock) -> str:
+        """
+        Ask the error callback what to do, one batch at a time
+
+        The callback may be a plain function or a coroutine function.
+        """
+        async with lock:
+            if run.stopped:
+                return 'stop'
+            action = error_callback(error_msg, batch_num, run.total_batches)
+            if inspect.isawaitable(action):
+                action = await action
+            return action
+
+    async def _decide_on_error_async(self, error_msg: str, batch_num: int, run: TranslationRun, attempt: int,
+                                     error_callback: Optional[Callable], lock: asyncio.Lock) -> str:
+        """
+        Decide what to do about a failed batch: by the error policy, then the error callback
+
+        Returns:
+            'retry', 'skip' or 'stop'
+        """
+        if self.error_policy is None:
+            if not error_callback:
+                # No error callback, defer the texts to the end of the run
+                return 'skip'
+            return await self._ask_error_callback_async(error_callback, error_msg, batch_num, run, lock)
+
+        action, delay = self.error_policy.decide(error_msg, attempt)
+        if action == 'ask':
+            if not error_callback:
+                action = 'skip'
+            else:
+                return await self._ask_error_callback_async(error_callback, error_msg, batch_num, run, lock)
+
+        if action == 'retry':
+            run.report(f"Batch {batch_num} failed ({error_msg}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            return 'retry'
+        run.report(f"Batch {batch_num} failed ({error_msg}); {'stopping' if action == 'stop' else 'skipping'}")
+        return action
+
+    async def _run_batch_async(self, batch_texts: List[str], batch_num: int, run: TranslationRun,
+                               error_callback: Optional[Callable], lock: asyncio.Lock, attempt: int = 1) -> tuple:
+        """
+        Translate a single batch and decide what to do if the call fails
+
+        Returns:
+            Tuple of (translations list or None, outcome, error count), where
+            outcome is 'translated', 'retry', 'skip' or 'stop'
+        """
+        try:
+            run.report(f"Translating batch {batch_num}/{run.total_batches} ({len(batch_texts)} items)...")
+
+            started = time.perf_counter()
+            # Each task has its own context, so concurrent batches don't mix metrics
+            with run.metrics.activate():
+                translations, success, error_msg = await self.translate_batch(
+                    batch_texts, run.source_lang, run.target_lang
+                )
+
+            if success:
+                run.metrics.record_batch(time.perf_counter() - started)
+                return translations, 'translated', 0
+
+            # API call failed
+            errors = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Unexpected, so not classified: the policy leaves it to the error callback
+            error_msg = BatchError(f"Unexpected error: {e}")
+            errors = len(batch_texts)
+            run.report(f"Error in batch {batch_num}: {error_msg}")
+            run.metrics.count(exceptions=1)
+
+        action = await self._decide_on_error_async(error_msg, batch_num, run, attempt, error_callback, lock)
+        if action == 'stop':
+            run.stopped = True
+            return None, 'stop', errors
+        elif action == 'skip':
+            # Defer the texts to the end of the run
+            return None, 'skip', errors
+        return None, 'retry', errors
+
+    async def translate_po_file(
+        self,
+        input_file: str,
+        output_file: str,
+        source_lang: str,
+        target_lang: str,
+        progress_callback: Optional[Callable] = None,
+        error_callback: Optional[Callable] = None,
+        resume: bool = False
+    ) -> Dict:
+        """
+        Translate a PO file without blocking the event loop
+
+        Loading, translation memory lookups and saving run on a worker
+        thread; API calls are awaited.
+
+        Args:
+            input_file: Path to input PO file
+            output_file: Path to output PO file
+            source_lang: Source language code
+            target_lang: Target language code
+            progress_callback: Optional callback function for progress updates
+            error_callback: Optional callback (function or coroutine function) for error handling
+            resume: Reuse translations journaled by an interrupted run for the same output file
+
+        Returns:
+            Dictionary with translation statistics
+
+        Raises:
+            asyncio.CancelledError: If the task is cancelled; the journal is flushed first
+        """
+        loop = asyncio.get_event_loop()
+        metrics = RunMetrics()
+
+        def load():
+            # Worker threads don't inherit the task's context
+            with metrics.activate():
+                return load_po_file(input_file)
+
+        # Sanitize the PO file to fix unescaped quotes while loading it
+        po = await loop.run_in_executor(None, load)
+
+        run = TranslationRun(
+            self, po, output_file, source_lang, target_lang, progress_callback, metrics,
+            reload=lambda: load_po_file(input_file)
+        )
+        del po  # Held by the run only, so it can be released
+        await loop.run_in_executor(None, run.prepare, resume)
+
+        if run.texts:
+            run.report("Starting batch translation...")
+            try:
+                await self._dispatch_batches_async(run, error_callback)
+            finally:
+                # Keep whatever finished even if the run is cancelled
+                run.flush()
+
+        return await loop.run_in_executor(None, run.finish)
+
+    async def _dispatch_batches_async(self, run: TranslationRun, error_callback: Optional[Callable]):
+        """
+        Translate a run's texts in batches, keeping up to `concurrency` batch tasks in flight
+        """
+        lock = asyncio.Lock()
+        in_flight = {}
+
+        try:
+            while not run.stopped:
+                while run.has_next() or in_flight:
+                    while not run.stopped and run.has_next() and len(in_flight) < self.concurrency:
+                        batch_num, items = run.next_batch()
+                        task = asyncio.ensure_future(
+                            self._run_batch_async(
+                                run.batch_texts(items), batch_num, run, error_callback, lock,
+                                run.batch_attempt(items)
+                            )
+                        )
+                        in_flight[task] = (batch_num, items)
+
+                    if not in_flight:
+                        break
+
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        batch_num, items = in_flight.pop(task)
+                        translations, outcome, errors = task.result()
+                        run.apply(batch_num, items, translations, outcome, errors, len(in_flight))
+                # Texts that failed get another round once everything else is done, unless stopped
+                if run.stopped or not run.retry_deferred():
+                    break
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        if run.stopped and run.has_next():
+            run.report("Translation stopped by user")
@@ -0,0 +1,207 @@
+"""
+PO Translator (PO翻译器) - Checkpoint Journal
+Sidecar journal that lets interrupted translation runs resume
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+JOURNAL_SUFFIX = ".journal"
+
+# Read once; os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def journal_path(output_file: str) -> str:
+    """Get the sidecar journal path for an output PO file"""
+    return output_file + JOURNAL_SUFFIX
+
+
+def match_file_mode(tmp_path: str, target: str) -> None:
+    """
+    Give a temporary file the mode its target should end up with
+
+    mkstemp creates files readable by the owner only. The replacement takes
+    the mode of the file it replaces, or for a new file the default mode
+    under the umask, as if it had been created with open().
+
+    Args:
+        tmp_path: Temporary file about to be renamed over the target
+        target: Path of the file it replaces
+    """
+    try:
+        mode = os.stat(target).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(tmp_path, mode)
+
+
+def atomic_save(po, output_file: str) -> None:
+    """
+    Save a polib POFile so the output is never left half-written
+
+    The file is written next to the target and then renamed over it.
+
+    Args:
+        po: polib.POFile to save
+        output_file: Path to the output PO file
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp_path = tempfile.mkstemp(suffix=".po.tmp", dir=directory)
+    os.close(fd)
+    try:
+        po.save(tmp_path)
+        match_file_mode(tmp_path, output_file)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON Lines journal of finished translations
+
+    The first line records the language pair of the run; every following
+    line is one {"msgctxt", "msgid", "msgstr"} record. Records are buffered
+    and flushed every `every_batches` batches or `every_seconds` seconds,
+    whichever comes first. A torn last line from a crash is ignored on load.
+
+    Recording and flushing are thread-safe, so runs on several threads
+    (e.g. the windows of a streamed file) can share one journal.
+    """
+
+    def __init__(self, output_file: str, source_lang: str, target_lang: str,
+                 every_batches: int = 10, every_seconds: float = 60.0):
+        """
+        Args:
+            output_file: Output PO file the journal belongs to
+            source_lang: Source language code of the run
+            target_lang: Target language code of the run
+            every_batches: Flush after this many batches
+            every_seconds: Flush after this many seconds
+        """
+        self.path = journal_path(output_file)
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.every_batches = every_batches
+        self.every_seconds = every_seconds
+        self._pending: List[str] = []
+        self._batches = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[Tuple[Optional[str], str], str]:
+        """
+        Read the translations recorded by a previous run
+
+        Returns:
+            Dictionary mapping (msgctxt, msgid) to msgstr; empty if there is no
+            journal or it belongs to a different language pair
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            return records
+        if (header.get("source_lang"), header.get("target_lang")) != (self.source_lang, self.target_lang):
+            return records
+
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn write from an interrupted run
+                continue
+            records[(record.get("msgctxt"), record["msgid"])] = record["msgstr"]
+        return records
+
+    def start(self, resumed: Dict[Tuple[Optional[str], str], str]) -> None:
+        """
+        Begin journaling a run, carrying over records that were resumed
+
+        Args:
+            resumed: Records loaded from a previous journal
+        """
+        header = {"source_lang": self.source_lang, "target_lang": self.target_lang}
+        lines = [json.dumps(header, ensure_ascii=False) + "\n"]
+        lines.extend(
+            self._format(msgctxt, msgid, msgstr) for (msgctxt, msgid), msgstr in resumed.items()
+        )
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(suffix=JOURNAL_SUFFIX + ".tmp", dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        match_file_mode(tmp_path, self.path)
+        os.replace(tmp_path, self.path)
+        self._last_flush = time.monotonic()
+
+    def record_batch(self, records: List[Tuple[str, Optional[str], str]]) -> None:
+        """
+        Record the translations of one finished batch
+
+        Args:
+            records: (msgid, msgctxt, msgstr) triples
+        """
+        lines = [self._format(msgctxt, msgid, msgstr) for msgid, msgctxt, msgstr in records]
+        with self._lock:
+            self._pending.extend(lines)
+            self._batches += 1
+            if (self._batches >= self.every_batches
+                    or time.monotonic() - self._last_flush >= self.every_seconds):
+                self._flush()
+
+    def flush(self) -> None:
+        """Append buffered records to the journal and sync them to disk"""
+        with self._lock:
+            self._flush()
+
+    def remove(self) -> None:
+        """Delete the journal once the output file has been saved"""
+        with self._lock:
+            self._pending = []
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _flush(self) -> None:
+        if self._pending:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(self._pending)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+        self._batches = 0
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def _format(msgctxt: Optional[str], msgid: str, msgstr: str) -> str:
+        return json.dumps({"msgctxt": msgctxt, "msgid": msgid, "msgstr": msgstr}, ensure_ascii=False) + "\n"
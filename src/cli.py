@@ -0,0 +1,286 @@
+"""
+PO Translator (PO翻译器) - Command-Line Interface
+Headless batch translation of many PO files for CI and servers
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+Usage:
+    python src/cli.py languages/*.pot -t zh -t ja --model gpt-4o-mini --jobs 4 --summary summary.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from error_policy import ErrorPolicy
+from metrics import export_prometheus
+from po_translator import POTranslator, PROTOCOLS, __version__
+from translation_memory import TranslationMemory
+
+PROVIDERS = ["openai", "deepseek", "zhipu", "moonshot", "qwen", "huawei_maas", "custom"]
+
+_print_lock = threading.Lock()
+
+
+def log(message: str):
+    """Print a progress line to stderr (safe from worker threads)"""
+    with _print_lock:
+        print(message, file=sys.stderr, flush=True)
+
+
+def find_input_files(patterns: List[str], target_langs: List[str], output_pattern: str) -> List[str]:
+    """
+    Expand files, directories and glob patterns into a sorted list of PO/POT files
+
+    Directories are searched recursively. Files that look like outputs of
+    this run (same naming pattern and a requested target language) are left
+    out, so re-running over a directory does not translate its own output.
+
+    Args:
+        patterns: File paths, directory paths or glob patterns
+        target_langs: Target language codes of this run
+        output_pattern: Output file name pattern
+
+    Returns:
+        List of input file paths
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for extension in ("po", "pot"):
+                found.update(glob.glob(os.path.join(pattern, "**", f"*.{extension}"), recursive=True))
+        elif os.path.isfile(pattern):
+            found.add(pattern)
+        else:
+            found.update(glob.glob(pattern, recursive=True))
+
+    output_suffixes = tuple(
+        output_pattern.format(stem="", lang=lang) for lang in target_langs
+    )
+    return sorted(
+        path for path in found
+        if os.path.isfile(path) and not os.path.basename(path).endswith(output_suffixes)
+    )
+
+
+def output_path_for(input_file: str, target_lang: str, output_dir: Optional[str], output_pattern: str) -> str:
+    """
+    Build the output file path for one input file and target language
+
+    Args:
+        input_file: Input PO/POT file
+        target_lang: Target language code
+        output_dir: Output directory (None to write next to the input file)
+        output_pattern: File name pattern with {stem} and {lang} placeholders
+    """
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    directory = output_dir or os.path.dirname(input_file)
+    return os.path.join(directory, output_pattern.format(stem=stem, lang=target_lang))
+
+
+def translate_job(translator: POTranslator, input_file: str, output_files: Dict[str, str],
+                  source_lang: str, resume: bool, update: bool, quiet: bool) -> List[Dict]:
+    """
+    Translate one file into every target language and describe the results
+
+    The file is parsed once and the batches of all languages interleave.
+
+    Args:
+        output_files: Output file path per target language code
+
+    Returns:
+        Summary records with input, output, target_lang, status, seconds, stats and/or error;
+        a run that stopped early or left texts untranslated has status "error" along with its stats
+    """
+    name = os.path.basename(input_file)
+
+    def progress_callback(current, total, message):
+        if not quiet:
+            log(f"[{name}] {current}/{total} {message}")
+
+    records = [
+        {"input": input_file, "output": output_file, "target_lang": target_lang}
+        for target_lang, output_file in output_files.items()
+    ]
+    started = time.monotonic()
+    try:
+        results = translator.translate_po_file_multi(
+            input_file, output_files, source_lang, progress_callback, resume=resume, update=update
+        )
+        for record in records:
+            stats = results[record["target_lang"]]
+            record["status"] = "ok"
+            record["stats"] = stats
+            if stats["stopped"]:
+                record["status"] = "error"
+                record["error"] = f"stopped with {stats['unsent']} text(s) not sent"
+            elif stats["failed"]:
+                record["status"] = "error"
+                record["error"] = f"{stats['failed']} text(s) left untranslated"
+            log(f"[{name} -> {record['target_lang']}] {'done' if record['status'] == 'ok' else record['error']}: "
+                f"{stats['untranslated']} to translate, {stats['cache_hits']} from memory, {stats['failed']} failed")
+    except Exception as e:
+        for record in records:
+            record["status"] = "error"
+            record["error"] = str(e)
+        log(f"[{name}] failed: {e}")
+    seconds = round(time.monotonic() - started, 3)
+    for record in records:
+        record["seconds"] = seconds
+    return records
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="po-translator-cli",
+        description="Translate PO files with cloud AI APIs, without the GUI."
+    )
+    parser.add_argument("inputs", nargs="+", help="PO/POT files, directories or glob patterns")
+    parser.add_argument("-s", "--source", default="en", help="Source language code (default: en)")
+    parser.add_argument("-t", "--target", action="append", required=True,
+                        help="Target language code; repeat or comma-separate for several")
+    parser.add_argument("-o", "--output-dir", help="Directory for translated files (default: next to each input)")
+    parser.add_argument("--output-pattern", default="{stem}-{lang}.po",
+                        help="Output file name pattern (default: {stem}-{lang}.po)")
+    parser.add_argument("--provider", default="openai", choices=PROVIDERS, help="API provider (default: openai)")
+    parser.add_argument("--model", help="Model name (default: first default model of the provider)")
+    parser.add_argument("--api-key", help="API key (default: $PO_TRANSLATOR_API_KEY)")
+    parser.add_argument("--api-base", default="", help="API URL for the custom provider")
+    parser.add_argument("--batch-size", type=int, default=20, help="Texts per batch (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight per file (default: 4)")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="Files translated in parallel (default: 2)")
+    parser.add_argument("--protocol", default="numbered", choices=PROTOCOLS, help="Batch protocol (default: numbered)")
+    parser.add_argument("--memory", help="Translation memory database shared by all files")
+    parser.add_argument("--rpm", type=float, help="Requests per minute limit")
+    parser.add_argument("--tpm", type=float, help="Tokens per minute limit")
+    parser.add_argument("--resume", action="store_true", help="Resume interrupted runs from their checkpoint journals")
+    parser.add_argument("--update", action="store_true",
+                        help="Merge into existing output files and translate only new or changed strings")
+    parser.add_argument("--summary", help="Write a JSON summary to this file ('-' for stdout)")
+    parser.add_argument("--metrics", help="Write per-file timing and usage metrics in the Prometheus text format")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print per-file results")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point
+
+    Returns:
+        Exit code: 0 if every file was translated, 1 if any failed, stopped or left texts
+        untranslated, 2 on usage errors
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    target_langs = [lang.strip() for value in args.target for lang in value.split(",") if lang.strip()]
+    api_key = args.api_key or os.environ.get("PO_TRANSLATOR_API_KEY", "")
+    if not api_key:
+        parser.error("an API key is required (--api-key or $PO_TRANSLATOR_API_KEY)")
+
+    input_files = find_input_files(args.inputs, target_langs, args.output_pattern)
+    if not input_files:
+        parser.error("no PO/POT files found")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    translator = POTranslator(api_provider=args.provider, api_key=api_key, api_base=args.api_base)
+    translator.set_model(args.model or translator.get_default_models()[0])
+    translator.set_batch_size(args.batch_size)
+    translator.set_concurrency(args.concurrency)
+    translator.set_protocol(args.protocol)
+    # Nobody to ask: retry transient errors, skip what is left, stop on rejected keys
+    translator.set_error_policy(ErrorPolicy())
+    # Enough pooled connections for every batch of every parallel file
+    translator.set_http_options(pool_size=max(1, args.jobs) * translator.concurrency)
+    if args.rpm or args.tpm:
+        translator.set_rate_limit(args.rpm, args.tpm)
+    memory = TranslationMemory(args.memory) if args.memory else None
+    translator.set_translation_memory(memory)
+
+    jobs = [
+        (input_file, {
+            target_lang: output_path_for(input_file, target_lang, args.output_dir, args.output_pattern)
+            for target_lang in target_langs
+        })
+        for input_file in input_files
+    ]
+    log(f"Translating {len(input_files)} file(s) into {len(target_langs)} language(s) "
+        f"with {args.provider}/{translator.model}")
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            futures = [
+                executor.submit(
+                    translate_job, translator.clone(), input_file, output_files,
+                    args.source, args.resume, args.update, args.quiet
+                )
+                for input_file, output_files in jobs
+            ]
+            results = [record for future in futures for record in future.result()]
+    finally:
+        translator.close()
+        if memory is not None:
+            memory.close()
+
+    failed = [result for result in results if result["status"] != "ok"]
+    # Incomplete runs still wrote their output and have statistics
+    translated = [result for result in results if "stats" in result]
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(export_prometheus(
+                (result["stats"]["metrics"], {"file": result["input"], "lang": result["target_lang"]})
+                for result in translated
+            ))
+    for result in translated:
+        result["stats"]["metrics"] = result["stats"]["metrics"].to_dict()
+
+    summary = {
+        "version": __version__,
+        "provider": args.provider,
+        "model": translator.model,
+        "source_lang": args.source,
+        "files": len(input_files),
+        "jobs": len(results),
+        "failed": len(failed),
+        "seconds": round(time.monotonic() - started, 3),
+        "results": results
+    }
+
+    if args.summary == "-":
+        json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+    elif args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    log(f"Finished {len(results) - len(failed)}/{len(results)} translation(s) in {summary['seconds']}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+PO Translator (PO翻译器) - Error Policy
+Declarative handling of failed batches: retry, skip, stop or ask the user
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from rate_limit import backoff_delay
+
+# Kinds of batch failures, as classified by classify_request_error
+ERROR_KINDS = ("timeout", "connection", "rate_limit", "server", "auth", "client", "unknown")
+
+# Actions a policy can decide on; 'ask' defers to the error callback
+ACTIONS = ("retry", "skip", "stop", "ask")
+
+_STATUS_PREFIX = re.compile(r'^(\d{3}) ')
+
+
+class BatchError(str):
+    """
+    Error message of a failed batch, carrying what kind of failure it was
+
+    Behaves as the plain message everywhere (e.g. in error callbacks).
+    """
+
+    def __new__(cls, message: str, kind: str = "unknown", status: Optional[int] = None):
+        error = super().__new__(cls, message)
+        error.kind = kind
+        error.status = status
+        return error
+
+
+def classify_status(status: int) -> str:
+    """Get the error kind of an HTTP status code"""
+    if status == 429:
+        return "rate_limit"
+    if status in (401, 403):
+        return "auth"
+    if status >= 500:
+        return "server"
+    return "client"
+
+
+def classify_request_error(error: requests.exceptions.RequestException) -> Tuple[str, Optional[int]]:
+    """
+    Work out the kind of a failed request
+
+    Returns:
+        Tuple of (error kind, HTTP status code or None)
+    """
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout", None
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connection", None
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if not isinstance(status, int):
+        # e.g. "401 Client Error: Unauthorized for url: ..."
+        match = _STATUS_PREFIX.match(str(error))
+        status = int(match.group(1)) if match else None
+    if status is not None:
+        return classify_status(status), status
+    if isinstance(error, requests.exceptions.HTTPError):
+        # An error reported in the response body
+        return "unknown", None
+    # Broken stream and the like
+    return "connection", None
+
+
+class ErrorRule:
+    """
+    What to do about one kind of failure
+
+    Args:
+        action: 'retry', 'skip', 'stop' or 'ask'
+        retries: For 'retry', how many times a batch is sent again before `then` applies
+        then: Action once the retries are used up
+        backoff_base: Delay ceiling of the first retry in seconds (doubled per retry, with jitter)
+        backoff_cap: Maximum delay in seconds
+    """
+
+    def __init__(self, action: str, retries: int = 0, then: str = "ask",
+                 backoff_base: float = 2.0, backoff_cap: float = 60.0):
+        if action not in ACTIONS or then not in ACTIONS or then == "retry":
+            raise ValueError(f"Unknown error action: {action}/{then}")
+        self.action = action
+        self.retries = max(0, int(retries))
+        self.then = then
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+
+class ErrorPolicy:
+    """
+    Decides inside the engine what happens to a failed batch
+
+    Transient failures (timeouts, connection errors, 5xx, lingering 429s)
+    are retried with backoff, rejected credentials stop the run, and
+    requests the API refuses are skipped. Whatever is left over is 'ask':
+    the error callback is consulted as a last resort, or the batch is
+    skipped when there is none (e.g. unattended runs).
+
+    Retries also count toward POTranslator.max_attempts.
+    """
+
+    DEFAULT_RULES = {
+        "timeout": ErrorRule("retry", retries=2),
+        "connection": ErrorRule("retry", retries=2),
+        "server": ErrorRule("retry", retries=2),
+        "rate_limit": ErrorRule("retry", retries=2, backoff_base=10.0),
+        "auth": ErrorRule("stop"),
+        "client": ErrorRule("skip"),
+        "unknown": ErrorRule("ask"),
+    }
+
+    def __init__(self, rules: Optional[Dict[str, ErrorRule]] = None):
+        """
+        Args:
+            rules: Rules by error kind, replacing the defaults of those kinds
+        """
+        self.rules = dict(self.DEFAULT_RULES)
+        if rules:
+            self.rules.update(rules)
+
+    def set_rule(self, kind: str, action: str, retries: int = 0, then: str = "ask", **backoff):
+        """
+        Set the rule for one kind of failure
+
+        Args:
+            kind: Error kind (see ERROR_KINDS)
+            action: 'retry', 'skip', 'stop' or 'ask'
+            retries: For 'retry', how many times a batch is sent again
+            then: Action once the retries are used up
+            **backoff: backoff_base and backoff_cap of the retries
+        """
+        self.rules[kind] = ErrorRule(action, retries, then, **backoff)
+
+    def decide(self, error: str, attempt: int) -> Tuple[str, float]:
+        """
+        Decide what to do about a failed batch
+
+        Args:
+            error: Error message; a BatchError tells its kind, anything else is 'unknown'
+            attempt: How many times the batch's texts have been sent, including this one
+
+        Returns:
+            Tuple of (action, seconds to wait before retrying)
+        """
+        kind = getattr(error, "kind", "unknown")
+        rule = self.rules.get(kind, self.rules["unknown"])
+        if rule.action != "retry":
+            return rule.action, 0.0
+        if attempt <= rule.retries:
+            return "retry", backoff_delay(attempt - 1, rule.backoff_base, rule.backoff_cap)
+        return rule.then, 0.0
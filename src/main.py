@@ -30,6 +30,8 @@ import os
 import threading
 import json
 from po_translator import POTranslator, __version__, __author__, __organization__
+from error_policy import ErrorPolicy
+from checkpoint import journal_path
 
 __app_name__ = "PO Translator"
 __app_name_cn__ = "PO翻译器"
@@ -103,10 +105,11 @@ class POTranslatorGUI:
     def __init__(self, root):
         self.root = root
         self.root.title(f"{__app_name__} v{__version__}")
-        self.root.geometry("800x750")
+        self.root.geometry("800x790")
         
         self.translator = None
         self.translation_running = False
+        self.resume_run = False
         self.config = self.load_config()
         
         self.create_widgets()
@@ -125,7 +128,8 @@ class POTranslatorGUI:
             "last_provider": "OpenAI",
             "last_model": "gpt-3.5-turbo",
             "custom_api_url": "",
-            "batch_size": "10"
+            "batch_size": "10",
+            "concurrency": "1"
         }
 
     def save_config(self):
@@ -199,30 +203,36 @@ class POTranslatorGUI:
         batch_size_combo = ttk.Combobox(main_frame, textvariable=self.batch_size_var, values=["10", "20", "50", "100"], width=47, state="readonly")
         batch_size_combo.grid(row=9, column=1, sticky=tk.W, pady=5)
 
+        # Concurrency
+        ttk.Label(main_frame, text="Concurrent Batches:").grid(row=10, column=0, sticky=tk.W, pady=5)
+        self.concurrency_var = tk.StringVar(value=str(self.config.get("concurrency", "1")))
+        concurrency_combo = ttk.Combobox(main_frame, textvariable=self.concurrency_var, values=["1", "2", "4", "8"], width=47, state="readonly")
+        concurrency_combo.grid(row=10, column=1, sticky=tk.W, pady=5)
+
         # Custom API URL
-        ttk.Label(main_frame, text="Custom API URL:").grid(row=10, column=0, sticky=tk.W, pady=5)
+        ttk.Label(main_frame, text="Custom API URL:").grid(row=11, column=0, sticky=tk.W, pady=5)
         self.custom_url_var = tk.StringVar(value=self.config.get("custom_api_url", ""))
         self.custom_url_entry = ttk.Entry(main_frame, textvariable=self.custom_url_var, width=50)
-        self.custom_url_entry.grid(row=10, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.custom_url_entry.grid(row=11, column=1, sticky=(tk.W, tk.E), pady=5)
 
         # Log area
-        ttk.Label(main_frame, text="Log:").grid(row=11, column=0, sticky=tk.W, pady=(10, 5))
+        ttk.Label(main_frame, text="Log:").grid(row=12, column=0, sticky=tk.W, pady=(10, 5))
         self.log_text = scrolledtext.ScrolledText(main_frame, width=70, height=15, font=("Consolas", 9))
-        self.log_text.grid(row=12, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        self.log_text.grid(row=13, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
 
         # Progress bar
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100, length=500)
-        self.progress_bar.grid(row=13, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        self.progress_bar.grid(row=14, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
 
         # Status label
         self.status_var = tk.StringVar(value="Ready")
         self.status_label = ttk.Label(main_frame, textvariable=self.status_var, foreground="blue")
-        self.status_label.grid(row=14, column=0, columnspan=3, sticky=tk.W, pady=5)
+        self.status_label.grid(row=15, column=0, columnspan=3, sticky=tk.W, pady=5)
 
         # Buttons
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=15, column=0, columnspan=3, pady=10)
+        button_frame.grid(row=16, column=0, columnspan=3, pady=10)
 
         self.start_button = ttk.Button(button_frame, text="Start Translation", command=self.start_translation)
         self.start_button.grid(row=0, column=0, padx=5)
@@ -238,7 +248,7 @@ class POTranslatorGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(12, weight=1)
+        main_frame.rowconfigure(13, weight=1)
 
     def load_saved_settings(self):
         """Load saved settings"""
@@ -317,12 +327,16 @@ class POTranslatorGUI:
     def error_callback(self, error_msg, batch_num, total_batches):
         """
         Handle API errors with user interaction
-        
+
+        Only called for failures the error policy leaves to the user;
+        transient ones are retried automatically.
+
         Returns:
             'retry', 'skip', or 'stop'
         """
         # This will be called from background thread, so we need to use root.after
         result = [None]
+        answered = threading.Event()
         
         def show_dialog():
             message = f"API Error in batch {batch_num}/{total_batches}:\n\n{error_msg}\n\n"
@@ -343,20 +357,25 @@ class POTranslatorGUI:
             button_frame = ttk.Frame(dialog)
             button_frame.pack(pady=10)
             
-            def on_retry():
-                result[0] = 'retry'
+            def answer(action):
+                result[0] = action
+                answered.set()
                 dialog.destroy()
-            
+
+            def on_retry():
+                answer('retry')
+
             def on_skip():
-                result[0] = 'skip'
-                dialog.destroy()
-            
+                answer('skip')
+
             def on_stop():
-                result[0] = 'stop'
-                dialog.destroy()
+                answer('stop')
+
+            # Closing the window stops, like the Stop button
+            dialog.protocol("WM_DELETE_WINDOW", on_stop)
             
             ttk.Button(button_frame, text="Retry", command=on_retry).pack(side=tk.LEFT, padx=5)
-            ttk.Button(button_frame, text="Skip This Batch", command=on_skip).pack(side=tk.LEFT, padx=5)
+            ttk.Button(button_frame, text="Retry Later", command=on_skip).pack(side=tk.LEFT, padx=5)
             ttk.Button(button_frame, text="Stop Translation", command=on_stop).pack(side=tk.LEFT, padx=5)
             
             dialog.wait_window()
@@ -365,10 +384,7 @@ class POTranslatorGUI:
         self.root.after(0, show_dialog)
         
         # Wait for result
-        while result[0] is None:
-            import time
-            time.sleep(0.1)
-        
+        answered.wait()
         return result[0]
 
     def start_translation(self):
@@ -394,6 +410,15 @@ class POTranslatorGUI:
             messagebox.showerror("Error", "Please enter API key!")
             return
 
+        # Offer to continue an interrupted run for the same output file
+        self.resume_run = False
+        if os.path.exists(journal_path(output_file)):
+            self.resume_run = messagebox.askyesno(
+                "Resume",
+                "A previous translation of this output file was interrupted.\n\n"
+                "Resume it and keep the translations that were already finished?"
+            )
+
         # Start translation in separate thread
         self.translation_running = True
         self.start_button.config(state=tk.DISABLED)
@@ -432,6 +457,15 @@ class POTranslatorGUI:
             except:
                 self.translator.set_batch_size(10)
 
+            # Set concurrency
+            try:
+                self.translator.set_concurrency(int(self.concurrency_var.get()))
+            except:
+                self.translator.set_concurrency(1)
+
+            # Retry transient errors on their own; only ask about the rest
+            self.translator.set_error_policy(ErrorPolicy())
+
             self.log_message("Starting translation...")
             self.log_message(f"Input: {input_file}")
             self.log_message(f"Output: {output_file}")
@@ -440,6 +474,7 @@ class POTranslatorGUI:
             self.log_message(f"API Provider: {provider_name}")
             self.log_message(f"Model: {model}")
             self.log_message(f"Batch Size: {self.translator.batch_size}")
+            self.log_message(f"Concurrent Batches: {self.translator.concurrency}")
 
             # Progress callback
             def progress_callback(current, total, message):
@@ -452,7 +487,8 @@ class POTranslatorGUI:
             # Run translation
             stats = self.translator.translate_po_file(
                 input_file, output_file, source_lang, target_lang, 
-                progress_callback, self.error_callback
+                progress_callback, self.error_callback,
+                resume=self.resume_run
             )
 
             # Show results
@@ -462,6 +498,8 @@ class POTranslatorGUI:
             self.root.after(0, lambda: self.show_error(str(e)))
 
         finally:
+            if self.translator:
+                self.translator.close()
             self.translation_running = False
             self.root.after(0, self.translation_finished)
 
@@ -473,16 +511,27 @@ class POTranslatorGUI:
 
     def show_results(self, stats, output_file):
         """Show translation results"""
+        stopped = stats.get('stopped')
         self.log_message("\n" + "="*50)
-        self.log_message("Translation Complete!")
+        self.log_message("Translation Stopped!" if stopped else "Translation Complete!")
         self.log_message(f"Total entries: {stats['total']}")
         self.log_message(f"Already translated: {stats['translated']}")
         self.log_message(f"Fuzzy entries: {stats['fuzzy']}")
         self.log_message(f"Untranslated: {stats['untranslated']}")
         self.log_message(f"Errors: {stats['errors']}")
+        if stats.get('failed'):
+            self.log_message(f"Left untranslated after errors: {stats['failed']} (translate the file again to retry them)")
+        if stopped:
+            self.log_message(f"Not sent before the stop: {stats['unsent']}")
         self.log_message(f"Output saved to: {output_file}")
         self.log_message("="*50)
 
+        if stopped:
+            self.status_var.set("Translation stopped before it was done")
+            self.status_label.config(foreground="orange")
+            messagebox.showwarning("Stopped", f"Translation stopped before it was done.\nOutput saved to: {output_file}")
+            return
+
         self.status_var.set("Translation completed successfully!")
         self.status_label.config(foreground="green")
         messagebox.showinfo("Success", f"Translation completed!\nOutput saved to: {output_file}")
@@ -536,6 +585,7 @@ GitHub: https://github.com/franklifang/po-translator"""
         self.config["last_model"] = self.model_var.get()
         self.config["custom_api_url"] = self.custom_url_var.get()
         self.config["batch_size"] = self.batch_size_var.get()
+        self.config["concurrency"] = self.concurrency_var.get()
         self.save_config()
         
         self.root.quit()
@@ -0,0 +1,225 @@
+"""
+PO Translator (PO翻译器) - Run Metrics
+Phase timings, batch latencies and API usage counters of a translation run
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Counters every run reports, even when zero
+COUNTERS = (
+    "http_requests",    # Requests sent, including retries and gap refills
+    "retries",          # Requests repeated after a 429 response
+    "throttled",        # 429 responses, including a last one that was not retried
+    "gap_requests",     # Follow-up requests for texts missing from a response
+    "exceptions",       # Batches that hit an unexpected error
+    "tokens_in",        # Prompt tokens, from the API's usage field
+    "tokens_out",       # Completion tokens, from the API's usage field
+    "bytes_sent",       # Request bodies
+    "bytes_received",   # Response bodies
+)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+_active = contextvars.ContextVar("po_translator_metrics", default=None)
+
+
+class RunMetrics:
+    """
+    Metrics of one translation run
+
+    Code deep in the call stack records into the metrics that are active in
+    the current thread or task (see activate and current_metrics), so
+    timings need not be threaded through every call. All methods are
+    thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases: Dict[str, List[float]] = {}  # Phase name -> [seconds, calls]
+        self.batch_latencies: List[float] = []
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+
+    @contextmanager
+    def activate(self) -> Iterator["RunMetrics"]:
+        """Make these the metrics recorded into by the current thread or task"""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block as one call of the named phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    def add_phase(self, name: str, seconds: float, calls: int = 1):
+        """Add time spent in a phase"""
+        with self._lock:
+            totals = self.phases.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+
+    def count(self, **amounts: int):
+        """Add to counters, e.g. count(http_requests=1, bytes_sent=512)"""
+        with self._lock:
+            for name, amount in amounts.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_batch(self, seconds: float):
+        """Record the latency of one batch, from sending it to having its translations"""
+        with self._lock:
+            self.batch_latencies.append(seconds)
+
+    def merge(self, other: "RunMetrics"):
+        """Add the phases, latencies and counters of other metrics to these"""
+        with other._lock:
+            phases = {name: list(totals) for name, totals in other.phases.items()}
+            latencies = list(other.batch_latencies)
+            counters = dict(other.counters)
+        for name, (seconds, calls) in phases.items():
+            self.add_phase(name, seconds, calls)
+        with self._lock:
+            self.batch_latencies.extend(latencies)
+        self.count(**counters)
+
+    def batch_summary(self) -> Dict:
+        """Count, total seconds, quantiles and maximum of the batch latencies"""
+        with self._lock:
+            latencies = sorted(self.batch_latencies)
+        summary = {"count": len(latencies), "seconds": round(sum(latencies), 6)}
+        for quantile in QUANTILES:
+            summary[f"p{int(quantile * 100)}"] = round(_quantile(latencies, quantile), 6)
+        summary["max"] = round(latencies[-1], 6) if latencies else 0.0
+        return summary
+
+    def to_dict(self) -> Dict:
+        """Plain-data snapshot, as written to JSON"""
+        with self._lock:
+            phases = {
+                name: {"seconds": round(seconds, 6), "calls": calls}
+                for name, (seconds, calls) in sorted(self.phases.items())
+            }
+            counters = dict(self.counters)
+        return dict(counters, phases=phases, batches=self.batch_summary())
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Export as a JSON document"""
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, labels: Optional[Dict[str, str]] = None, prefix: str = "po_translator") -> str:
+        """Export in the Prometheus text format (see export_prometheus)"""
+        return export_prometheus([(self, labels or {})], prefix)
+
+
+def current_metrics() -> Optional[RunMetrics]:
+    """Get the metrics active in the current thread or task, if any"""
+    return _active.get()
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """Time a block into the active metrics; does nothing without any"""
+    metrics = _active.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.phase(name):
+        yield
+
+
+def export_prometheus(runs: Iterable[Tuple[RunMetrics, Dict[str, str]]], prefix: str = "po_translator") -> str:
+    """
+    Export the metrics of several runs in the Prometheus text format
+
+    Args:
+        runs: Pairs of metrics and the labels identifying the run (e.g. file and language)
+        prefix: Metric name prefix
+
+    Returns:
+        Text exposition, e.g. for the node_exporter textfile collector
+    """
+    runs = [(metrics.to_dict(), labels) for metrics, labels in runs]
+    families = {}
+
+    def sample(name, kind, help_text, value, labels, suffix=""):
+        family = families.setdefault(f"{prefix}_{name}", (kind, help_text, []))
+        family[2].append((f"{prefix}_{name}{suffix}", labels, value))
+
+    for data, labels in runs:
+        for phase, totals in data["phases"].items():
+            phase_labels = dict(labels, phase=phase)
+            sample("phase_seconds_total", "counter", "Time spent per phase", totals["seconds"], phase_labels)
+            sample("phase_calls_total", "counter", "Calls per phase", totals["calls"], phase_labels)
+
+        batches = data["batches"]
+        latency = ("batch_latency_seconds", "summary", "Latency of translated batches")
+        for quantile in QUANTILES:
+            sample(*latency, batches[f"p{int(quantile * 100)}"], dict(labels, quantile=str(quantile)))
+        sample(*latency, batches["seconds"], labels, "_sum")
+        sample(*latency, batches["count"], labels, "_count")
+
+        sample("http_requests_total", "counter", "API requests sent", data["http_requests"], labels)
+        sample("retries_total", "counter", "API requests repeated after a 429 response", data["retries"], labels)
+        sample("throttled_total", "counter", "HTTP 429 responses", data["throttled"], labels)
+        sample("gap_requests_total", "counter", "Follow-up requests for missing texts",
+               data["gap_requests"], labels)
+        sample("exceptions_total", "counter", "Batches that hit unexpected errors", data["exceptions"], labels)
+        for direction in ("in", "out"):
+            sample("tokens_total", "counter", "Tokens reported by the API",
+                   data[f"tokens_{direction}"], dict(labels, direction=direction))
+        for direction in ("sent", "received"):
+            sample("bytes_total", "counter", "HTTP body bytes",
+                   data[f"bytes_{direction}"], dict(labels, direction=direction))
+
+    lines = []
+    for family, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Format a label set as {key="value",...}, escaped as the text format requires"""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _quantile(values: List[float], quantile: float) -> float:
+    """Nearest-rank quantile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(quantile * len(values)))]
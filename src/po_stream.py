@@ -0,0 +1,311 @@
+"""
+PO Translator (PO翻译器) - Streaming PO Files
+Read PO files one entry at a time and write them back in order as entries are done
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import codecs
+import os
+import re
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import polib
+
+from checkpoint import match_file_mode
+
+_KEYWORDS = {"msgctxt": "ct", "msgid": "mi", "msgid_plural": "mp", "msgstr": "ms"}
+_PREVIOUS_KEYWORDS = {"msgctxt": "pc", "msgid": "pm", "msgid_plural": "pp"}
+# A quote preceded by an even number of backslashes (i.e. not escaped)
+UNESCAPED_QUOTE = re.compile(r'(?:^|[^\\])(?:\\\\)*"')
+# Entry fields continuation lines append to, by state
+_CONTINUED_FIELDS = {
+    "ct": "msgctxt", "mi": "msgid", "mp": "msgid_plural", "ms": "msgstr",
+    "pc": "previous_msgctxt", "pm": "previous_msgid", "pp": "previous_msgid_plural",
+}
+
+
+class POReader:
+    """
+    Reads a PO file one entry at a time
+
+    The header (comments and metadata) is read when the reader is created;
+    iterating yields the other entries as polib.POEntry objects, in file
+    order, while the rest of the file is still unread. Parsing follows
+    polib's rules, so the entries are the same as those of polib.pofile.
+
+    Usage:
+        with POReader("big.po") as reader:
+            language = reader.metadata.get("Language")
+            for entry in reader:
+                ...
+    """
+
+    def __init__(self, path: str, line_filter: Optional[Callable[[Iterable[str]], Iterator[str]]] = None):
+        """
+        Args:
+            path: Path to the PO file
+            line_filter: Function rewriting the lines as they are read (e.g. iter_sanitized_lines)
+
+        Raises:
+            IOError: If the file is not valid PO syntax (from the first line that is not)
+        """
+        self.path = path
+        self.header = ""
+        self.metadata: Dict[str, str] = {}
+        self.metadata_is_fuzzy: List[str] = []
+        self._file = open(path, 'r', encoding='utf-8')
+        lines = line_filter(self._file) if line_filter else self._file
+        self._entries = self._parse(lines)
+        self._first = self._read_header()
+
+    def __enter__(self) -> "POReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self) -> "POReader":
+        return self
+
+    def __next__(self) -> polib.POEntry:
+        # The reader is its own iterator, so reading can stop and resume (e.g. with islice)
+        if self._first is not None:
+            entry, self._first = self._first, None
+            return entry
+        return next(self._entries)
+
+    def close(self):
+        self._file.close()
+
+    def _read_header(self) -> Optional[polib.POEntry]:
+        """Take the metadata entry off the front; returns the first entry if it is not one"""
+        entry = next(self._entries, None)
+        if entry is None or entry.msgid or entry.msgctxt is not None or entry.obsolete:
+            return entry
+
+        self.metadata_is_fuzzy = entry.flags
+        key = None
+        for line in entry.msgstr.splitlines():
+            try:
+                key, value = line.split(':', 1)
+                self.metadata[key] = value.strip()
+            except (ValueError, KeyError):
+                if key is not None:
+                    self.metadata[key] += '\n' + line.strip()
+        return None
+
+    def _parse(self, lines: Iterable[str]) -> Iterator[polib.POEntry]:
+        """Run polib's state machine over the lines, yielding each entry once the next one begins"""
+        entry = polib.POEntry()
+        state = "st"
+        plural_index = 0
+        tokens = []
+
+        for number, line in enumerate(lines, 1):
+            if number == 1:
+                line = line.lstrip(codecs.BOM_UTF8.decode('utf-8'))
+            line = line.strip()
+            if not line:
+                continue
+
+            tokens = line.split(None, 2)
+            if tokens[0] == '#~|':
+                continue
+            obsolete = tokens[0] == '#~' and len(tokens) > 1
+            if obsolete:
+                line = line[3:].strip()
+                tokens = tokens[1:]
+
+            if tokens[0] in _KEYWORDS and len(tokens) > 1:
+                symbol = _KEYWORDS[tokens[0]]
+                token = line[len(tokens[0]):].lstrip()
+            elif tokens[0] == '#:':
+                if len(tokens) <= 1:
+                    continue
+                symbol, token = "oc", line
+            elif line[:1] == '"':
+                symbol, token = "mc", line
+            elif line[:7] == 'msgstr[':
+                symbol, token = "mx", line
+            elif tokens[0] == '#,':
+                if len(tokens) <= 1:
+                    continue
+                symbol, token = "fl", line
+            elif tokens[0] == '#' or tokens[0].startswith('##'):
+                symbol, token = "tc", line if line != '#' else '# '
+            elif tokens[0] == '#.':
+                if len(tokens) <= 1:
+                    continue
+                symbol, token = "gc", line
+            elif tokens[0] == '#|' and len(tokens) > 1:
+                token = line[2:].lstrip()
+                if tokens[1].startswith('"'):
+                    symbol = "mc"
+                elif len(tokens) > 2 and tokens[1] in _PREVIOUS_KEYWORDS:
+                    symbol = _PREVIOUS_KEYWORDS[tokens[1]]
+                    token = token[len(tokens[1]):].lstrip()
+                else:
+                    raise IOError(f"Syntax error in po file {self.path} (line {number})")
+            else:
+                raise IOError(f"Syntax error in po file {self.path} (line {number})")
+
+            if symbol == "tc" and state in ("st", "he"):
+                # Comments before anything else belong to the file header
+                self.header += ("\n" if self.header else "") + token[2:]
+                state = "he"
+                continue
+
+            if symbol not in ("mc", "mp", "ms", "mx") and state in ("ms", "mx"):
+                # A new entry begins
+                yield entry
+                entry = polib.POEntry()
+
+            if symbol == "tc":
+                comment = token.lstrip('#')
+                entry.tcomment += ("\n" if entry.tcomment else "") + (comment[1:] if comment.startswith(' ') else comment)
+            elif symbol == "gc":
+                entry.comment += ("\n" if entry.comment else "") + token[3:]
+            elif symbol == "oc":
+                for occurrence in token[3:].split():
+                    path, colon, lineno = occurrence.rpartition(':')
+                    if colon and lineno.isdigit():
+                        entry.occurrences.append((path, lineno))
+                    else:
+                        entry.occurrences.append((occurrence, ''))
+            elif symbol == "fl":
+                entry.flags += [flag.strip() for flag in token[3:].split(',')]
+            elif symbol == "mx":
+                plural_index = int(token[7:token.index(']')])
+                entry.msgstr_plural[plural_index] = _unquote(token[token.index('"'):], self.path, number)
+            elif symbol == "mc":
+                value = _unquote(token, self.path, number)
+                if state == "mx":
+                    entry.msgstr_plural[plural_index] += value
+                elif state in _CONTINUED_FIELDS:
+                    field = _CONTINUED_FIELDS[state]
+                    setattr(entry, field, getattr(entry, field) + value)
+                else:
+                    raise IOError(f"Syntax error in po file {self.path} (line {number})")
+                # A continuation doesn't change the state
+                continue
+            else:
+                if symbol == "mi":
+                    entry.obsolete = obsolete
+                setattr(entry, _CONTINUED_FIELDS[symbol], _unquote(token, self.path, number))
+            state = symbol
+
+        # Trailing comments are dropped, as polib does
+        if state != "st" and tokens and not tokens[0].startswith('#'):
+            yield entry
+
+
+def _unquote(token: str, path: str, number: int) -> str:
+    """Unescape a quoted PO string, rejecting unescaped inner quotes"""
+    inner = token[1:-1]
+    if len(token) < 2 or token[0] != '"' or token[-1] != '"' or UNESCAPED_QUOTE.search(inner):
+        raise IOError(f"Syntax error in po file {path} (line {number}): unescaped double quote found")
+    return polib.unescape(inner)
+
+
+class POWriter:
+    """
+    Writes a PO file entry by entry, in the original order
+
+    Entries are handed in with their position in the source file and may
+    arrive in any order; each is written as soon as every entry before it
+    has been. Obsolete entries go at the end, as polib writes them. The
+    file is written next to the target and renamed over it on close, so
+    the output is never left half-written; the result is the same as
+    polib's POFile.save.
+
+    Usage:
+        writer = POWriter("out.po", reader.header, metadata)
+        for index, entry in enumerate(entries):
+            writer.write(index, entry)
+        writer.close()
+    """
+
+    def __init__(self, output_file: str, header: str = "", metadata: Optional[Dict[str, str]] = None,
+                 metadata_is_fuzzy: Optional[List[str]] = None, wrapwidth: int = 0):
+        """
+        Args:
+            output_file: Path to the output PO file
+            header: Header comment of the file
+            metadata: Metadata of the header entry
+            metadata_is_fuzzy: Flags of the header entry
+            wrapwidth: Line wrapping width (0 to disable wrapping)
+        """
+        self.output_file = output_file
+        self.wrapwidth = wrapwidth
+        self.written = 0  # Entries written so far, i.e. the position the next one must have
+        self._pending: Dict[int, polib.POEntry] = {}
+        self._obsolete: List[polib.POEntry] = []
+
+        directory = os.path.dirname(os.path.abspath(output_file))
+        fd, self._tmp_path = tempfile.mkstemp(suffix=".po.tmp", dir=directory)
+        self._file = os.fdopen(fd, 'w', encoding='utf-8')
+
+        # The header comment and metadata entry, rendered by polib
+        head = polib.POFile(wrapwidth=wrapwidth)
+        head.header = header
+        head.metadata = dict(metadata or {})
+        head.metadata_is_fuzzy = list(metadata_is_fuzzy or [])
+        self._file.write(str(head))
+
+    def write(self, index: int, entry: polib.POEntry):
+        """
+        Hand in the entry at a position of the source file
+
+        Args:
+            index: 0-based position of the entry, not counting the header
+            entry: The entry as it is to be written
+        """
+        self._pending[index] = entry
+        while self.written in self._pending:
+            self._emit(self._pending.pop(self.written))
+            self.written += 1
+
+    def close(self):
+        """
+        Write the obsolete entries and move the file into place
+
+        Raises:
+            ValueError: If entries before the last one handed in are missing
+        """
+        if self._pending:
+            self.abort()
+            raise ValueError(f"Missing entry {self.written} of {self.output_file}")
+        for entry in self._obsolete:
+            self._file.write("\n" + entry.__unicode__(self.wrapwidth))
+        self._file.close()
+        match_file_mode(self._tmp_path, self.output_file)
+        os.replace(self._tmp_path, self.output_file)
+
+    def abort(self):
+        """Discard the partly written file"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+    def _emit(self, entry: polib.POEntry):
+        if entry.obsolete:
+            self._obsolete.append(entry)
+        else:
+            self._file.write("\n" + entry.__unicode__(self.wrapwidth))
@@ -26,13 +26,31 @@ Organization: Zokin Design, LLC. (上海左晶多媒体设计有限公司)
 
 import polib
 import requests
+from requests.adapters import HTTPAdapter
+import copy
 import json
 import os
 import re
+import sys
+import threading
+import time
 import urllib3
-from typing import List, Dict, Optional, Callable
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional, Callable
 from urllib.parse import quote, unquote
 
+from checkpoint import CheckpointJournal, atomic_save, journal_path
+from error_policy import BatchError, ErrorPolicy, classify_request_error
+from metrics import RunMetrics, current_metrics, timed_phase
+from po_stream import UNESCAPED_QUOTE, POReader, POWriter
+from providers import SYSTEM_PROMPT, get_adapter
+from rate_limit import RateLimiter, backoff_delay, parse_retry_after
+from translation_memory import TranslationMemory
+
 # Disable SSL warnings for Huawei Cloud MaaS
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -40,123 +58,1850 @@ __version__ = "1.0.0"
 __author__ = "LI, Fang (黎昉)"
 __organization__ = "Zokin Design, LLC. (上海左晶多媒体设计有限公司)"
 
+# Known completion token limits per model; other models use DEFAULT_MAX_OUTPUT_TOKENS
+MODEL_OUTPUT_TOKENS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-4": 4096,
+    "gpt-4-turbo": 4096,
+    "gpt-4o": 16384,
+    "gpt-4o-mini": 16384,
+    "deepseek-chat": 8192,
+    "deepseek-coder": 8192,
+    "deepseek-v3.2": 8192,
+    "moonshot-v1-8k": 4096,
+    "qwen-turbo": 8192,
+    "qwen-plus": 8192,
+    "qwen-max": 8192,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 4000
+# Fewest completion tokens worth sending a request for
+MIN_OUTPUT_TOKENS = 256
+# Known context windows (prompt and completion together); max_tokens is capped to what the prompt leaves
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "deepseek-chat": 65536,
+    "deepseek-coder": 16384,
+    "moonshot-v1-8k": 8192,
+    "qwen-max": 32768,
+}
+
+# CJK and other wide scripts are roughly one token per character
+_WIDE_CHARS = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+_NUMBERED_LINE = re.compile(r'^(\d+)\.\s*(.*)$')
+# Lines like: msgid "...", msgstr "...", msgctxt "...", msgstr[0] "...",
+# or continuation lines that start with "
+_KEYWORD_LINE = re.compile(r'^((?:msgid|msgstr|msgctxt)(?:\[\d+\])?\s+)"(.*)"\s*$')
+_CONTINUATION_LINE = re.compile(r'^"(.*)"\s*$')
+# An escape sequence (backslash plus the next character) or a bare quote
+_QUOTE_OR_ESCAPE = re.compile(r'\\.?|"', re.DOTALL)
+# "id": "translation" pairs, used to salvage truncated JSON responses
+_JSON_PAIR = re.compile(r'"(\d+)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Translation protocols: numbered list lines, or an id-keyed JSON object
+PROTOCOLS = ("numbered", "json")
+
+# gettext Plural-Forms headers of the supported target languages
+PLURAL_FORMS = {
+    "en": "nplurals=2; plural=(n != 1);",
+    "zh": "nplurals=1; plural=0;",
+    "es": "nplurals=2; plural=(n != 1);",
+    "fr": "nplurals=2; plural=(n > 1);",
+    "de": "nplurals=2; plural=(n != 1);",
+    "ja": "nplurals=1; plural=0;",
+    "ko": "nplurals=1; plural=0;",
+    "ru": "nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);",
+    "it": "nplurals=2; plural=(n != 1);",
+    "pt": "nplurals=2; plural=(n != 1);",
+    "pt-BR": "nplurals=2; plural=(n > 1);",
+    "ar": "nplurals=6; plural=(n==0 ? 0 : n==1 ? 1 : n==2 ? 2 : n%100>=3 && n%100<=10 ? 3 : n%100>=11 ? 4 : 5);",
+    "hi": "nplurals=2; plural=(n != 1);",
+    "th": "nplurals=1; plural=0;",
+    "vi": "nplurals=1; plural=0;",
+    "id": "nplurals=1; plural=0;",
+    "nl": "nplurals=2; plural=(n != 1);",
+    "pl": "nplurals=3; plural=(n==1 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);",
+    "tr": "nplurals=2; plural=(n != 1);",
+    "uk": "nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);",
+}
+_NPLURALS = re.compile(r'nplurals\s*=\s*(\d+)')
+
+
+def iter_sanitized_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Escape unescaped double quotes in msgid, msgstr, and msgctxt lines, one line at a time
+
+    Some PO files in the wild contain unescaped inner quotes, e.g.:
+        msgctxt "Colloquial alternative to "learn about BuddyPress""
+    This is invalid per the GNU gettext spec and causes parsers like
+    polib to reject the file. Such lines are rewritten as:
+        msgctxt "Colloquial alternative to \\"learn about BuddyPress\\""
+
+    Works as a generator, so files of any size are processed without
+    holding all of their lines in memory.
+
+    Args:
+        lines: Lines of a PO file, e.g. an open file object
+
+    Yields:
+        Sanitized lines
+    """
+    for line in lines:
+        # Only keyword lines (msg...) and continuation lines (") carry strings
+        if not line.startswith(('msg', '"')):
+            yield line
+            continue
+
+        keyword_match = _KEYWORD_LINE.match(line)
+        if keyword_match:
+            prefix = keyword_match.group(1)
+            content = _escape_inner_quotes(keyword_match.group(2))
+            yield f'{prefix}"{content}"\n'
+            continue
+
+        cont_match = _CONTINUATION_LINE.match(line)
+        if cont_match:
+            content = _escape_inner_quotes(cont_match.group(1))
+            yield f'"{content}"\n'
+        else:
+            yield line
+
+
+def sanitize_po_file(input_path: str, output_path: str) -> None:
+    """
+    Pre-process a PO file to escape unescaped double quotes inside
+    msgid, msgstr, and msgctxt string values.
+
+    See iter_sanitized_lines for the rewriting rules.
+
+    Args:
+        input_path: Path to the (possibly malformed) PO file
+        output_path: Path to write the sanitized PO file
+    """
+    in_place = os.path.abspath(input_path) == os.path.abspath(output_path)
+    target = output_path + ".tmp" if in_place else output_path
+
+    with open(input_path, 'r', encoding='utf-8') as src, open(target, 'w', encoding='utf-8') as dst:
+        dst.writelines(iter_sanitized_lines(src))
+
+    if in_place:
+        os.replace(target, output_path)
+
+
+def load_po_file(input_path: str) -> polib.POFile:
+    """
+    Sanitize and parse a PO file without writing an intermediate file
+
+    Args:
+        input_path: Path to the (possibly malformed) PO file
+
+    Returns:
+        Parsed polib.POFile
+    """
+    with timed_phase("sanitize"), open(input_path, 'r', encoding='utf-8') as f:
+        content = ''.join(iter_sanitized_lines(f))
+    # polib parses a string argument as file content
+    with timed_phase("parse"):
+        return polib.pofile(content)
+
+
+def stream_po_file(input_path: str) -> POReader:
+    """
+    Open a PO file to read it entry by entry, sanitizing lines as they are read
+
+    Only the header is parsed up front; see POReader.
+
+    Args:
+        input_path: Path to the (possibly malformed) PO file
+
+    Returns:
+        Reader yielding the entries after the header
+    """
+    return POReader(input_path, iter_sanitized_lines)
+
+
+def is_complete(stats: Dict) -> bool:
+    """Whether a run's statistics show every text translated (not stopped, nothing failed or unsent)"""
+    return not (stats["stopped"] or stats["failed"] or stats["unsent"])
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text
+
+    Counts about four characters per token for Latin text and one token per
+    CJK character, which is close enough for packing batches.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count
+    """
+    wide = len(_WIDE_CHARS.findall(text))
+    return (len(text) - wide + 3) // 4 + wide + 1
+
+
+def plural_forms_for(target_lang: str, header: Optional[str] = None) -> str:
+    """
+    Get the Plural-Forms header for a target language
+
+    Known languages use their standard rule. Otherwise the catalog's own
+    header is kept if it is filled in, falling back to the English rule.
+
+    Args:
+        target_lang: Target language code (e.g. "ru", "pt-BR", "zh_CN")
+        header: Plural-Forms header of the catalog, if any
+
+    Returns:
+        Plural-Forms header value
+    """
+    rule = PLURAL_FORMS.get(target_lang) or PLURAL_FORMS.get(re.split(r'[-_]', target_lang)[0])
+    if rule:
+        return rule
+    if header and _NPLURALS.search(header):
+        return header
+    return PLURAL_FORMS["en"]
+
+
+def nplurals_of(plural_forms: str) -> int:
+    """Get the number of plural forms from a Plural-Forms header"""
+    match = _NPLURALS.search(plural_forms)
+    return max(1, int(match.group(1))) if match else 2
+
+
+class PluralText(str):
+    """
+    Source text of a plural entry, batched like any other text
+
+    The string value is a JSON array of the singular and plural msgids; the
+    expected translation is a JSON array with one string per plural form of
+    the target language.
+    """
+
+    def __new__(cls, msgid: str, msgid_plural: str, nplurals: int):
+        text = super().__new__(cls, json.dumps([msgid, msgid_plural], ensure_ascii=False))
+        text.nplurals = nplurals
+        return text
+
+    @property
+    def forms(self) -> List[str]:
+        """Singular and plural msgid"""
+        return json.loads(self)
+
+
+class HintedText(str):
+    """
+    Text sent together with the translation of a similar earlier string
+
+    The prompt shows the hint so the model can reuse its wording.
+    """
+
+    def __new__(cls, text: str, hint_msgid: str, hint_msgstr: str):
+        hinted = super().__new__(cls, text)
+        hinted.hint = (hint_msgid, hint_msgstr)
+        return hinted
+
+
+def parse_plural_translation(translation: str, nplurals: int) -> Optional[str]:
+    """
+    Validate the translation of a plural entry
+
+    Args:
+        translation: Model output for a PluralText, expected to be a JSON array
+        nplurals: Number of plural forms of the target language
+
+    Returns:
+        Canonical JSON array of exactly `nplurals` strings, or None if the
+        output does not have that shape
+    """
+    try:
+        forms = json.loads(translation, strict=False)
+    except ValueError:
+        # A language without plural distinctions may come back as a bare string
+        forms = [translation] if nplurals == 1 and translation.strip() else None
+    if (not isinstance(forms, list) or len(forms) != nplurals
+            or not all(isinstance(form, str) and form for form in forms)):
+        return None
+    return json.dumps(forms, ensure_ascii=False)
+
+
+def entry_source_text(entry: polib.POEntry, nplurals: int) -> str:
+    """Get the text to translate for an entry (a PluralText for plural entries)"""
+    if entry.msgid_plural:
+        return PluralText(entry.msgid, entry.msgid_plural, nplurals)
+    return entry.msgid
+
+
+def is_entry_translated(entry: polib.POEntry) -> bool:
+    """Whether an entry already has a translation (every form of a plural entry)"""
+    if entry.msgid_plural:
+        return bool(entry.msgstr_plural) and all(entry.msgstr_plural.values())
+    return bool(entry.msgstr)
+
+
+def set_entry_translation(entry: polib.POEntry, translation: str, nplurals: int):
+    """
+    Write a translation to an entry
+
+    For plural entries the translation is a JSON array of plural forms, as
+    produced by parse_plural_translation. Anything else leaves a plural
+    entry untranslated.
+    """
+    if not entry.msgid_plural:
+        entry.msgstr = translation
+        return
+    try:
+        forms = json.loads(translation)
+    except ValueError:
+        return
+    if isinstance(forms, list) and len(forms) == nplurals:
+        entry.msgstr_plural = {i: form for i, form in enumerate(forms)}
+
+
+def parse_numbered_translations(content: str, texts: List[str], truncated: bool = False) -> List[Optional[str]]:
+    """
+    Map a numbered-list response back onto the requested texts
+
+    Lines are matched to texts by their number, so a missing line only
+    affects its own text instead of shifting every later result. A line
+    without a number continues the previous translation when that source
+    text spans several lines, and is ignored otherwise.
+
+    Args:
+        content: Response text in "1. ...", "2. ..." format
+        texts: Texts that were sent for translation
+        truncated: Whether the response was cut off at the token limit
+
+    Returns:
+        Translations in the order of `texts`, with None for texts that got no translation
+    """
+    translations = [None] * len(texts)
+    current = None
+    unnumbered = []
+
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = _NUMBERED_LINE.match(line)
+        if match and 1 <= int(match.group(1)) <= len(texts):
+            current = int(match.group(1)) - 1
+            translations[current] = match.group(2).strip()
+        elif current is not None:
+            if '\n' in texts[current]:
+                translations[current] += '\n' + line
+        else:
+            unnumbered.append(line)
+
+    if current is None:
+        # No numbering at all (e.g. a single text); take one translation per line
+        for i, line in enumerate(unnumbered[:len(texts)]):
+            translations[i] = line
+    elif truncated:
+        # The last translation may have been cut off mid-sentence
+        translations[current] = None
+
+    return translations
+
+
+def parse_json_translations(content: str, texts: List[str]) -> List[Optional[str]]:
+    """
+    Map an id-keyed JSON response back onto the requested texts
+
+    Accepts an object mapping ids to translations, optionally wrapped in a
+    Markdown code fence. If the JSON is cut off, every complete
+    "id": "translation" pair before the cut is still used.
+
+    Args:
+        content: Response text, e.g. {"1": "...", "2": "..."}
+        texts: Texts that were sent for translation
+
+    Returns:
+        Translations in the order of `texts`, with None for ids missing from the response
+    """
+    translations = [None] * len(texts)
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+
+    try:
+        data = json.loads(content, strict=False)
+        pairs = data.items() if isinstance(data, dict) else []
+    except ValueError:
+        pairs = []
+        for key, value in _JSON_PAIR.findall(content):
+            try:
+                pairs.append((key, json.loads(f'"{value}"', strict=False)))
+            except ValueError:
+                continue
+
+    for key, value in pairs:
+        key = str(key)
+        if not (key.isdigit() and 1 <= int(key) <= len(texts)):
+            continue
+        if isinstance(value, str):
+            translations[int(key) - 1] = value
+        elif isinstance(value, list):
+            # Plural forms
+            translations[int(key) - 1] = json.dumps(value, ensure_ascii=False)
+
+    return translations
+
+
+class StreamParser:
+    """
+    Picks complete translations out of a response while it streams in
+
+    Feed it the text deltas as they arrive. A numbered translation counts
+    as complete once the next numbered line starts (a translation may span
+    several lines), a JSON pair once its closing quote has arrived. Plural
+    arrays in JSON responses are only picked up by finish().
+    """
+
+    def __init__(self, protocol: str, texts: List[str]):
+        self.protocol = protocol
+        self.texts = texts
+        self.content = ""
+        self.emitted = set()
+
+    def feed(self, delta: str) -> List[tuple]:
+        """
+        Add a piece of the response
+
+        Returns:
+            List of (text index, translation) pairs completed by this piece
+        """
+        self.content += delta
+        if self.protocol == "json":
+            if '"' not in delta:
+                return []
+            translations = parse_json_translations(self.content, self.texts)
+        else:
+            if '\n' not in delta:
+                return []
+            complete = self.content[:self.content.rfind('\n')]
+            translations = parse_numbered_translations(complete, self.texts)
+            # The last numbered translation may still continue on the next line
+            last = None
+            for line in complete.split('\n'):
+                match = _NUMBERED_LINE.match(line.strip())
+                if match and 1 <= int(match.group(1)) <= len(self.texts):
+                    last = int(match.group(1)) - 1
+            if last is None:
+                return []
+            translations[last] = None
+
+        completed = []
+        for i, translation in enumerate(translations):
+            if translation is not None and i not in self.emitted:
+                self.emitted.add(i)
+                completed.append((i, translation))
+        return completed
+
+    def finish(self, truncated: bool = False) -> List[Optional[str]]:
+        """
+        Parse the whole response once the stream has ended
+
+        Args:
+            truncated: Whether the response was cut off, at the token limit or by a broken connection
+
+        Returns:
+            Translations in the order of `texts`, with None for texts that got no translation
+        """
+        if self.protocol == "json":
+            return parse_json_translations(self.content, self.texts)
+        return parse_numbered_translations(self.content.strip(), self.texts, truncated)
+
+
+class ContextWindowError(ValueError):
+    """A prompt leaves too little of the model's context window for the completion"""
+
+
+class BatchPlanner:
+    """
+    Packs texts into batches by item count and estimated token budget
+
+    Texts are handed out in order as lists of item ids. A batch closes when
+    it reaches `max_items`, or when adding the next text would exceed the
+    input or expected output token budget, or the two together would not
+    fit the model's context window. The budget is shrunk whenever a
+    response comes back truncated or incomplete, so later batches fit.
+    """
+
+    # Expected output tokens per input token, and per-item numbering overhead
+    OUTPUT_RATIO = 2.0
+    ITEM_OVERHEAD = 4
+    # Never shrink below this fraction of the configured budget
+    MIN_BUDGET_RATIO = 0.125
+    # Share of the token limits planned for, leaving headroom for estimation error
+    HEADROOM = 0.8
+
+    def __init__(
+        self,
+        token_counts: List[int],
+        max_items: int,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        context_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            token_counts: Estimated input tokens of each text
+            max_items: Maximum number of texts per batch
+            max_input_tokens: Input token budget per batch (None for no limit)
+            max_output_tokens: Completion token limit of the model (None for no limit)
+            context_tokens: Context window of the model, shared by prompt and completion (None for no limit)
+        """
+        self.token_counts = token_counts
+        self.max_items = max(1, max_items)
+        self.max_input_tokens = max_input_tokens
+        # Leave headroom for estimation error (and, in the context window, the instructions)
+        self.max_output_tokens = int(max_output_tokens * self.HEADROOM) if max_output_tokens else None
+        self.context_tokens = int(context_tokens * self.HEADROOM) if context_tokens else None
+        self.scale = 1.0
+        self._queue = deque(range(len(token_counts)))
+
+    def has_next(self) -> bool:
+        """Whether any texts are left to hand out"""
+        return bool(self._queue)
+
+    def next_batch(self) -> List[int]:
+        """
+        Take the next batch of item ids
+
+        Always returns at least one item, even if it alone exceeds the budget.
+        """
+        batch = []
+        input_tokens = 0
+        output_tokens = 0
+
+        while self._queue and len(batch) < self.max_items:
+            tokens, expected = self._cost(self._queue[0])
+            if batch and self._over_budget(input_tokens + tokens, output_tokens + expected):
+                break
+            batch.append(self._queue.popleft())
+            input_tokens += tokens
+            output_tokens += expected
+
+        return batch
+
+    def estimate_batches(self) -> int:
+        """Estimate how many batches the remaining texts will take"""
+        count = 0
+        size = 0
+        input_tokens = 0
+        output_tokens = 0
+
+        for item in self._queue:
+            tokens, expected = self._cost(item)
+            if size and (size >= self.max_items
+                         or self._over_budget(input_tokens + tokens, output_tokens + expected)):
+                count += 1
+                size = input_tokens = output_tokens = 0
+            size += 1
+            input_tokens += tokens
+            output_tokens += expected
+
+        return count + (1 if size else 0)
+
+    def shrink(self):
+        """Halve the token budget after a truncated or incomplete response"""
+        self.scale = max(self.MIN_BUDGET_RATIO, self.scale / 2)
+        if not (self.max_input_tokens or self.max_output_tokens or self.context_tokens):
+            # Only an item count to go by; shrink that instead
+            self.max_items = max(1, self.max_items // 2)
+
+    def requeue(self, items: List[int]):
+        """
+        Put items back at the front of the queue
+
+        They are merged into the next batch instead of being retried on their own.
+        """
+        self._queue.extendleft(reversed(items))
+
+    def remaining(self) -> int:
+        """Number of texts not yet handed out"""
+        return len(self._queue)
+
+    def _cost(self, item: int) -> tuple:
+        """Estimated (input tokens, output tokens) of one item"""
+        tokens = self.token_counts[item] + self.ITEM_OVERHEAD
+        return tokens, tokens * self.OUTPUT_RATIO
+
+    def _over_budget(self, input_tokens: float, output_tokens: float) -> bool:
+        if self.max_input_tokens and input_tokens > self.max_input_tokens * self.scale:
+            return True
+        if self.max_output_tokens and output_tokens > self.max_output_tokens * self.scale:
+            return True
+        if self.context_tokens and input_tokens + output_tokens > self.context_tokens * self.scale:
+            return True
+        return False
+
+
+def _escape_inner_quotes(content: str) -> str:
+    """
+    Escape any unescaped double quotes in a PO string value.
+    Already-escaped quotes (\\") are left untouched.
+    """
+    # Nearly every line is already valid; leave those untouched
+    if '"' not in content or not UNESCAPED_QUOTE.search(content):
+        return content
+    # Escape sequences are matched as a unit, so only bare quotes are rewritten
+    return _QUOTE_OR_ESCAPE.sub(_escape_quote_match, content)
+
+
+def _escape_quote_match(match) -> str:
+    token = match.group()
+    return '\\"' if token == '"' else token
+
+
+def _intern(text: str) -> str:
+    """Intern a plain string; str subclasses carrying metadata are returned as they are"""
+    return sys.intern(text) if type(text) is str else text
+
+
+def _body_size(body) -> int:
+    """Size of an HTTP body, or 0 if it is not in memory"""
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def _fork_catalog(po: polib.POFile, indices: Iterable[int]) -> polib.POFile:
+    """
+    Copy a catalog so the entries at `indices` can be translated separately
+
+    Only those entries are copied; the others are shared with `po` and must
+    not be modified.
+    """
+    fork = copy.copy(po)
+    fork.metadata = dict(po.metadata)
+    for i in indices:
+        entry = copy.copy(po[i])
+        entry.msgstr_plural = dict(entry.msgstr_plural)
+        fork[i] = entry
+    return fork
+
+
+def merge_catalog(template: polib.POFile, previous: polib.POFile) -> tuple:
+    """
+    Carry the translations of a previous catalog over to a new template
+
+    Entries are matched through a hash index on (msgctxt, msgid). Matched
+    entries keep their translation, fuzzy flag and translator comments;
+    an entry whose msgid_plural changed is translated again. Entries no
+    longer in the template are dropped.
+
+    Args:
+        template: New template (POT), left unmodified
+        previous: Previously translated catalog
+
+    Returns:
+        Tuple of (merged catalog, dictionary with added, changed, removed and carried counts)
+    """
+    index = {(entry.msgctxt, entry.msgid): entry for entry in previous if not entry.obsolete}
+    merged = _fork_catalog(template, range(len(template)))
+    merged.metadata = dict(previous.metadata)
+    for key in ("Project-Id-Version", "POT-Creation-Date"):
+        if key in template.metadata:
+            merged.metadata[key] = template.metadata[key]
+
+    changes = {"added": 0, "changed": 0, "removed": 0, "carried": 0}
+    for entry in merged:
+        if entry.obsolete:
+            continue
+        old = index.pop((entry.msgctxt, entry.msgid), None)
+        if old is None:
+            changes["added"] += 1
+        elif old.msgid_plural != entry.msgid_plural:
+            changes["changed"] += 1
+        elif is_entry_translated(old) or "fuzzy" in old.flags:
+            entry.msgstr = old.msgstr
+            entry.msgstr_plural = dict(old.msgstr_plural)
+            entry.tcomment = old.tcomment
+            if "fuzzy" in old.flags and "fuzzy" not in entry.flags:
+                entry.flags = entry.flags + ["fuzzy"]
+            changes["carried"] += 1
+    changes["removed"] = len(index)
+    return merged, changes
+
+
+class EntryGroups:
+    """
+    Entry indices each work item applies to, packed into flat arrays
+
+    Item k applies to entries[starts[k]:starts[k + 1]]. A list of lists
+    costs a list object per item and an int object per index; the arrays
+    cost 4 bytes per index. When the catalog is released (see
+    POTranslator.set_low_memory) the msgctxt of every entry is kept
+    alongside, interned, since translation memory records need it.
+    """
+
+    __slots__ = ("entries", "starts", "contexts")
+
+    def __init__(self, groups: Iterable[Iterable[int]] = ()):
+        self.entries = array("I")
+        self.starts = array("I", [0])
+        self.contexts: Optional[List[Optional[str]]] = None
+        for group in groups:
+            self.entries.extend(group)
+            self.starts.append(len(self.entries))
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __getitem__(self, item: int) -> array:
+        return self.entries[self.starts[item]:self.starts[item + 1]]
+
+    def keep_contexts(self, po: polib.POFile):
+        """Copy the msgctxt of every grouped entry, so the catalog is no longer needed for them"""
+        self.contexts = [
+            sys.intern(po[idx].msgctxt) if po[idx].msgctxt else None for idx in self.entries
+        ]
+
+    def context_of(self, item: int, po: Optional[polib.POFile]) -> List[Optional[str]]:
+        """Get the msgctxt of each entry of an item, from the catalog or the kept copies"""
+        if self.contexts is not None:
+            return self.contexts[self.starts[item]:self.starts[item + 1]]
+        return [po[idx].msgctxt for idx in self[item]]
+
+
+class TranslationRun:
+    """
+    Work list and bookkeeping of one PO file translation
+
+    Holds the unique texts still to translate, the entries each of them
+    fans out to, per-item attempt counts and the batch planner, and applies
+    batch results to the catalog. The engine decides how batches are sent.
+
+    With a `reload` function and POTranslator.low_memory set, the catalog
+    is released once the work list is built: translations are collected
+    per item and applied to a freshly loaded catalog when saving.
+    """
+
+    def __init__(
+        self,
+        translator: "POTranslator",
+        po: polib.POFile,
+        output_file: str,
+        source_lang: str,
+        target_lang: str,
+        progress_callback: Optional[Callable] = None,
+        metrics: Optional[RunMetrics] = None,
+        reload: Optional[Callable[[], polib.POFile]] = None,
+        sink: Optional[Callable[[polib.POFile], None]] = None
+    ):
+        """
+        Args:
+            translator: Translator whose settings the run uses
+            po: Parsed catalog to translate in place
+            output_file: Path to output PO file
+            source_lang: Source language code
+            target_lang: Target language code
+            progress_callback: Optional callback function for progress updates
+            metrics: Metrics to record into, e.g. holding the time spent loading the catalog
+            reload: Function loading the same catalog again, so it can be released in low-memory mode
+            sink: Function taking the translated catalog instead of saving it to `output_file`,
+                e.g. for a window of a streamed file; the journal is then left to the caller
+        """
+        self.translator = translator
+        self.po = po
+        self.reload = reload
+        self.sink = sink
+        self.output_file = output_file
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.progress_callback = progress_callback
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.stats = {
+            "total": len(po),
+            "translated": 0,
+            "fuzzy": 0,
+            "untranslated": 0,
+            "errors": 0,
+            "resumed": 0,
+            "requeued": 0,
+            "deferred": 0,
+            "failed": 0,
+            "unsent": 0,
+            "stopped": False,
+            "plural": 0,
+            "attempts": {}
+        }
+        self.plural_forms = plural_forms_for(target_lang, po.metadata.get("Plural-Forms"))
+        self.nplurals = nplurals_of(self.plural_forms)
+        self.journal = None  # Created by prepare() unless shared by the caller
+        self.resumed: Dict[tuple, str] = {}  # Journaled translations of an interrupted run
+        self.texts: List[str] = []  # Unique texts still to translate
+        self.entry_groups = EntryGroups()  # Entry indices each text is applied to
+        self.attempts = array("i")
+        self.filled: Optional[Dict[int, tuple]] = None  # Released catalog: entry index -> (msgstr, fuzzy)
+        self.results: Optional[Dict[int, str]] = None  # Released catalog: item -> translation
+        self.planner = None
+        self.batch_count = 0
+        self.total_batches = 0
+        self.stopped = False  # Set when the run was stopped before all its texts were done
+        self.deferred = []  # Items that failed, retried once the rest of the run is done
+        self.deferring = False  # Whether the deferred items are being retried
+        self._streamed = set()  # Items already applied while their response streamed in
+        self._apply_lock = threading.Lock()
+        self._completed = 0
+        self._progress_lock = threading.Lock()
+
+    @staticmethod
+    def scan(po: polib.POFile) -> tuple:
+        """
+        Find the entries of a catalog that need translating
+
+        Translated and fuzzy entries and entries with an empty msgid are skipped.
+
+        Returns:
+            Tuple of (entry indices to translate, translated count, fuzzy count)
+        """
+        entry_indices = []
+        translated = 0
+        fuzzy = 0
+
+        for i, entry in enumerate(po):
+            # Skip entries that are already translated
+            if is_entry_translated(entry) and not entry.obsolete:
+                translated += 1
+                continue
+
+            # Skip fuzzy translations
+            if "fuzzy" in entry.flags:
+                fuzzy += 1
+                continue
+
+            # Skip empty msgid
+            if not entry.msgid or not entry.msgid.strip():
+                continue
+
+            entry_indices.append(i)
+
+        return entry_indices, translated, fuzzy
+
+    def prepare(self, resume: bool = False, scanned: Optional[tuple] = None):
+        """
+        Build the work list: resume from the journal, skip translated and
+        fuzzy entries, serve translation memory hits and deduplicate
+
+        Args:
+            resume: Reuse translations journaled by an interrupted run for the same output file
+            scanned: Result of scan() on the catalog, if it was already scanned
+        """
+        translator = self.translator
+        po = self.po
+        stats = self.stats
+        releasing = translator.low_memory and self.reload is not None
+        # Entries filled in here, to fill in again after reloading a released catalog
+        self.filled = {} if releasing else None
+
+        # Pick up where an interrupted run left off
+        if translator.checkpointing and self.journal is None:
+            self.journal = CheckpointJournal(
+                self.output_file, self.source_lang, self.target_lang,
+                translator.checkpoint_every_batches, translator.checkpoint_every_seconds
+            )
+            self.resumed = self.journal.load() if resume else {}
+            self.journal.start(self.resumed)
+        if self.resumed:
+            for i, entry in enumerate(po):
+                if not is_entry_translated(entry):
+                    msgstr = self.resumed.get((entry.msgctxt, entry_source_text(entry, self.nplurals)))
+                    if msgstr is not None:
+                        self._fill(i, msgstr)
+                        stats["resumed"] += 1
+
+        # Collect texts to translate
+        if scanned is None:
+            with self.metrics.phase("scan"):
+                scanned = self.scan(po)
+        scanned_indices, translated, fuzzy = scanned
+        entry_indices = [i for i in scanned_indices if not is_entry_translated(po[i])]
+        stats["translated"] = translated + len(scanned_indices) - len(entry_indices)
+        stats["fuzzy"] = fuzzy
+
+        # Plural entries go as one text with all their forms; interned, so the
+        # same string held by other catalogs in this process is stored once
+        texts_to_translate = [_intern(entry_source_text(po[i], self.nplurals)) for i in entry_indices]
+        stats["plural"] = sum(1 for i in entry_indices if po[i].msgid_plural)
+
+        stats["untranslated"] = len(texts_to_translate)
+        stats["cache_hits"] = 0
+        stats["cache_misses"] = 0
+
+        # Serve strings translated in earlier runs from the translation memory
+        memory = translator.translation_memory
+        if memory is not None and texts_to_translate:
+            with self.metrics.phase("memory_lookup"):
+                cached = memory.lookup_many(
+                    [(text, po[idx].msgctxt) for text, idx in zip(texts_to_translate, entry_indices)],
+                    self.source_lang, self.target_lang, translator.model
+                )
+            remaining_texts = []
+            remaining_indices = []
+            for text, idx in zip(texts_to_translate, entry_indices):
+                translation = cached.get((text, po[idx].msgctxt))
+                if translation is not None and isinstance(text, PluralText):
+                    # Stored for another number of plural forms (or malformed): translate again
+                    translation = parse_plural_translation(translation, text.nplurals)
+                if translation is None:
+                    remaining_texts.append(text)
+                    remaining_indices.append(idx)
+                else:
+                    self._fill(idx, translation)
+            stats["cache_hits"] = len(texts_to_translate) - len(remaining_texts)
+            stats["cache_misses"] = len(remaining_texts)
+            texts_to_translate = remaining_texts
+            entry_indices = remaining_indices
+
+        # Group entries sharing the same string so each is only paid for once
+        entry_groups = []
+        if translator.deduplicate:
+            groups = {}
+            unique_texts = []
+            for text, idx in zip(texts_to_translate, entry_indices):
+                key = (isinstance(text, PluralText), text)
+                if not translator.dedup_ignore_context:
+                    key += (po[idx].msgctxt,)
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = []
+                    unique_texts.append(text)
+                    entry_groups.append(group)
+                group.append(idx)
+            texts_to_translate = unique_texts
+        else:
+            entry_groups = [[idx] for idx in entry_indices]
+
+        stats["unique"] = len(texts_to_translate)
+        stats["dedup_ratio"] = (
+            round(len(entry_indices) / len(texts_to_translate), 2) if texts_to_translate else 1.0
+        )
+
+        # Near matches from the translation memory: fill in close ones, hint the rest
+        stats["fuzzy_filled"] = 0
+        stats["fuzzy_hints"] = 0
+        thresholds = [t for t in (translator.fuzzy_hint_threshold, translator.fuzzy_fill_threshold) if t]
+        if memory is not None and thresholds and texts_to_translate:
+            remaining_texts = []
+            remaining_groups = []
+            for text, group in zip(texts_to_translate, entry_groups):
+                with self.metrics.phase("fuzzy_lookup"):
+                    matches = [] if isinstance(text, PluralText) else memory.fuzzy_lookup(
+                        text, self.source_lang, self.target_lang, translator.model, min(thresholds)
+                    )
+                if matches:
+                    similarity, match_msgid, match_msgstr = matches[0]
+                    if translator.fuzzy_fill_threshold and similarity >= translator.fuzzy_fill_threshold:
+                        for idx in group:
+                            self._fill(idx, match_msgstr, fuzzy=True)
+                        stats["fuzzy_filled"] += 1
+                        continue
+                    if translator.fuzzy_hint_threshold and similarity >= translator.fuzzy_hint_threshold:
+                        text = HintedText(text, match_msgid, match_msgstr)
+                        stats["fuzzy_hints"] += 1
+                remaining_texts.append(text)
+                remaining_groups.append(group)
+            texts_to_translate = remaining_texts
+            entry_groups = remaining_groups
+
+        self.texts = texts_to_translate
+        self.entry_groups = EntryGroups(entry_groups)
+        self.attempts = array("i", [0]) * len(texts_to_translate)
+        # Attempts allowed per item, and attempts made before the deferred round
+        self.budgets = array("i", [translator.max_attempts]) * len(texts_to_translate)
+        self.attempt_offsets = array("i", [0]) * len(texts_to_translate)
+        self.planner = BatchPlanner(
+            [translator.token_estimator(text) for text in texts_to_translate],
+            translator.batch_size,
+            translator.max_input_tokens,
+            translator.get_max_output_tokens(),
+            MODEL_CONTEXT_TOKENS.get(translator.model)
+        )
+        self.total_batches = self.planner.estimate_batches()
+
+        if releasing:
+            self.release()
+
+    def _fill(self, idx: int, msgstr: str, fuzzy: bool = False):
+        """Fill in an entry while preparing, remembering it if the catalog will be released"""
+        entry = self.po[idx]
+        if fuzzy:
+            entry.msgstr = msgstr
+            entry.flags = entry.flags + ["fuzzy"]
+        else:
+            set_entry_translation(entry, msgstr, self.nplurals)
+        if self.filled is not None:
+            self.filled[idx] = (msgstr, fuzzy)
+
+    def release(self):
+        """
+        Drop the catalog while requests are in flight
+
+        What is left is the work list: the texts, their entry indices and
+        contexts, and the entries filled in while preparing. Translations
+        are collected per item until finish() applies them to the reloaded
+        catalog.
+        """
+        self.entry_groups.keep_contexts(self.po)
+        self.results = {}
+        self.po = None
+
+    def _reattach(self):
+        """Reload a released catalog and apply what the run has collected"""
+        with self.metrics.activate():
+            po = self.reload()
+        for idx, (msgstr, fuzzy) in self.filled.items():
+            if fuzzy:
+                po[idx].msgstr = msgstr
+                po[idx].flags = po[idx].flags + ["fuzzy"]
+            else:
+                set_entry_translation(po[idx], msgstr, self.nplurals)
+        for item, translation in self.results.items():
+            for idx in self.entry_groups[item]:
+                set_entry_translation(po[idx], translation, self.nplurals)
+        self.po = po
+
+    def _set_translation(self, item: int, translation: str):
+        """Apply a translation to every entry sharing the item's text"""
+        if self.results is not None:
+            self.results[item] = translation
+            return
+        for idx in self.entry_groups[item]:
+            set_entry_translation(self.po[idx], translation, self.nplurals)
+
+    def report(self, message: str, done: int = 0):
+        """
+        Report progress, counting `done` more texts as finished
+
+        Progress is reported from worker threads, so the completed counter
+        and the callback are serialized.
+        """
+        with self._progress_lock:
+            self._completed += done
+            if self.progress_callback:
+                self.progress_callback(self._completed, len(self.texts), message)
+
+    def has_next(self) -> bool:
+        """Whether any texts are waiting to be sent"""
+        return self.planner is not None and self.planner.has_next()
+
+    def next_batch(self) -> tuple:
+        """
+        Take the next batch from the planner
+
+        Returns:
+            Tuple of (1-based batch number, item ids)
+        """
+        items = self.planner.next_batch()
+        for item in items:
+            self.attempts[item] += 1
+        self.batch_count += 1
+        return self.batch_count, items
+
+    def batch_texts(self, items: List[int]) -> List[str]:
+        """Get the texts of a batch's items"""
+        return [self.texts[item] for item in items]
+
+    def batch_attempt(self, items: List[int]) -> int:
+        """How many times a batch's texts have been sent in the current round, for the error policy"""
+        return max(self.attempts[item] - self.attempt_offsets[item] for item in items)
+
+    def retry_deferred(self) -> bool:
+        """
+        Queue the deferred items for one more round once everything else is done
+
+        Each item may be sent `deferred_retries` more times. Items that fail
+        again, or all of them if there are no deferred retries, are left
+        untranslated so the next run picks them up.
+
+        Returns:
+            True if items were queued
+        """
+        retries = self.translator.deferred_retries
+        if not self.deferred or self.deferring or retries <= 0:
+            return False
+
+        items, self.deferred = self.deferred, []
+        self.deferring = True
+        for item in items:
+            self.attempt_offsets[item] = self.attempts[item]
+            self.budgets[item] = self.attempts[item] + retries
+        self.planner.requeue(items)
+        self.total_batches = self.batch_count + self.planner.estimate_batches()
+        self.report(f"Retrying {len(items)} deferred items")
+        return True
+
+    def apply(self, batch_num: int, items: List[int], translations: Optional[List[Optional[str]]],
+              outcome: str, errors: int = 0, in_flight: int = 0):
+        """
+        Apply the result of one batch
+
+        Translations are applied to every entry sharing the text; texts that
+        got no translation are re-queued until they run out of attempts.
+
+        Args:
+            batch_num: 1-based batch number
+            items: Item ids of the batch
+            translations: Translations returned for the batch, or None
+            outcome: 'translated', 'retry', 'skip' or 'stop'
+            errors: Number of texts whose batch hit an unexpected error
+            in_flight: Number of batches still in flight, for the batch estimate
+        """
+        with self._apply_lock:
+            self._apply(batch_num, items, translations, outcome, errors, in_flight)
+
+    def _apply(self, batch_num, items, translations, outcome, errors, in_flight):
+        translator = self.translator
+        self.stats["errors"] += errors
+
+        if outcome == 'stop':
+            # Never translated; counted with the texts still queued
+            self.stopped = True
+            self.stats["unsent"] += sum(1 for item in items if item not in self._streamed)
+            return
+        if outcome != 'translated':
+            translations = [None] * len(items)
+
+        records = []
+        failed = []
+        deferred = []
+        finished = 0
+        for item, translation in zip(items, translations):
+            if item in self._streamed:
+                # Applied and counted as it arrived
+                continue
+            text = self.texts[item]
+            if translation is not None and isinstance(text, PluralText):
+                # Wrong number of plural forms counts as missing
+                translation = parse_plural_translation(translation, text.nplurals)
+            if translation is None:
+                if outcome != 'skip' and self.attempts[item] < self.budgets[item]:
+                    # Not translated yet; try again in a later batch
+                    failed.append(item)
+                elif not self.deferring:
+                    # Skipped or out of attempts; try again at the end of the run
+                    deferred.append(item)
+                else:
+                    # Failed in the deferred round too; leave it untranslated
+                    # (never the source text) so the next run picks it up
+                    self.stats["failed"] += 1
+                    finished += 1
+                continue
+            records.extend(
+                (str(text), msgctxt, translation) for msgctxt in self.entry_groups.context_of(item, self.po)
+            )
+            # Batches may complete in any order
+            self._set_translation(item, translation)
+            finished += 1
+
+        if records:
+            if translator.translation_memory is not None:
+                translator.translation_memory.store_many(
+                    records, self.source_lang, self.target_lang, translator.model
+                )
+            if self.journal is not None:
+                self.journal.record_batch(records)
+
+        if failed:
+            if outcome == 'translated':
+                # Truncated or misaligned response; pack smaller batches from now on
+                self.planner.shrink()
+            self.planner.requeue(failed)
+            self.stats["requeued"] += len(failed)
+            self.total_batches = self.batch_count + in_flight + self.planner.estimate_batches()
+            self.report(f"Re-queued {len(failed)} items from batch {batch_num} for another attempt")
+
+        if deferred:
+            self.deferred.extend(deferred)
+            self.stats["deferred"] += len(deferred)
+            self.report(f"Deferred {len(deferred)} items from batch {batch_num} to the end of the run")
+
+        self.report(f"Completed batch {batch_num}/{self.total_batches}", finished)
+
+    def item_callback(self, batch_num: int, items: List[int]) -> Callable[[int, str], None]:
+        """
+        Get a callback that applies single translations of a batch as they stream in
+
+        The callback takes the index of the text within the batch and its
+        translation. It may be called from worker threads.
+        """
+        def on_item(index: int, translation: str):
+            self.apply_item(batch_num, items[index], translation)
+        return on_item
+
+    def apply_item(self, batch_num: int, item: int, translation: str):
+        """
+        Apply one translation before its batch has completed
+
+        Invalid plural translations are ignored here and handled with the
+        rest of the batch.
+        """
+        text = self.texts[item]
+        if isinstance(text, PluralText):
+            translation = parse_plural_translation(translation, text.nplurals)
+            if translation is None:
+                return
+
+        with self._apply_lock:
+            if item in self._streamed:
+                return
+            self._streamed.add(item)
+            records = [
+                (str(text), msgctxt, translation) for msgctxt in self.entry_groups.context_of(item, self.po)
+            ]
+            self._set_translation(item, translation)
+            if self.translator.translation_memory is not None:
+                self.translator.translation_memory.store_many(
+                    records, self.source_lang, self.target_lang, self.translator.model
+                )
+            if self.journal is not None:
+                self.journal.record_batch(records)
+        self.report(f"Receiving batch {batch_num}/{self.total_batches}...", 1)
+
+    def flush(self):
+        """Write journaled translations to disk"""
+        if self.journal is not None:
+            self.journal.flush()
+
+    def finish(self) -> Dict:
+        """
+        Save the translated catalog and finalize the statistics
+
+        Returns:
+            Dictionary with translation statistics
+        """
+        # Number of items by how many attempts they took
+        histogram = {}
+        for count in self.attempts:
+            if count:
+                histogram[count] = histogram.get(count, 0) + 1
+        self.stats["attempts"] = histogram
+        # This run's own 429s, not those of other runs sharing the translator
+        self.stats["throttled"] = self.metrics.counters["throttled"]
+        # Deferred items that never got their retry (stopped, or no deferred retries)
+        self.stats["failed"] += len(self.deferred)
+        self.deferred = []
+        # Texts still queued when the run stopped; a finished run has none
+        if self.planner is not None:
+            self.stats["unsent"] += self.planner.remaining()
+        self.stats["stopped"] = self.stopped or self.stats["unsent"] > 0
+
+        released = self.po is None
+        if released:
+            self._reattach()
+        po = self.po
+        # Update language in metadata
+        if po.metadata:
+            po.metadata["Language"] = self.target_lang
+            if "Plural-Forms" in po.metadata or self.stats["plural"]:
+                po.metadata["Plural-Forms"] = self.plural_forms
+
+        # Save the translated PO file with wrap width set to 0 to prevent line wrapping
+        po.wrapwidth = 0  # Disable line wrapping
+        with self.metrics.phase("save"):
+            if self.sink is not None:
+                self.sink(po)
+            else:
+                atomic_save(po, self.output_file)
+        if released or self.sink is not None:
+            # Other runs of the same worker may still be translating
+            self.po = None
+
+        if self.journal is not None and self.sink is None:
+            if is_complete(self.stats):
+                self.journal.remove()
+            else:
+                # Stopped or with failed texts: keep it so the run can be resumed
+                self.journal.flush()
+
+        self.stats["metrics"] = self.metrics
+        return self.stats
+
+
+class CatalogStream:
+    """
+    One output file of a streamed translation (see POTranslator.set_catalog_streaming)
+
+    The source file is read in windows of entries; each window is
+    translated as a TranslationRun of its own and handed to a POWriter as
+    soon as it is done, so only the windows in progress are held in
+    memory. The windows of a file share its journal, metrics, progress
+    count and statistics.
+    """
+
+    def __init__(
+        self,
+        translator: "POTranslator",
+        reader: POReader,
+        output_file: str,
+        source_lang: str,
+        target_lang: str,
+        progress_callback: Optional[Callable] = None,
+        resume: bool = False
+    ):
+        """
+        Args:
+            translator: Translator whose settings the windows use
+            reader: Reader of the source file, positioned after the header
+            output_file: Path to output PO file
+            source_lang: Source language code
+            target_lang: Target language code
+            progress_callback: Optional callback function for progress updates
+            resume: Reuse translations journaled by an interrupted run for the same output file
+        """
+        self.translator = translator
+        self.output_file = output_file
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.progress_callback = progress_callback
+        self.metrics = RunMetrics()
+        self.stats = {
+            "total": 0,
+            "translated": 0,
+            "fuzzy": 0,
+            "untranslated": 0,
+            "errors": 0,
+            "resumed": 0,
+            "requeued": 0,
+            "deferred": 0,
+            "failed": 0,
+            "unsent": 0,
+            "stopped": False,
+            "plural": 0,
+            "attempts": {},
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "unique": 0,
+            "fuzzy_filled": 0,
+            "fuzzy_hints": 0,
+        }
+        self._completed = 0
+        self._total = 0
+        self._progress_lock = threading.Lock()
+
+        metadata = dict(reader.metadata)
+        if metadata:
+            metadata["Language"] = target_lang
+            # Whether the file has plural entries isn't known before it has been read
+            metadata["Plural-Forms"] = plural_forms_for(target_lang, metadata.get("Plural-Forms"))
+        self.writer = POWriter(output_file, reader.header, metadata, reader.metadata_is_fuzzy)
+
+        self.journal = None
+        self.resumed = {}
+        if translator.checkpointing:
+            self.journal = CheckpointJournal(
+                output_file, source_lang, target_lang,
+                translator.checkpoint_every_batches, translator.checkpoint_every_seconds
+            )
+            self.resumed = self.journal.load() if resume else {}
+            self.journal.start(self.resumed)
+
+    def open_window(self, catalog: polib.POFile, offset: int, scanned: tuple) -> TranslationRun:
+        """
+        Prepare the run of a window of entries
+
+        Args:
+            catalog: The window's entries, for this file to translate in place
+            offset: Position of the window's first entry in the source file
+            scanned: Result of TranslationRun.scan() on the window
+
+        Returns:
+            Prepared run; pass it to close_window() once it is done
+        """
+        run = TranslationRun(
+            self.translator, catalog, self.output_file, self.source_lang, self.target_lang,
+            self._window_progress(), self.metrics, sink=lambda po: self._write(offset, po)
+        )
+        run.journal = self.journal
+        run.resumed = self.resumed
+        run.prepare(scanned=scanned)
+        with self._progress_lock:
+            self._total += len(run.texts)
+        return run
+
+    def close_window(self, run: TranslationRun):
+        """Write a window's entries and add up its statistics"""
+        stats = run.finish()
+        for key, value in stats.items():
+            if key == "attempts":
+                for count, items in value.items():
+                    self.stats["attempts"][count] = self.stats["attempts"].get(count, 0) + items
+            elif key == "stopped":
+                self.stats["stopped"] = self.stats["stopped"] or value
+            elif key in self.stats:
+                self.stats[key] += value
+
+    def report(self, message: str):
+        """Report progress of the whole file"""
+        with self._progress_lock:
+            if self.progress_callback:
+                self.progress_callback(self._completed, self._total, message)
+
+    def flush(self):
+        """Write journaled translations to disk"""
+        if self.journal is not None:
+            self.journal.flush()
+
+    def finish(self, read_metrics: Optional[RunMetrics] = None) -> Dict:
+        """
+        Move the output file into place once every window has been written
+
+        Args:
+            read_metrics: Metrics of reading the source file, added to this file's
+
+        Returns:
+            Dictionary with translation statistics
+        """
+        with self.metrics.phase("save"):
+            self.writer.close()
+        if self.journal is not None:
+            if is_complete(self.stats):
+                self.journal.remove()
+            else:
+                # Stopped or with failed texts: keep it so the run can be resumed
+                self.journal.flush()
+        if read_metrics is not None:
+            self.metrics.merge(read_metrics)
+
+        stats = self.stats
+        # Entries left after the translation memory, per text sent
+        grouped = stats["untranslated"] - stats["cache_hits"]
+        stats["dedup_ratio"] = round(grouped / stats["unique"], 2) if stats["unique"] else 1.0
+        stats["throttled"] = self.metrics.counters["throttled"]
+        stats["metrics"] = self.metrics
+        return stats
+
+    def abort(self):
+        """Discard the partly written output, keeping the journal for a resume"""
+        self.flush()
+        self.writer.abort()
+
+    def _window_progress(self) -> Callable:
+        """Progress callback of a window, reporting the progress of the whole file"""
+        done = [0]
+
+        def progress(completed, total, message):
+            with self._progress_lock:
+                self._completed += completed - done[0]
+                done[0] = completed
+                if self.progress_callback:
+                    self.progress_callback(self._completed, self._total, message)
+        return progress
+
+    def _write(self, offset: int, po: polib.POFile):
+        for i, entry in enumerate(po):
+            self.writer.write(offset + i, entry)
+
+
+class POTranslator:
+    """Handles PO file translation using cloud AI APIs"""
+
+    def __init__(self, api_provider: str = "openai", api_key: str = "", api_base: str = ""):
+        """
+        Initialize the PO Translator
+
+        Args:
+            api_provider: API provider ("openai", "deepseek", "zhipu", "moonshot", "qwen", "huawei_maas", "custom")
+            api_key: API key for the provider
+            api_base: Custom API base URL (optional)
+        """
+        self.api_provider = api_provider
+        self.api_key = api_key
+        self.api_base = api_base
+        self.model = None
+        self.batch_size = 10  # Default batch size
+        self.concurrency = 1  # Number of batches in flight at once
+        self.max_input_tokens = None  # Input token budget per batch (None = item count only)
+        self.max_output_tokens = None  # Completion token limit (None = per-model default)
+        self.token_estimator = estimate_tokens
+        self.protocol = "numbered"  # Prompt/response format, see PROTOCOLS
+        self.gap_retries = 1  # Follow-up calls for texts missing from a response
+        self.max_attempts = 3  # Times an item is sent before it is deferred to the end of the run
+        self.deferred_retries = 1  # Times a deferred item is sent again at the end of the run
+        self.translation_memory = None  # Optional TranslationMemory consulted before batching
+        self.deduplicate = True  # Send each distinct string only once per run
+        self.dedup_ignore_context = False  # Merge identical msgids across different msgctxt
+        self.fuzzy_hint_threshold = None  # Similarity from which near matches are shown in the prompt
+        self.fuzzy_fill_threshold = None  # Similarity from which near matches are filled in as fuzzy
+        self.checkpointing = True  # Journal finished batches so interrupted runs can resume
+        self.checkpoint_every_batches = 10
+        self.checkpoint_every_seconds = 60.0
+        self.streaming = False  # Apply translations as they stream in (providers that support it)
+        self.error_policy = None  # Optional ErrorPolicy deciding about failed batches before the callback
+        self.low_memory = False  # Release parsed catalogs while requests are in flight
+        self.catalog_streaming = False  # Read and write files in windows of entries
+        self.stream_window_size = 1000  # Entries per window when streaming files
+        self.should_stop = False  # Flag to stop translation
+        self._error_lock = threading.Lock()
+
+        # HTTP connection pooling (one keep-alive session per endpoint)
+        self.pool_size = 10  # Max pooled connections per endpoint
+        self.connect_timeout = 10  # Seconds to establish a connection
+        self.read_timeout = 120  # Seconds to wait for a response
+        self._sessions = {}
+        self._session_lock = threading.Lock()
+
+        # Default API endpoints for different providers
+        self.api_endpoints = {
+            "openai": "https://api.openai.com/v1/chat/completions",
+            "deepseek": "https://api.deepseek.com/v1/chat/completions",
+            "zhipu": "https://open.bigmodel.cn/api/paas/v3/model-api/chatglm_pro/invoke",
+            "moonshot": "https://api.moonshot.cn/v1/chat/completions",
+            "qwen": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
+            "huawei_maas": "https://api.modelarts-maas.com/v2/chat/completions",
+            "custom": api_base
+        }
+
+        # Rate limits per provider (None = unlimited); each model gets its own limiter
+        self.rate_limits = {
+            provider: {"requests_per_minute": None, "tokens_per_minute": None}
+            for provider in self.api_endpoints
+        }
+        self.max_rate_limit_retries = 5  # Times a 429 response is waited out before giving up
+        self._rate_limiters = {}
+        self._rate_limiter_lock = threading.Lock()
+
+    def set_model(self, model_name: str):
+        """
+        Set the AI model to use for translation
+
+        Args:
+            model_name: Name of the model
+        """
+        self.model = model_name
+
+    def set_batch_size(self, batch_size: int):
+        """
+        Set the batch size for translation
+
+        Args:
+            batch_size: Number of texts to translate per batch (10, 20, 50, or 100)
+        """
+        self.batch_size = batch_size
+
+    def set_token_budget(self, max_input_tokens: Optional[int] = None, max_output_tokens: Optional[int] = None):
+        """
+        Set the token budgets used to pack batches
+
+        Batches are filled up to the batch size, but closed early when the
+        estimated prompt or expected response would exceed these budgets.
+
+        Args:
+            max_input_tokens: Input token budget per batch (None for no limit)
+            max_output_tokens: Completion token limit sent as max_tokens (None for the model's default)
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+
+    def set_token_estimator(self, estimator: Callable[[str], int]):
+        """
+        Set the function used to estimate the token count of a text
+
+        Args:
+            estimator: Callable taking a text and returning its estimated token count
+        """
+        self.token_estimator = estimator
+
+    def get_max_output_tokens(self, prompt_tokens: int = 0) -> int:
+        """
+        Get the completion token limit for the current model
+
+        Args:
+            prompt_tokens: Estimated tokens of the prompt, system prompt included; for
+                models with a known context window, the limit is capped to what the
+                prompt leaves of it (with the same headroom the batch planner keeps)
+
+        Raises:
+            ContextWindowError: If the prompt leaves too little of the context window
+        """
+        limit = self.max_output_tokens or MODEL_OUTPUT_TOKENS.get(self.model, DEFAULT_MAX_OUTPUT_TOKENS)
+        context = MODEL_CONTEXT_TOKENS.get(self.model)
+        if context:
+            room = int(context * BatchPlanner.HEADROOM) - prompt_tokens
+            if room < min(limit, MIN_OUTPUT_TOKENS):
+                raise ContextWindowError(
+                    f"Prompt of about {prompt_tokens} tokens is too long for the "
+                    f"{context}-token context window of {self.model}"
+                )
+            limit = min(limit, room)
+        return limit
+
+    def set_protocol(self, protocol: str, gap_retries: int = 1):
+        """
+        Set the prompt/response format used for batch translation
+
+        Args:
+            protocol: "numbered" for a numbered list, or "json" for an id-keyed JSON object
+                (uses the provider's JSON mode where supported)
+            gap_retries: Follow-up calls that re-request only the texts missing from a response
+        """
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.protocol = protocol
+        self.gap_retries = max(0, int(gap_retries))
+
+    def set_max_attempts(self, max_attempts: int, deferred_retries: Optional[int] = None):
+        """
+        Set how many times each text is sent before giving up on it
+
+        Failed or missing texts are re-queued into later batches until they
+        reach this number of attempts. Texts that still failed, or whose
+        batch was skipped, are deferred: once the rest of the run is done
+        they are sent again up to `deferred_retries` times. Texts that fail
+        then too stay untranslated (they are never filled with the source
+        text), so the next run translates them.
+
+        Args:
+            max_attempts: Maximum attempts per text
+            deferred_retries: Attempts per deferred text at the end of the run (None keeps the current setting)
+        """
+        self.max_attempts = max(1, int(max_attempts))
+        if deferred_retries is not None:
+            self.deferred_retries = max(0, int(deferred_retries))
+
+    def set_concurrency(self, concurrency: int):
+        """
+        Set how many batches are translated concurrently
+
+        Args:
+            concurrency: Number of batch requests kept in flight at once (1 = sequential)
+        """
+        self.concurrency = max(1, int(concurrency))
+
+    def set_translation_memory(self, translation_memory: Optional[TranslationMemory]):
+        """
+        Set the translation memory consulted before sending texts to the API
+
+        Args:
+            translation_memory: TranslationMemory instance, or None to disable it
+        """
+        self.translation_memory = translation_memory
+
+    def set_deduplication(self, enabled: bool = True, ignore_context: bool = False):
+        """
+        Configure deduplication of identical strings within a run
+
+        Args:
+            enabled: Send each distinct string to the API only once
+            ignore_context: Treat identical msgids with different msgctxt as the same string
+        """
+        self.deduplicate = enabled
+        self.dedup_ignore_context = ignore_context
+
+    def set_fuzzy_matching(self, hint_threshold: Optional[float] = 0.7, fill_threshold: Optional[float] = None):
+        """
+        Use near matches from the translation memory
+
+        Needs a translation memory (see set_translation_memory).
+
+        Args:
+            hint_threshold: Minimum similarity (0-1) for the closest earlier translation
+                to be included in the prompt as a hint (None to disable)
+            fill_threshold: Minimum similarity for it to be used directly, marked fuzzy,
+                without asking the model (None to disable)
+        """
+        self.fuzzy_hint_threshold = hint_threshold
+        self.fuzzy_fill_threshold = fill_threshold
+
+    def set_checkpointing(self, enabled: bool = True, every_batches: int = 10, every_seconds: float = 60.0):
+        """
+        Configure the checkpoint journal written next to the output file
+
+        The journal is removed once a run has translated every text; a run
+        that was stopped or left texts untranslated keeps it for a resume.
+
+        Args:
+            enabled: Journal finished translations so an interrupted run can be resumed
+            every_batches: Write the journal to disk after this many batches
+            every_seconds: Write the journal to disk after this many seconds
+        """
+        self.checkpointing = enabled
+        self.checkpoint_every_batches = max(1, int(every_batches))
+        self.checkpoint_every_seconds = every_seconds
+
+    def set_streaming(self, enabled: bool = True):
+        """
+        Set whether responses are streamed (server-sent events)
+
+        Each translation is applied to its entry, recorded and counted in the
+        progress as soon as it has arrived, so a batch that breaks off
+        mid-response keeps what it delivered. Providers whose adapter does
+        not support streaming are requested as usual. Only used by the
+        threaded engine (POTranslator.translate_po_file and friends).
 
-def sanitize_po_file(input_path: str, output_path: str) -> None:
-    """
-    Pre-process a PO file to escape unescaped double quotes inside
-    msgid, msgstr, and msgctxt string values.
+        Args:
+            enabled: Whether to stream responses
+        """
+        self.streaming = enabled
 
-    Some PO files in the wild contain unescaped inner quotes, e.g.:
-        msgctxt "Colloquial alternative to "learn about BuddyPress""
-    This is invalid per the GNU gettext spec and causes parsers like
-    polib to reject the file. This function rewrites such lines as:
-        msgctxt "Colloquial alternative to \\"learn about BuddyPress\\""
+    def set_error_policy(self, policy: Optional[ErrorPolicy] = None):
+        """
+        Set how failed batches are handled
 
-    Args:
-        input_path: Path to the (possibly malformed) PO file
-        output_path: Path to write the sanitized PO file
-    """
-    # Matches lines like: msgid "...", msgstr "...", msgctxt "...",
-    # or continuation lines that start with "
-    keyword_pattern = re.compile(r'^((?:msgid|msgstr|msgctxt)(?:\[\d+\])?\s+)"(.*)"\s*$')
-    continuation_pattern = re.compile(r'^"(.*)"\s*$')
+        With a policy, transient failures are retried with backoff and
+        others skipped or stopped on without asking; the error callback is
+        only consulted for what the policy leaves to the user ('ask').
+        Without one, every failure goes to the error callback.
 
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        Args:
+            policy: Error policy (None to ask the error callback about every failure)
+        """
+        self.error_policy = policy
 
-    sanitized = []
-    for line in lines:
-        keyword_match = keyword_pattern.match(line)
-        cont_match = continuation_pattern.match(line)
+    def set_low_memory(self, enabled: bool = True):
+        """
+        Set whether parsed catalogs are released while requests are in flight
 
-        if keyword_match:
-            prefix = keyword_match.group(1)
-            content = keyword_match.group(2)
-            content = _escape_inner_quotes(content)
-            sanitized.append(f'{prefix}"{content}"\n')
-        elif cont_match:
-            content = cont_match.group(1)
-            content = _escape_inner_quotes(content)
-            sanitized.append(f'"{content}"\n')
-        else:
-            sanitized.append(line)
+        Once the work list is built, a run keeps only its texts and compact
+        entry indices; the catalog is parsed again when the output is saved.
+        This trades a second parse per file for a much smaller footprint
+        while many large catalogs are translated in one process.
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.writelines(sanitized)
+        Args:
+            enabled: Whether to release catalogs
+        """
+        self.low_memory = enabled
 
+    def set_catalog_streaming(self, enabled: bool = True, window_size: int = 1000):
+        """
+        Set whether files are read and written in windows of entries
 
-def _escape_inner_quotes(content: str) -> str:
-    """
-    Escape any unescaped double quotes in a PO string value.
-    Already-escaped quotes (\\") are left untouched.
-    """
-    result = []
-    i = 0
-    while i < len(content):
-        if content[i] == '\\':
-            # Escaped sequence — keep as-is (e.g. \\", \\n, \\t)
-            result.append(content[i])
-            if i + 1 < len(content):
-                result.append(content[i + 1])
-                i += 2
-            else:
-                i += 1
-        elif content[i] == '"':
-            result.append('\\"')
-            i += 1
-        else:
-            result.append(content[i])
-            i += 1
-    return ''.join(result)
+        Instead of parsing the whole file first and saving it at the end,
+        entries are read (and sanitized) as they are needed, `window_size`
+        at a time, and each window is written to the output as soon as its
+        translations are in, keeping the original order, comments, flags
+        and header. Translation starts right after the first window has
+        been read, and memory stays flat however large the file is.
 
+        Deduplication and deferred retries apply within a window. The
+        output's Plural-Forms header is always set, since plural entries
+        may only come later in the file. Updates (update_po_file, or
+        translate_po_file_multi with update) and the asyncio engine always
+        load whole files.
 
-class POTranslator:
-    """Handles PO file translation using cloud AI APIs"""
+        Args:
+            enabled: Whether to stream files
+            window_size: Entries per window
+        """
+        self.catalog_streaming = enabled
+        self.stream_window_size = max(1, int(window_size))
 
-    def __init__(self, api_provider: str = "openai", api_key: str = "", api_base: str = ""):
+    def has_checkpoint(self, output_file: str) -> bool:
         """
-        Initialize the PO Translator
+        Check whether an interrupted run left a checkpoint journal for an output file
 
         Args:
-            api_provider: API provider ("openai", "deepseek", "zhipu", "moonshot", "qwen", "huawei_maas", "custom")
-            api_key: API key for the provider
-            api_base: Custom API base URL (optional)
+            output_file: Path to the output PO file
         """
-        self.api_provider = api_provider
-        self.api_key = api_key
-        self.api_base = api_base
-        self.model = None
-        self.batch_size = 10  # Default batch size
-        self.should_stop = False  # Flag to stop translation
+        return os.path.exists(journal_path(output_file))
 
-        # Default API endpoints for different providers
-        self.api_endpoints = {
-            "openai": "https://api.openai.com/v1/chat/completions",
-            "deepseek": "https://api.deepseek.com/v1/chat/completions",
-            "zhipu": "https://open.bigmodel.cn/api/paas/v3/model-api/chatglm_pro/invoke",
-            "moonshot": "https://api.moonshot.cn/v1/chat/completions",
-            "qwen": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
-            "huawei_maas": "https://api.modelarts-maas.com/v2/chat/completions",
-            "custom": api_base
-        }
+    def set_rate_limit(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        provider: Optional[str] = None
+    ):
+        """
+        Set the rate limits of a provider
 
-    def set_model(self, model_name: str):
+        Requests are held back so they stay within these limits, which is
+        cheaper than running into 429 responses.
+
+        Args:
+            requests_per_minute: Maximum requests per minute (None for no limit)
+            tokens_per_minute: Maximum prompt + completion tokens per minute (None for no limit)
+            provider: Provider name (defaults to the current provider)
         """
-        Set the AI model to use for translation
+        provider = provider or self.api_provider
+        self.rate_limits[provider] = {
+            "requests_per_minute": requests_per_minute,
+            "tokens_per_minute": tokens_per_minute
+        }
+        with self._rate_limiter_lock:
+            for key in [key for key in self._rate_limiters if key[0] == provider]:
+                del self._rate_limiters[key]
+
+    def _get_rate_limiter(self) -> RateLimiter:
+        """Get the rate limiter for the current provider and model, creating it on first use"""
+        key = (self.api_provider, self.model)
+        with self._rate_limiter_lock:
+            limiter = self._rate_limiters.get(key)
+            if limiter is None:
+                limits = self.rate_limits.get(self.api_provider, {})
+                limiter = RateLimiter(limits.get("requests_per_minute"), limits.get("tokens_per_minute"))
+                self._rate_limiters[key] = limiter
+            return limiter
+
+    def set_http_options(
+        self,
+        pool_size: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None
+    ):
+        """
+        Configure the pooled HTTP connections used for API requests
 
         Args:
-            model_name: Name of the model
+            pool_size: Max keep-alive connections kept per endpoint
+            connect_timeout: Seconds allowed to establish a connection
+            read_timeout: Seconds allowed to wait for a response
         """
-        self.model = model_name
+        if pool_size is not None:
+            self.pool_size = max(1, int(pool_size))
+            # Sessions are sized on creation; rebuild them with the new size
+            self.close()
+        if connect_timeout is not None:
+            self.connect_timeout = connect_timeout
+        if read_timeout is not None:
+            self.read_timeout = read_timeout
+
+    def clone(self) -> "POTranslator":
+        """
+        Create a translator with the same settings for another concurrent run
 
-    def set_batch_size(self, batch_size: int):
+        The clone shares the connection pools, rate limiters and translation
+        memory of this translator, but stops and counts independently.
+
+        Returns:
+            New POTranslator instance
         """
-        Set the batch size for translation
+        clone = copy.copy(self)
+        clone.should_stop = False
+        clone._error_lock = threading.Lock()
+        return clone
+
+    def close(self):
+        """Close all pooled HTTP connections"""
+        with self._session_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _get_session(self, endpoint: str) -> requests.Session:
+        """
+        Get the keep-alive session for an endpoint, creating it on first use
 
-        Args:
-            batch_size: Number of texts to translate per batch (10, 20, 50, or 100)
+        Sessions are shared by every batch and worker thread, so each
+        request reuses an open connection instead of a fresh TCP + TLS
+        handshake.
         """
-        self.batch_size = batch_size
+        with self._session_lock:
+            session = self._sessions.get(endpoint)
+            if session is None:
+                # Keep at least one connection per concurrent batch
+                pool_size = max(self.pool_size, self.concurrency)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[endpoint] = session
+            return session
 
     def stop_translation(self):
         """Stop the translation process"""
@@ -175,9 +1920,9 @@ class POTranslator:
         }
         return default_models.get(self.api_provider, ["unknown"])
 
-    def translate_batch_openai_compatible(self, texts: List[str], source_lang: str, target_lang: str) -> tuple:
+    def build_prompt(self, texts: List[str], source_lang: str, target_lang: str) -> str:
         """
-        Translate multiple texts in a single API call
+        Build the translation prompt for a batch in the current protocol
 
         Args:
             texts: List of texts to translate
@@ -185,75 +1930,306 @@ class POTranslator:
             target_lang: Target language code
 
         Returns:
-            Tuple of (translations list, success boolean, error message)
+            Prompt text
         """
-        endpoint = self.api_endpoints.get(self.api_provider, self.api_base)
+        plural = next((text for text in texts if isinstance(text, PluralText)), None)
+        if plural is not None:
+            plural_note = f"""
+Items given as JSON arrays hold the singular and plural form of one message.
+Translate each into a JSON array of exactly {plural.nplurals} strings, one per plural form of {target_lang} in order."""
+        else:
+            plural_note = ""
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        hints = [text.hint for text in texts if isinstance(text, HintedText)]
+        if hints:
+            hint_lines = "\n".join(
+                f"{json.dumps(source, ensure_ascii=False)} => {json.dumps(translation, ensure_ascii=False)}"
+                for source, translation in hints
+            )
+            hint_note = f"""Earlier translations of similar texts, for consistent wording:
+{hint_lines}
+
+"""
+        else:
+            hint_note = ""
+
+        if self.protocol == "json":
+            # Id-keyed object so every translation can be matched to its text
+            id_texts = json.dumps(
+                {str(i + 1): text.forms if isinstance(text, PluralText) else text for i, text in enumerate(texts)},
+                ensure_ascii=False, indent=0
+            )
+
+            return f"""You are a professional translator. Translate the values of the following JSON object from {source_lang} to {target_lang}.
+Respond with ONLY a JSON object that has exactly the same keys, each mapped to the translation of its value.{plural_note}
+Do not add any explanations or additional text.
+
+{hint_note}{id_texts}"""
 
         # Create a numbered list of texts for translation
         numbered_texts = "\n".join([f"{i+1}. {text}" for i, text in enumerate(texts)])
 
-        prompt = f"""You are a professional translator. Translate the following numbered texts from {source_lang} to {target_lang}.
-Provide ONLY the translations in the same numbered format, one per line.
+        return f"""You are a professional translator. Translate the following numbered texts from {source_lang} to {target_lang}.
+Provide ONLY the translations in the same numbered format, one per line.{plural_note}
 Do not add any explanations or additional text.
 
-Texts to translate:
+{hint_note}Texts to translate:
 {numbered_texts}
 
 Translations:"""
 
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are a professional translator. Provide accurate and natural translations."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3,
-            "max_tokens": 4000
-        }
+    def parse_translations(self, content: str, texts: List[str], truncated: bool = False) -> List[Optional[str]]:
+        """
+        Parse a response in the current protocol back onto the requested texts
 
-        try:
-            verify_ssl = self.api_provider != "huawei_maas"
-            response = requests.post(endpoint, headers=headers, json=payload, timeout=120, verify=verify_ssl)
-            response.raise_for_status()
+        Args:
+            content: Response text from the model
+            texts: Texts that were sent for translation
+            truncated: Whether the response was cut off at the token limit
+
+        Returns:
+            Translations in the order of `texts`, with None for texts that got no translation
+        """
+        if self.protocol == "json":
+            return parse_json_translations(content, texts)
+        return parse_numbered_translations(content, texts, truncated)
 
-            result = response.json()
-            translated_text = result["choices"][0]["message"]["content"].strip()
+    def _build_request(self, texts: List[str], source_lang: str, target_lang: str, stream: bool = False) -> tuple:
+        """
+        Build the HTTP request for one batch in the provider's format
+
+        Args:
+            texts: List of texts to translate
+            source_lang: Source language code
+            target_lang: Target language code
+            stream: Ask for a server-sent event stream
+
+        Returns:
+            Tuple of (endpoint URL, headers, JSON payload, estimated total tokens)
+
+        Raises:
+            ContextWindowError: If the prompt leaves too little of the model's context window
+        """
+        with timed_phase("prompt_build"):
+            prompt = self.build_prompt(texts, source_lang, target_lang)
+        prompt_tokens = self.token_estimator(SYSTEM_PROMPT) + self.token_estimator(prompt)
+        endpoint, headers, payload = get_adapter(self.api_provider).build_request(
+            self.api_endpoints.get(self.api_provider, self.api_base),
+            self.api_key,
+            self.model,
+            prompt,
+            self.get_max_output_tokens(prompt_tokens),
+            json_mode=self.protocol == "json",
+            stream=stream
+        )
+
+        # Prompt plus expected completion, for the tokens-per-minute limit
+        tokens = prompt_tokens + int(
+            sum(self.token_estimator(text) for text in texts) * BatchPlanner.OUTPUT_RATIO
+        )
+        return endpoint, headers, payload, tokens
+
+    def _parse_completion(self, result: Dict, texts: List[str]) -> List[Optional[str]]:
+        """
+        Parse a response body in the provider's format onto the requested texts
+
+        Returns:
+            Translations in the order of `texts`, with None for texts that got no translation
+        """
+        adapter = get_adapter(self.api_provider)
+        translated_text, truncated = adapter.parse_response(result)
+
+        metrics = current_metrics()
+        if metrics is not None:
+            tokens_in, tokens_out = adapter.parse_usage(result) or (0, 0)
+            metrics.count(tokens_in=tokens_in, tokens_out=tokens_out)
+
+        # Parse the translations; missing ones come back as None
+        with timed_phase("response_parse"):
+            return self.parse_translations(translated_text.strip(), texts, truncated)
 
-            # Parse the numbered translations
-            translations = []
-            lines = translated_text.split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line:
+    def _rate_limit_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """
+        Work out how long to wait after a 429 response and count it
+
+        Counted in the active run's metrics.
+
+        Args:
+            attempt: 0-based attempt number of the request
+            retry_after: Retry-After header of the response, if any
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = backoff_delay(attempt)
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.count(throttled=1)
+        return delay
+
+    def _read_stream(self, response: requests.Response, texts: List[str],
+                     on_item: Callable[[int, str], None]) -> List[Optional[str]]:
+        """
+        Parse a server-sent event response, handing on translations as they complete
+
+        If the connection breaks after some translations arrived, those are
+        kept and the rest come back as None.
+
+        Raises:
+            requests.exceptions.RequestException: If the stream breaks before any translation arrived
+        """
+        adapter = get_adapter(self.api_provider)
+        parser = StreamParser(self.protocol, texts)
+        truncated = False
+        received = 0
+        usage = (0, 0)
+        try:
+            for line in response.iter_lines():
+                received += len(line)
+                line = line.decode("utf-8") if isinstance(line, bytes) else line
+                if not line.startswith("data:"):
                     continue
-                # Remove number prefix (e.g., "1. ", "2. ", etc.)
-                match = re.match(r'^\d+\.\s*(.+)$', line)
-                if match:
-                    translations.append(match.group(1).strip())
-                elif line:
-                    translations.append(line)
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                delta, cut_off = adapter.parse_stream_chunk(chunk)
+                truncated = truncated or cut_off
+                # Usage, where sent, is the running total
+                usage = adapter.parse_usage(chunk) or usage
+                for i, translation in parser.feed(delta):
+                    on_item(i, translation)
+        except requests.exceptions.RequestException:
+            if not parser.emitted:
+                raise
+            # Keep what arrived before the connection broke
+            truncated = True
+        finally:
+            response.close()
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.count(bytes_received=received, tokens_in=usage[0], tokens_out=usage[1])
+
+        with timed_phase("response_parse"):
+            return parser.finish(truncated)
+
+    def _request_translations(self, texts: List[str], source_lang: str, target_lang: str,
+                              on_item: Optional[Callable[[int, str], None]] = None) -> List[Optional[str]]:
+        """
+        Send one batch to the provider's endpoint and parse the response
+
+        Args:
+            texts: List of texts to translate
+            source_lang: Source language code
+            target_lang: Target language code
+            on_item: Optional callback taking a text index and its translation,
+                to stream the response and hand on translations as they arrive
+
+        Raises:
+            requests.exceptions.RequestException: On network or HTTP errors
+        """
+        stream = on_item is not None and get_adapter(self.api_provider).supports_streaming
+        endpoint, headers, payload, tokens = self._build_request(texts, source_lang, target_lang, stream)
+        verify_ssl = self.api_provider != "huawei_maas"
+        session = self._get_session(endpoint)
+        limiter = self._get_rate_limiter()
+        metrics = current_metrics()
+
+        for attempt in range(self.max_rate_limit_retries + 1):
+            if not limiter.acquire(tokens, cancelled=lambda: self.should_stop):
+                raise requests.exceptions.RequestException("Translation stopped while waiting for rate limit")
+
+            with timed_phase("http"):
+                response = session.post(
+                    endpoint,
+                    headers=headers,
+                    json=payload,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                    verify=verify_ssl,
+                    stream=stream
+                )
+            if metrics is not None:
+                metrics.count(
+                    http_requests=1, retries=1 if attempt else 0, bytes_sent=_body_size(response.request.body)
+                )
+            if response.status_code != 429 or attempt == self.max_rate_limit_retries:
+                break
+
+            # Rate limited: wait as told (or back off with jitter) and hold back other batches too
+            response.close()
+            limiter.pause(self._rate_limit_delay(attempt, response.headers.get("Retry-After")))
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            # A streamed response holds its connection until closed
+            response.close()
+            raise
+        if stream:
+            with timed_phase("http_stream"):
+                return self._read_stream(response, texts, on_item)
+        if metrics is not None:
+            metrics.count(bytes_received=_body_size(response.content))
+        return self._parse_completion(response.json(), texts)
+
+    def translate_batch_openai_compatible(self, texts: List[str], source_lang: str, target_lang: str,
+                                          on_item: Optional[Callable[[int, str], None]] = None) -> tuple:
+        """
+        Translate multiple texts in a single API call
 
-            # Ensure we have the same number of translations as inputs
-            while len(translations) < len(texts):
-                translations.append(texts[len(translations)])  # Use original if missing
+        Texts missing from the response are requested again on their own
+        (up to `gap_retries` follow-up calls) instead of resending the batch.
 
-            return translations[:len(texts)], True, None
+        Args:
+            texts: List of texts to translate
+            source_lang: Source language code
+            target_lang: Target language code
+            on_item: Optional callback taking a text index and its translation,
+                called as translations stream in
 
+        Returns:
+            Tuple of (translations list with None for texts missing from the
+            response, success boolean, error message)
+        """
+        try:
+            translations = self._request_translations(texts, source_lang, target_lang, on_item)
+        except ContextWindowError as e:
+            # Nothing was sent; resending the same texts cannot succeed
+            return texts, False, BatchError(str(e), "client")
         except requests.exceptions.Timeout:
-            return texts, False, "API request timed out (possible sleep/hibernation)"
+            return texts, False, BatchError("API request timed out (possible sleep/hibernation)", "timeout")
         except requests.exceptions.ConnectionError as e:
-            return texts, False, f"Connection error: {str(e)}"
+            return texts, False, BatchError(f"Connection error: {str(e)}", "connection")
         except requests.exceptions.RequestException as e:
-            return texts, False, f"API request failed: {str(e)}"
+            return texts, False, BatchError(f"API request failed: {str(e)}", *classify_request_error(e))
         except Exception as e:
-            return texts, False, f"Unexpected error: {str(e)}"
-
-    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> tuple:
+            return texts, False, BatchError(f"Unexpected error: {str(e)}")
+
+        for _ in range(self.gap_retries):
+            missing = [i for i, translation in enumerate(translations) if translation is None]
+            if not missing or len(missing) == len(texts) or self.should_stop:
+                break
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.count(gap_requests=1)
+
+            def _refill(i, translation, missing=missing):
+                on_item(missing[i], translation)
+
+            on_refill = _refill if on_item is not None else None
+            try:
+                refill = self._request_translations(
+                    [texts[i] for i in missing], source_lang, target_lang, on_refill
+                )
+            except Exception:
+                # Keep what the first response delivered
+                break
+            for i, translation in zip(missing, refill):
+                translations[i] = translation
+
+        return translations, True, None
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str,
+                        on_item: Optional[Callable[[int, str], None]] = None) -> tuple:
         """
         Translate multiple texts
 
@@ -261,6 +2237,8 @@ Translations:"""
             texts: List of texts to translate
             source_lang: Source language code
             target_lang: Target language code
+            on_item: Optional callback taking a text index and its translation,
+                to stream the response (see set_streaming)
 
         Returns:
             Tuple of (translations list, success boolean, error message)
@@ -268,17 +2246,137 @@ Translations:"""
         if not texts:
             return [], True, None
 
-        if self.api_provider in ["openai", "deepseek", "moonshot", "huawei_maas", "custom"]:
-            return self.translate_batch_openai_compatible(texts, source_lang, target_lang)
-        else:
-            # For other providers, translate one by one
-            translations = []
-            for text in texts:
-                result, success, error = self.translate_batch_openai_compatible([text], source_lang, target_lang)
-                if not success:
-                    return texts, False, error
-                translations.append(result[0])
-            return translations, True, None
+        # Every provider takes the whole batch; providers.py adapts the request format
+        return self.translate_batch_openai_compatible(texts, source_lang, target_lang, on_item)
+
+    def _ask_error_callback(self, error_callback: Callable, error_msg: str,
+                            batch_num: int, total_batches: int) -> str:
+        """
+        Ask the error callback what to do, one batch at a time
+
+        Concurrent batches may fail together; only one of them prompts at a
+        time, and once the user chose to stop the others stop without asking.
+        """
+        with self._error_lock:
+            if self.should_stop:
+                return 'stop'
+            return error_callback(error_msg, batch_num, total_batches)
+
+    def _wait(self, seconds: float) -> bool:
+        """
+        Wait before retrying a batch, waking up regularly to notice a stop
+
+        Returns:
+            False if the translation was stopped while waiting
+        """
+        deadline = time.monotonic() + seconds
+        while not self.should_stop:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.5))
+        return False
+
+    def _decide_on_error(self, error_msg: str, batch_num: int, total_batches: int, attempt: int,
+                         report: Callable, error_callback: Optional[Callable]) -> str:
+        """
+        Decide what to do about a failed batch: by the error policy, then the error callback
+
+        Returns:
+            'retry', 'skip' or 'stop'
+        """
+        if self.error_policy is None:
+            if not error_callback:
+                # No error callback, defer the texts to the end of the run
+                return 'skip'
+            return self._ask_error_callback(error_callback, error_msg, batch_num, total_batches)
+
+        action, delay = self.error_policy.decide(error_msg, attempt)
+        if action == 'ask':
+            if not error_callback:
+                action = 'skip'
+            else:
+                return self._ask_error_callback(error_callback, error_msg, batch_num, total_batches)
+
+        if action == 'retry':
+            report(f"Batch {batch_num} failed ({error_msg}); retrying in {delay:.1f}s")
+            return 'retry' if self._wait(delay) else 'stop'
+        report(f"Batch {batch_num} failed ({error_msg}); {'stopping' if action == 'stop' else 'skipping'}")
+        return action
+
+    def _run_batch(
+        self,
+        batch_texts: List[str],
+        batch_num: int,
+        total_batches: int,
+        source_lang: str,
+        target_lang: str,
+        report: Callable,
+        error_callback: Optional[Callable] = None,
+        on_item: Optional[Callable[[int, str], None]] = None,
+        metrics: Optional[RunMetrics] = None,
+        attempt: int = 1
+    ) -> tuple:
+        """
+        Translate a single batch and decide what to do if the call fails
+
+        Runs on a worker thread of translate_po_file. Retrying is left to the
+        caller, which re-queues only the items that still need translating.
+
+        Args:
+            batch_texts: Texts in this batch
+            batch_num: 1-based batch number
+            total_batches: Total number of batches
+            source_lang: Source language code
+            target_lang: Target language code
+            report: Progress reporter taking a message
+            error_callback: Optional callback function for error handling (returns 'retry', 'skip', or 'stop')
+            on_item: Optional callback applying single translations as they stream in
+            metrics: Optional metrics of the run, active while the batch is sent
+            attempt: How many times the batch's texts have been sent, including this time
+
+        Returns:
+            Tuple of (translations list or None, outcome, error count), where
+            outcome is 'translated', 'retry', 'skip' or 'stop'
+        """
+        if self.should_stop:
+            return None, 'stop', 0
+
+        try:
+            report(f"Translating batch {batch_num}/{total_batches} ({len(batch_texts)} items)...")
+
+            started = time.perf_counter()
+            with metrics.activate() if metrics is not None else nullcontext():
+                if on_item is not None:
+                    translations, success, error_msg = self.translate_batch(
+                        batch_texts, source_lang, target_lang, on_item=on_item
+                    )
+                else:
+                    translations, success, error_msg = self.translate_batch(batch_texts, source_lang, target_lang)
+
+            if success:
+                if metrics is not None:
+                    metrics.record_batch(time.perf_counter() - started)
+                return translations, 'translated', 0
+
+            # API call failed
+            errors = 0
+        except Exception as e:
+            # Unexpected, so not classified: the policy leaves it to the error callback
+            error_msg = BatchError(f"Unexpected error: {e}")
+            errors = len(batch_texts)
+            report(f"Error in batch {batch_num}: {error_msg}")
+            if metrics is not None:
+                metrics.count(exceptions=1)
+
+        action = self._decide_on_error(error_msg, batch_num, total_batches, attempt, report, error_callback)
+        if action == 'stop':
+            self.should_stop = True
+            return None, 'stop', errors
+        elif action == 'skip':
+            # Defer the texts to the end of the run
+            return None, 'skip', errors
+        return None, 'retry', errors
 
     def translate_po_file(
         self,
@@ -287,7 +2385,8 @@ Translations:"""
         source_lang: str,
         target_lang: str,
         progress_callback: Optional[Callable] = None,
-        error_callback: Optional[Callable] = None
+        error_callback: Optional[Callable] = None,
+        resume: bool = False
     ) -> Dict:
         """
         Translate a PO file with batch processing and error recovery
@@ -299,152 +2398,352 @@ Translations:"""
             target_lang: Target language code
             progress_callback: Optional callback function for progress updates
             error_callback: Optional callback function for error handling (returns 'retry', 'skip', or 'stop')
+            resume: Reuse translations journaled by an interrupted run for the same output file
 
         Returns:
             Dictionary with translation statistics
         """
         self.should_stop = False
 
-        # Sanitize the PO file to fix unescaped quotes before loading
-        import tempfile
-        fd, sanitized_path = tempfile.mkstemp(suffix=".po")
-        os.close(fd)
-        try:
-            sanitize_po_file(input_file, sanitized_path)
-            po = polib.pofile(sanitized_path)
-        finally:
-            os.unlink(sanitized_path)
+        if self.catalog_streaming:
+            return self._translate_streams(
+                input_file, {target_lang: output_file}, source_lang,
+                {target_lang: progress_callback}, error_callback, resume
+            )[target_lang]
 
-        stats = {
-            "total": len(po),
-            "translated": 0,
-            "fuzzy": 0,
-            "untranslated": 0,
-            "errors": 0
-        }
+        metrics = RunMetrics()
 
-        # Collect texts to translate
-        texts_to_translate = []
-        entry_indices = []
+        # Sanitize the PO file to fix unescaped quotes while loading it
+        with metrics.activate():
+            po = load_po_file(input_file)
 
-        for i, entry in enumerate(po):
-            # Skip entries that are already translated
-            if entry.msgstr and not entry.obsolete:
-                stats["translated"] += 1
-                continue
+        run = TranslationRun(
+            self, po, output_file, source_lang, target_lang, progress_callback, metrics,
+            reload=lambda: load_po_file(input_file)
+        )
+        del po  # Held by the run only, so it can be released
+        return self._translate_run(run, error_callback, resume)
 
-            # Skip fuzzy translations
-            if "fuzzy" in entry.flags:
-                stats["fuzzy"] += 1
-                continue
+    def update_po_file(
+        self,
+        pot_file: str,
+        po_file: str,
+        output_file: str,
+        source_lang: str,
+        target_lang: str,
+        progress_callback: Optional[Callable] = None,
+        error_callback: Optional[Callable] = None,
+        resume: bool = False
+    ) -> Dict:
+        """
+        Bring a translated PO file up to date with a new template
 
-            # Skip empty msgid
-            if not entry.msgid or not entry.msgid.strip():
-                continue
+        Translations of `po_file` are carried over to the entries of
+        `pot_file` (see merge_catalog) and only new or changed strings are
+        sent for translation.
 
-            # Add to batch
-            texts_to_translate.append(entry.msgid)
-            entry_indices.append(i)
+        Args:
+            pot_file: Path to the new POT file
+            po_file: Path to the previously translated PO file
+            output_file: Path to output PO file (may be `po_file`)
+            source_lang: Source language code
+            target_lang: Target language code
+            progress_callback: Optional callback function for progress updates
+            error_callback: Optional callback function for error handling (returns 'retry', 'skip', or 'stop')
+            resume: Reuse translations journaled by an interrupted run for the same output file
 
-        stats["untranslated"] = len(texts_to_translate)
+        Returns:
+            Dictionary with translation statistics, including the added,
+            changed, removed and carried counts of the merge
+        """
+        self.should_stop = False
 
-        if texts_to_translate:
-            if progress_callback:
-                progress_callback(0, len(texts_to_translate), "Starting batch translation...")
+        metrics = RunMetrics()
+
+        def merge():
+            with metrics.activate():
+                template = load_po_file(pot_file)
+                previous = load_po_file(po_file)
+            with metrics.phase("merge"):
+                return merge_catalog(template, previous)
+
+        po, changes = merge()
+        run = TranslationRun(
+            self, po, output_file, source_lang, target_lang, progress_callback, metrics,
+            reload=lambda: merge()[0]
+        )
+        del po  # Held by the run only, so it can be released
+        run.stats.update(changes)
+        return self._translate_run(run, error_callback, resume)
+
+    def _translate_run(self, run: "TranslationRun", error_callback: Optional[Callable], resume: bool) -> Dict:
+        """Prepare, translate and save a single run"""
+        run.prepare(resume)
+
+        if run.texts:
+            run.report("Starting batch translation...")
+            try:
+                self._dispatch_batches([run], error_callback)
+            finally:
+                # Keep whatever finished even if the run is interrupted
+                run.flush()
+
+        return run.finish()
+
+    def translate_po_file_multi(
+        self,
+        input_file: str,
+        output_files: Dict[str, str],
+        source_lang: str,
+        progress_callback: Optional[Callable] = None,
+        error_callback: Optional[Callable] = None,
+        resume: bool = False,
+        update: bool = False
+    ) -> Dict[str, Dict]:
+        """
+        Translate one PO file into several languages
 
-            # Translate in batches
-            total_batches = (len(texts_to_translate) + self.batch_size - 1) // self.batch_size
+        The file is sanitized, parsed and scanned once. Batches of all
+        languages share the executor, so they interleave under the same
+        `concurrency` and rate limits.
 
-            for batch_num in range(total_batches):
-                if self.should_stop:
-                    if progress_callback:
-                        progress_callback(0, len(texts_to_translate), "Translation stopped by user")
-                    break
+        Args:
+            input_file: Path to input PO file
+            output_files: Output PO file path per target language code
+            source_lang: Source language code
+            progress_callback: Optional callback function for progress updates (per language)
+            error_callback: Optional callback function for error handling
+            resume: Reuse translations journaled by interrupted runs for the same output files
+            update: Treat the input as a template and merge it into output files that
+                already exist, translating only new or changed strings (see update_po_file)
 
-                start_idx = batch_num * self.batch_size
-                end_idx = min(start_idx + self.batch_size, len(texts_to_translate))
-
-                batch_texts = texts_to_translate[start_idx:end_idx]
-                batch_indices = entry_indices[start_idx:end_idx]
-
-                # Try to translate batch
-                max_retries = 3
-                retry_count = 0
-                success = False
-
-                while retry_count < max_retries and not success:
-                    if self.should_stop:
-                        break
-
-                    try:
-                        if progress_callback:
-                            progress_callback(
-                                start_idx,
-                                len(texts_to_translate),
-                                f"Translating batch {batch_num + 1}/{total_batches} ({len(batch_texts)} items)..."
-                            )
-
-                        # Translate batch
-                        translations, success, error_msg = self.translate_batch(batch_texts, source_lang, target_lang)
-
-                        if not success:
-                            # API call failed
-                            if error_callback:
-                                action = error_callback(error_msg, batch_num + 1, total_batches)
-                                if action == 'stop':
-                                    self.should_stop = True
-                                    break
-                                elif action == 'skip':
-                                    # Use original texts
-                                    translations = batch_texts
-                                    success = True
-                                elif action == 'retry':
-                                    retry_count += 1
-                                    if retry_count < max_retries:
-                                        if progress_callback:
-                                            progress_callback(
-                                                start_idx,
-                                                len(texts_to_translate),
-                                                f"Retrying batch {batch_num + 1} (attempt {retry_count + 1}/{max_retries})..."
-                                            )
-                                        continue
-                                    else:
-                                        # Max retries reached, skip this batch
-                                        translations = batch_texts
-                                        success = True
-                            else:
-                                # No error callback, use original texts
-                                translations = batch_texts
-                                success = True
-
-                        if success:
-                            # Apply translations
-                            for idx, translation in zip(batch_indices, translations):
-                                entry = po[idx]
-                                entry.msgstr = translation
-
-                    except Exception as e:
-                        stats["errors"] += len(batch_texts)
-                        print(f"Error in batch {batch_num + 1}: {e}")
-                        if error_callback:
-                            action = error_callback(str(e), batch_num + 1, total_batches)
-                            if action == 'stop':
-                                self.should_stop = True
-                                break
-                        break
-
-                if progress_callback:
-                    progress_callback(end_idx, len(texts_to_translate), f"Completed batch {batch_num + 1}/{total_batches}")
+        Returns:
+            Dictionary with translation statistics per target language; the
+            shared loading and scanning time is included in each language's metrics
+        """
+        self.should_stop = False
 
-        # Update language in metadata
-        if po.metadata:
-            po.metadata["Language"] = target_lang
+        if self.catalog_streaming and not update:
+            return self._translate_streams(
+                input_file, output_files, source_lang,
+                {lang: self._language_progress(progress_callback, lang) for lang in output_files},
+                error_callback, resume
+            )
+
+        shared_metrics = RunMetrics()
+
+        # Sanitize the PO file to fix unescaped quotes while loading it
+        with shared_metrics.activate():
+            po = load_po_file(input_file)
+        with shared_metrics.phase("scan"):
+            scanned = TranslationRun.scan(po)
+
+        runs = []
+        for target_lang, output_file in output_files.items():
+            language_progress = self._language_progress(progress_callback, target_lang)
+            metrics = RunMetrics()
+            metrics.merge(shared_metrics)
+            if update and os.path.exists(output_file):
+                def merge(template, output_file=output_file):
+                    previous = load_po_file(output_file)
+                    with timed_phase("merge"):
+                        return merge_catalog(template, previous)
+
+                with metrics.activate():
+                    catalog, changes = merge(po)
+                run = TranslationRun(
+                    self, catalog, output_file, source_lang, target_lang, language_progress, metrics,
+                    reload=lambda merge=merge: merge(load_po_file(input_file))[0]
+                )
+                del catalog
+                run.stats.update(changes)
+                run.prepare(resume)
+            else:
+                run = TranslationRun(
+                    self, _fork_catalog(po, scanned[0]), output_file, source_lang, target_lang,
+                    language_progress, metrics, reload=lambda: load_po_file(input_file)
+                )
+                run.prepare(resume, scanned)
+            runs.append(run)
+        # Released runs hold no reference to the shared catalog any more
+        del po
+
+        pending = [run for run in runs if run.texts]
+        try:
+            for run in pending:
+                run.report("Starting batch translation...")
+            self._dispatch_batches(pending, error_callback)
+        finally:
+            for run in pending:
+                run.flush()
 
-        # Save the translated PO file with wrap width set to 0 to prevent line wrapping
-        po.wrapwidth = 0  # Disable line wrapping
-        po.save(output_file)
+        return {run.target_lang: run.finish() for run in runs}
 
-        return stats
+    @staticmethod
+    def _language_progress(progress_callback: Optional[Callable], target_lang: str) -> Optional[Callable]:
+        """Wrap a progress callback to prefix its messages with the target language"""
+        if not progress_callback:
+            return None
+
+        def language_progress(current, total, message):
+            progress_callback(current, total, f"[{target_lang}] {message}")
+        return language_progress
+
+    def _translate_streams(
+        self,
+        input_file: str,
+        output_files: Dict[str, str],
+        source_lang: str,
+        progress_callbacks: Dict[str, Optional[Callable]],
+        error_callback: Optional[Callable],
+        resume: bool
+    ) -> Dict[str, Dict]:
+        """
+        Translate a file read and written in windows of entries (see set_catalog_streaming)
+
+        Each window is read and scanned once and translated as one run per
+        target language. The dispatcher takes the next window whenever no
+        run has a batch to send, so windows overlap under `concurrency`. If
+        the translation is stopped, the rest of the file is still written,
+        untranslated.
+
+        Returns:
+            Dictionary with translation statistics per target language
+        """
+        read_metrics = RunMetrics()
+        with read_metrics.phase("parse"):
+            reader = stream_po_file(input_file)
+
+        streams = {}
+        try:
+            for target_lang, output_file in output_files.items():
+                streams[target_lang] = CatalogStream(
+                    self, reader, output_file, source_lang, target_lang,
+                    progress_callbacks.get(target_lang), resume
+                )
+            owners = {}
+
+            def windows():
+                offset = 0
+                while True:
+                    # Sanitized and parsed as they are read
+                    with read_metrics.phase("parse"):
+                        entries = list(islice(reader, self.stream_window_size))
+                    if not entries:
+                        return
+                    window = polib.POFile(wrapwidth=0)
+                    window.metadata = dict(reader.metadata)
+                    window.extend(entries)
+                    with read_metrics.phase("scan"):
+                        scanned = TranslationRun.scan(window)
+                    for stream in streams.values():
+                        catalog = window if len(streams) == 1 else _fork_catalog(window, scanned[0])
+                        run = stream.open_window(catalog, offset, scanned)
+                        if run.texts:
+                            owners[run] = stream
+                            yield run
+                        else:
+                            stream.close_window(run)
+                    offset += len(entries)
+
+            for stream in streams.values():
+                stream.report("Starting batch translation...")
+            pending = windows()
+            try:
+                self._dispatch_batches(
+                    [], error_callback, pending, on_done=lambda run: owners.pop(run).close_window(run)
+                )
+            finally:
+                # Keep whatever finished even if the run is interrupted
+                for stream in streams.values():
+                    stream.flush()
+
+            # Stopped: write what was translated, then the rest of the file
+            for run in list(owners):
+                owners.pop(run).close_window(run)
+            for run in pending:
+                owners.pop(run).close_window(run)
+
+            return {lang: stream.finish(read_metrics) for lang, stream in streams.items()}
+        except BaseException:
+            for stream in streams.values():
+                stream.abort()
+            raise
+        finally:
+            reader.close()
+
+    def _dispatch_batches(self, runs: List["TranslationRun"], error_callback: Optional[Callable],
+                          more_runs: Optional[Iterator["TranslationRun"]] = None,
+                          on_done: Optional[Callable[["TranslationRun"], None]] = None):
+        """
+        Translate runs' texts in batches, keeping up to `concurrency` batches in flight
+
+        Batches are taken from the runs in turn, and results are applied in
+        whatever order the batches complete. Once a run has nothing left in
+        flight, its deferred texts get their round (see retry_deferred).
+
+        Args:
+            runs: Prepared runs with texts to translate
+            error_callback: Optional callback function for error handling
+            more_runs: Further runs, taken one at a time whenever no run has a batch to send
+                (e.g. windows of a streamed file)
+            on_done: Called with each run that is done, in the order they finish
+        """
+        runs = list(runs)
+        in_flight = {}
+        turn = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                if not self.should_stop and len(in_flight) < self.concurrency:
+                    ready = [run for run in runs if run.has_next()]
+                    if ready:
+                        run = ready[turn % len(ready)]
+                        turn += 1
+                        batch_num, items = run.next_batch()
+                        future = executor.submit(
+                            self._run_batch,
+                            run.batch_texts(items),
+                            batch_num,
+                            run.total_batches,
+                            run.source_lang,
+                            run.target_lang,
+                            run.report,
+                            error_callback,
+                            run.item_callback(batch_num, items) if self.streaming else None,
+                            run.metrics,
+                            run.batch_attempt(items)
+                        )
+                        in_flight[future] = (run, batch_num, items)
+                        continue
+                    run = next(more_runs, None) if more_runs is not None else None
+                    if run is not None:
+                        runs.append(run)
+                        continue
+                    more_runs = None
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    run, batch_num, items = in_flight.pop(future)
+                    translations, outcome, errors = future.result()
+                    run_in_flight = sum(1 for other, _, _ in in_flight.values() if other is run)
+                    run.apply(batch_num, items, translations, outcome, errors, run_in_flight)
+                    if run_in_flight or run.has_next() or self.should_stop:
+                        continue
+                    # Texts that failed get another round once the rest of the run is done
+                    if not run.retry_deferred():
+                        runs.remove(run)
+                        if on_done is not None:
+                            on_done(run)
+
+        for run in runs:
+            # Runs still listed were cut short
+            run.stopped = True
+            if run.has_next():
+                run.report("Translation stopped by user")
 
     def get_language_name(self, lang_code: str) -> str:
         """
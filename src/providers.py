@@ -0,0 +1,304 @@
+"""
+PO Translator (PO翻译器) - Provider Adapters
+Request and response formats of the supported AI provider APIs
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+
+SYSTEM_PROMPT = "You are a professional translator. Provide accurate and natural translations."
+
+
+class ProviderAdapter:
+    """
+    Request and response format of one provider's chat API
+
+    Adapters are registered by the provider names used in
+    POTranslator.api_endpoints (see register_adapter). Every adapter sends
+    a whole batch prompt in one request.
+    """
+
+    # Whether the API accepts response_format={"type": "json_object"}
+    supports_json_mode = False
+    # Whether the API can send the completion as server-sent events
+    supports_streaming = False
+
+    def build_request(self, endpoint: str, api_key: str, model: str, prompt: str,
+                      max_tokens: int, json_mode: bool = False, stream: bool = False) -> Tuple[str, Dict, Dict]:
+        """
+        Build the HTTP request for one prompt
+
+        Args:
+            endpoint: Endpoint URL configured for the provider
+            api_key: API key
+            model: Model name
+            prompt: Translation prompt
+            max_tokens: Completion token limit
+            json_mode: Ask for a JSON object response (only if supports_json_mode)
+            stream: Ask for a server-sent event stream (only if supports_streaming)
+
+        Returns:
+            Tuple of (endpoint URL, headers, JSON payload)
+        """
+        raise NotImplementedError
+
+    def parse_response(self, result: Dict) -> Tuple[str, bool]:
+        """
+        Extract the completion from a response body
+
+        Returns:
+            Tuple of (completion text, whether it was cut off at the token limit)
+
+        Raises:
+            requests.exceptions.HTTPError: If the body reports an API error
+        """
+        raise NotImplementedError
+
+    def parse_usage(self, result: Dict) -> Optional[Tuple[int, int]]:
+        """
+        Extract the token usage from a response body or stream event
+
+        Returns:
+            Tuple of (prompt tokens, completion tokens), or None if the body reports no usage
+        """
+        usage = result.get("usage") if isinstance(result, dict) else None
+        if not isinstance(usage, dict):
+            return None
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+    def parse_stream_chunk(self, chunk: Dict) -> Tuple[str, bool]:
+        """
+        Extract the new completion text from one server-sent event
+
+        Returns:
+            Tuple of (text added by this event, whether the completion was cut off at the token limit)
+
+        Raises:
+            requests.exceptions.HTTPError: If the event reports an API error
+        """
+        raise NotImplementedError
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """Chat completions API of OpenAI and the providers that copy it"""
+
+    supports_streaming = True
+
+    def __init__(self, supports_json_mode: bool = False):
+        self.supports_json_mode = supports_json_mode
+
+    def build_request(self, endpoint, api_key, model, prompt, max_tokens, json_mode=False, stream=False):
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            "max_tokens": max_tokens
+        }
+        if json_mode and self.supports_json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        if stream:
+            payload["stream"] = True
+        return endpoint, headers, payload
+
+    def parse_response(self, result):
+        choice = result["choices"][0]
+        return choice["message"]["content"], choice.get("finish_reason") == "length"
+
+    def parse_stream_chunk(self, chunk):
+        if "error" in chunk:
+            raise requests.exceptions.HTTPError(f"API error: {chunk['error'].get('message')}")
+        if not chunk.get("choices"):
+            return "", False
+        choice = chunk["choices"][0]
+        return choice.get("delta", {}).get("content") or "", choice.get("finish_reason") == "length"
+
+
+class ZhipuAdapter(ProviderAdapter):
+    """
+    Zhipu AI model API (v3, `.../model-api/<model>/invoke`)
+
+    The API key has the form "<id>.<secret>" and is exchanged for a
+    short-lived HS256 JWT, which is cached until shortly before it expires.
+    """
+
+    TOKEN_TTL = 3600  # Seconds a signed token is valid
+
+    def __init__(self):
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def auth_token(self, api_key: str) -> str:
+        """
+        Get a signed token for an "<id>.<secret>" API key
+
+        Raises:
+            requests.exceptions.RequestException: If the key is not in that form
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._tokens.get(api_key)
+            if cached and cached[1] - now > 60:
+                return cached[0]
+
+            key_id, _, secret = api_key.partition(".")
+            if not key_id or not secret:
+                raise requests.exceptions.RequestException("Zhipu API key must have the form <id>.<secret>")
+
+            expires = now + self.TOKEN_TTL
+            header = {"alg": "HS256", "sign_type": "SIGN"}
+            claims = {"api_key": key_id, "exp": int(expires * 1000), "timestamp": int(now * 1000)}
+            signing_input = f"{_b64url(json.dumps(header, separators=(',', ':')))}." \
+                            f"{_b64url(json.dumps(claims, separators=(',', ':')))}"
+            signature = hmac.new(secret.encode("utf-8"), signing_input.encode("ascii"), hashlib.sha256).digest()
+            token = f"{signing_input}.{_b64url(signature)}"
+            self._tokens[api_key] = (token, expires)
+            return token
+
+    def build_request(self, endpoint, api_key, model, prompt, max_tokens, json_mode=False, stream=False):
+        # The model is part of the URL
+        endpoint = re.sub(r'/model-api/[^/]+/invoke$', f'/model-api/{model}/invoke', endpoint)
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": self.auth_token(api_key)
+        }
+        # No system role in this API version
+        payload = {
+            "prompt": [{"role": "user", "content": f"{SYSTEM_PROMPT}\n\n{prompt}"}],
+            "temperature": 0.3
+        }
+        return endpoint, headers, payload
+
+    def parse_response(self, result):
+        if not result.get("success", True) or result.get("code", 200) != 200:
+            raise requests.exceptions.HTTPError(f"Zhipu API error {result.get('code')}: {result.get('msg')}")
+        content = result["data"]["choices"][0]["content"]
+        # The content comes back as a JSON string literal
+        if len(content) >= 2 and content.startswith('"') and content.endswith('"'):
+            try:
+                content = json.loads(content)
+            except ValueError:
+                pass
+        return content, False
+
+    def parse_usage(self, result: Dict) -> Optional[Tuple[int, int]]:
+        data = result.get("data") if isinstance(result, dict) else None
+        return super().parse_usage(data)
+
+
+class DashScopeAdapter(ProviderAdapter):
+    """Alibaba DashScope text generation API (Qwen models)"""
+
+    supports_streaming = True
+
+    def build_request(self, endpoint, api_key, model, prompt, max_tokens, json_mode=False, stream=False):
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        payload = {
+            "model": model,
+            "input": {
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+            },
+            "parameters": {
+                "result_format": "message",
+                "temperature": 0.3,
+                "max_tokens": max_tokens
+            }
+        }
+        if stream:
+            headers["X-DashScope-SSE"] = "enable"
+            # Each event carries only the new text
+            payload["parameters"]["incremental_output"] = True
+        return endpoint, headers, payload
+
+    def parse_response(self, result):
+        if result.get("code"):
+            raise requests.exceptions.HTTPError(f"DashScope API error {result['code']}: {result.get('message')}")
+        output = result["output"]
+        if "choices" in output:
+            choice = output["choices"][0]
+            return choice["message"]["content"], choice.get("finish_reason") == "length"
+        # Plain text result format
+        return output["text"], output.get("finish_reason") == "length"
+
+    def parse_stream_chunk(self, chunk):
+        # Events have the same shape as a whole response
+        return self.parse_response(chunk)
+
+    def parse_usage(self, result: Dict) -> Optional[Tuple[int, int]]:
+        usage = result.get("usage") if isinstance(result, dict) else None
+        if not isinstance(usage, dict):
+            return None
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+def _b64url(data) -> str:
+    """Base64url-encode without padding, as used in JWTs"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+_OPENAI_COMPATIBLE = OpenAICompatibleAdapter()
+
+PROVIDER_ADAPTERS: Dict[str, ProviderAdapter] = {
+    "openai": OpenAICompatibleAdapter(supports_json_mode=True),
+    "deepseek": OpenAICompatibleAdapter(supports_json_mode=True),
+    "zhipu": ZhipuAdapter(),
+    "moonshot": OpenAICompatibleAdapter(supports_json_mode=True),
+    "qwen": DashScopeAdapter(),
+    "huawei_maas": _OPENAI_COMPATIBLE,
+    "custom": _OPENAI_COMPATIBLE,
+}
+
+
+def register_adapter(provider: str, adapter: ProviderAdapter):
+    """
+    Register (or replace) the adapter of a provider
+
+    Args:
+        provider: Provider name, as used in POTranslator.api_endpoints
+        adapter: Adapter handling the provider's request and response format
+    """
+    PROVIDER_ADAPTERS[provider] = adapter
+
+
+def get_adapter(provider: str) -> ProviderAdapter:
+    """Get the adapter of a provider; unknown providers are treated as OpenAI-compatible"""
+    return PROVIDER_ADAPTERS.get(provider, _OPENAI_COMPATIBLE)
@@ -0,0 +1,194 @@
+"""
+PO Translator (PO翻译器) - Rate Limiting
+Token-bucket rate limiter and backoff helpers for provider API limits
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an HTTP Retry-After header
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+
+    Returns:
+        Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Exponential backoff delay with full jitter
+
+    Args:
+        attempt: 0-based retry attempt
+        base: Delay ceiling of the first attempt in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        Random delay between 0 and min(cap, base * 2 ** attempt)
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate
+
+    The bucket holds at most `capacity` tokens and starts full. A request
+    larger than the capacity is let through once the bucket is full, so
+    oversized requests are slowed down rather than blocked forever. Not
+    locked by itself; RateLimiter serializes access.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def try_take(self, amount: float) -> float:
+        """
+        Take tokens if available (caller holds the limiter lock)
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0.0
+        return (amount - self._tokens) / self.refill_per_second
+
+    def put_back(self, amount: float):
+        """Return tokens taken by a request that was not sent (caller holds the limiter lock)"""
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for one provider/model
+
+    Every API call acquires one request and its estimated tokens before it
+    is sent. After a 429 response, `pause` holds back all callers until the
+    provider's Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            requests_per_minute: Maximum requests per minute (None for no limit)
+            tokens_per_minute: Maximum prompt + completion tokens per minute (None for no limit)
+            clock: Monotonic clock, replaceable for tests
+            sleep: Sleep function, replaceable for tests
+        """
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, clock) \
+            if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, clock) \
+            if tokens_per_minute else None
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """
+        Take one request with `tokens` tokens if it may be sent now
+
+        Never blocks, so asyncio callers can wait with `asyncio.sleep` instead.
+
+        Args:
+            tokens: Estimated prompt + completion tokens of the request
+
+        Returns:
+            0 if the request may be sent, otherwise seconds to wait before trying again
+        """
+        with self._lock:
+            wait = self._paused_until - self._clock()
+            if wait <= 0 and self.requests is not None:
+                wait = self.requests.try_take(1)
+            if wait <= 0 and self.tokens is not None:
+                wait = self.tokens.try_take(tokens)
+                if wait > 0 and self.requests is not None:
+                    # Give back the request slot while waiting for tokens
+                    self.requests.put_back(1)
+            return max(0.0, wait)
+
+    def acquire(self, tokens: int = 0, cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Block until one request with `tokens` tokens may be sent
+
+        Args:
+            tokens: Estimated prompt + completion tokens of the request
+            cancelled: Optional callable; waiting is abandoned once it returns True
+
+        Returns:
+            True when the request may be sent, False if waiting was cancelled
+        """
+        while True:
+            if cancelled and cancelled():
+                return False
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            # Wake up regularly so cancellation is noticed
+            self._sleep(min(wait, 0.5))
+
+    def pause(self, seconds: float):
+        """
+        Hold back every caller for `seconds` (e.g. after a 429 response)
+
+        Args:
+            seconds: How long no request may be sent
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
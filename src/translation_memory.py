@@ -0,0 +1,402 @@
+"""
+PO Translator (PO翻译器) - Translation Memory
+Persistent cache of previous translations shared across runs and catalogs
+
+Copyright (C) 2026 LI, Fang (黎昉)
+Copyright (C) 2026 Zokin Design, LLC. (上海左晶多媒体设计有限公司)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def ngrams(text: str, n: int = 3) -> set:
+    """Get the set of lowercase character n-grams of a text, padded with spaces"""
+    text = f" {text.lower()} "
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NGramIndex:
+    """
+    In-memory near-match index over character n-grams
+
+    Similarity is the Jaccard index of the n-gram sets. Candidates come from
+    MinHash locality-sensitive hashing: each string's signature is split
+    into `bands` bands of `rows` values, and strings sharing any band land
+    in the same bucket. A lookup only verifies the strings in its buckets,
+    so it costs about the same on a hundred or a hundred thousand entries.
+    With the defaults, strings 70% similar are found about 94% of the time
+    and 80% similar ones practically always.
+    """
+
+    _MASK = (1 << 61) - 1
+
+    def __init__(self, n: int = 3, bands: int = 10, rows: int = 4, seed: int = 1):
+        self.n = n
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self._coefficients = [
+            (rng.randrange(1, self._MASK) | 1, rng.randrange(self._MASK)) for _ in range(bands * rows)
+        ]
+        self._buckets: List[Dict[int, object]] = [{} for _ in range(bands)]
+        self._gram_hashes: Dict[str, tuple] = {}
+        self._sizes = array('i')
+        self._entries: List[Tuple[str, str]] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _hashes(self, gram: str) -> tuple:
+        """Get the hash values of one n-gram under every permutation (cached)"""
+        hashes = self._gram_hashes.get(gram)
+        if hashes is None:
+            h = hash(gram)
+            hashes = self._gram_hashes[gram] = tuple([(h * a + b) & self._MASK for a, b in self._coefficients])
+        return hashes
+
+    def _band_keys(self, grams: set) -> List[int]:
+        """Get the bucket key of every band of a MinHash signature"""
+        signature = list(map(min, zip(*map(self._hashes, grams))))
+        rows = self.rows
+        return [hash(tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, msgid: str, msgstr: str):
+        """Index a translated string, or update the translation of an indexed one"""
+        existing = self._ids.get(msgid)
+        if existing is not None:
+            self._entries[existing] = (msgid, msgstr)
+            return
+
+        entry_id = len(self._entries)
+        grams = ngrams(msgid, self.n)
+        self._entries.append((msgid, msgstr))
+        self._sizes.append(len(grams))
+        self._ids[msgid] = entry_id
+        for buckets, key in zip(self._buckets, self._band_keys(grams)):
+            bucket = buckets.get(key)
+            # Most buckets hold a single entry; only shared ones get an array
+            if bucket is None:
+                buckets[key] = entry_id
+            elif isinstance(bucket, int):
+                buckets[key] = array('i', (bucket, entry_id))
+            else:
+                bucket.append(entry_id)
+
+    def search(self, text: str, threshold: float = 0.7, limit: int = 1) -> List[Tuple[float, str, str]]:
+        """
+        Find indexed strings similar to a text
+
+        Args:
+            text: Text to match
+            threshold: Minimum similarity (0-1)
+            limit: Maximum number of matches
+
+        Returns:
+            (similarity, msgid, msgstr) tuples, most similar first
+        """
+        if not self._entries:
+            return []
+        grams = ngrams(text, self.n)
+        size = len(grams)
+
+        candidates = set()
+        for buckets, key in zip(self._buckets, self._band_keys(grams)):
+            bucket = buckets.get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, int):
+                candidates.add(bucket)
+            else:
+                candidates.update(bucket)
+
+        matches = []
+        for entry_id in candidates:
+            other_size = self._sizes[entry_id]
+            # Sets this different in size cannot be similar enough
+            if not threshold * size <= other_size <= size / max(threshold, 1e-9):
+                continue
+            msgid, msgstr = self._entries[entry_id]
+            shared = len(grams & ngrams(msgid, self.n))
+            similarity = shared / (size + other_size - shared)
+            if similarity >= threshold:
+                matches.append((similarity, msgid, msgstr))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
+
+
+class TranslationMemory:
+    """
+    On-disk translation memory backed by SQLite
+
+    Translations are keyed by (msgid, msgctxt, source language, target
+    language, model). The memory holds at most `max_entries` translations;
+    the least recently used ones are evicted first.
+    """
+
+    def __init__(self, path: str = "translation_memory.db", max_entries: int = 200000):
+        """
+        Open (or create) a translation memory
+
+        Args:
+            path: Path to the SQLite database file (":memory:" for a throwaway memory)
+            max_entries: Maximum number of translations kept before eviction
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, str, str], NGramIndex] = {}
+        # Indexes being built: key -> (translations stored meanwhile, set once built)
+        self._building: Dict[Tuple[str, str, str], Tuple[List[Tuple[str, str]], threading.Event]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS memory (
+                msgid TEXT NOT NULL,
+                msgctxt TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                msgstr TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (msgid, msgctxt, source_lang, target_lang, model)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_last_used ON memory (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def lookup(self, msgid: str, msgctxt: Optional[str], source_lang: str,
+               target_lang: str, model: Optional[str]) -> Optional[str]:
+        """
+        Look up a single translation
+
+        Returns:
+            The stored translation, or None on a miss
+        """
+        found = self.lookup_many([(msgid, msgctxt)], source_lang, target_lang, model)
+        return found.get((msgid, msgctxt))
+
+    def lookup_many(self, keys: Iterable[Tuple[str, Optional[str]]], source_lang: str,
+                    target_lang: str, model: Optional[str]) -> Dict[Tuple[str, Optional[str]], str]:
+        """
+        Look up many translations in one transaction
+
+        Args:
+            keys: (msgid, msgctxt) pairs
+            source_lang: Source language code
+            target_lang: Target language code
+            model: Model name the translations were produced with
+
+        Returns:
+            Dictionary mapping each (msgid, msgctxt) hit to its translation
+        """
+        found = {}
+        now = time.time()
+        with self._lock:
+            for msgid, msgctxt in keys:
+                row = self._conn.execute(
+                    "SELECT msgstr FROM memory WHERE msgid = ? AND msgctxt = ? "
+                    "AND source_lang = ? AND target_lang = ? AND model = ?",
+                    (msgid, msgctxt or "", source_lang, target_lang, model or "")
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                found[(msgid, msgctxt)] = row[0]
+                self._conn.execute(
+                    "UPDATE memory SET last_used = ? WHERE msgid = ? AND msgctxt = ? "
+                    "AND source_lang = ? AND target_lang = ? AND model = ?",
+                    (now, msgid, msgctxt or "", source_lang, target_lang, model or "")
+                )
+            self._conn.commit()
+        return found
+
+    def fuzzy_lookup(self, msgid: str, source_lang: str, target_lang: str, model: Optional[str],
+                     threshold: float = 0.7, limit: int = 1) -> List[Tuple[float, str, str]]:
+        """
+        Find translations of strings similar to `msgid`
+
+        The n-gram index of a language pair and model is built from the
+        database on first use and kept up to date by store_many. Building
+        takes a while on a large memory (about 0.25 ms per translation), so
+        it happens outside the lock: exact lookups and stores go on
+        meanwhile, and other fuzzy lookups of the same key wait for it.
+        Evicted translations may still be suggested until the memory is
+        reopened.
+
+        Args:
+            msgid: Source text to match
+            source_lang: Source language code
+            target_lang: Target language code
+            model: Model name the translations were produced with
+            threshold: Minimum similarity (0-1)
+            limit: Maximum number of matches
+
+        Returns:
+            (similarity, msgid, msgstr) tuples, most similar first
+        """
+        index = self._fuzzy_index((source_lang, target_lang, model or ""))
+        with self._lock:
+            return index.search(msgid, threshold, limit)
+
+    def _fuzzy_index(self, key: Tuple[str, str, str]) -> NGramIndex:
+        """Get the n-gram index of a language pair and model, building it if needed"""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                return index
+            building = self._building.get(key)
+            if building is None:
+                building = self._building[key] = ([], threading.Event())
+                rows = self._conn.execute(
+                    "SELECT msgid, msgstr FROM memory WHERE source_lang = ? AND target_lang = ? AND model = ?",
+                    key
+                ).fetchall()
+            else:
+                rows = None
+
+        stored, built = building
+        if rows is None:
+            # Another thread is building it
+            built.wait()
+            return self._fuzzy_index(key)
+
+        index = NGramIndex()
+        try:
+            for row_msgid, row_msgstr in rows:
+                index.add(row_msgid, row_msgstr)
+        except BaseException:
+            with self._lock:
+                if self._building.get(key) is building:
+                    del self._building[key]
+                built.set()
+            raise
+
+        with self._lock:
+            # Unless invalidated meanwhile, add what was stored and publish it
+            if self._building.get(key) is building:
+                del self._building[key]
+                for row_msgid, row_msgstr in stored:
+                    index.add(row_msgid, row_msgstr)
+                self._indexes[key] = index
+            built.set()
+        return index
+
+    def store(self, msgid: str, msgctxt: Optional[str], msgstr: str, source_lang: str,
+              target_lang: str, model: Optional[str]):
+        """Store a single translation"""
+        self.store_many([(msgid, msgctxt, msgstr)], source_lang, target_lang, model)
+
+    def store_many(self, rows: List[Tuple[str, Optional[str], str]], source_lang: str,
+                   target_lang: str, model: Optional[str]):
+        """
+        Store many translations in one transaction
+
+        Args:
+            rows: (msgid, msgctxt, msgstr) triples
+            source_lang: Source language code
+            target_lang: Target language code
+            model: Model name the translations were produced with
+        """
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            key = (source_lang, target_lang, model or "")
+            index = self._indexes.get(key)
+            building = self._building.get(key)
+            for msgid, msgctxt, msgstr in rows:
+                if index is not None:
+                    index.add(msgid, msgstr)
+                elif building is not None:
+                    building[0].append((msgid, msgstr))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO memory VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (msgid, msgctxt or "", source_lang, target_lang, model or "", msgstr, now)
+                )
+                if cursor.rowcount:
+                    self._count += 1
+                else:
+                    self._conn.execute(
+                        "UPDATE memory SET msgstr = ?, last_used = ? WHERE msgid = ? AND msgctxt = ? "
+                        "AND source_lang = ? AND target_lang = ? AND model = ?",
+                        (msgstr, now, msgid, msgctxt or "", source_lang, target_lang, model or "")
+                    )
+            self._evict()
+            self._conn.commit()
+
+    def invalidate(self, model: Optional[str] = None, source_lang: Optional[str] = None,
+                   target_lang: Optional[str] = None) -> int:
+        """
+        Drop stored translations matching all the given criteria
+
+        Calling it without arguments clears the whole memory.
+
+        Args:
+            model: Only drop translations produced by this model
+            source_lang: Only drop translations from this source language
+            target_lang: Only drop translations into this target language
+
+        Returns:
+            Number of translations removed
+        """
+        conditions = []
+        params = []
+        for column, value in (("model", model), ("source_lang", source_lang), ("target_lang", target_lang)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            removed = self._conn.execute(f"DELETE FROM memory{where}", params).rowcount
+            self._conn.commit()
+            self._indexes.clear()
+            self._building.clear()
+            self._count -= removed
+        return removed
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        """Evict least recently used translations above max_entries (lock held)"""
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM memory WHERE rowid IN "
+                "(SELECT rowid FROM memory ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+            self._count -= overflow
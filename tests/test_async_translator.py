@@ -0,0 +1,259 @@
+"""Tests for the asyncio translation engine"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import polib
+
+# Add src to path so we can import async_translator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import async_translator
+from async_translator import AsyncPOTranslator
+from checkpoint import journal_path
+from metrics import RunMetrics
+from po_translator import POTranslator
+
+
+def make_po_file(msgids):
+    """Write a PO file with one untranslated entry per msgid and return its path"""
+    po = polib.POFile()
+    po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+    for msgid in msgids:
+        po.append(polib.POEntry(msgid=msgid, msgstr=""))
+    fd, path = tempfile.mkstemp(suffix=".po")
+    os.close(fd)
+    po.save(path)
+    return path
+
+
+def run(coroutine):
+    """Run a coroutine on a fresh event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncTranslatePOFile(unittest.TestCase):
+    """Test batch dispatch, stopping and cancellation of the async engine"""
+
+    def setUp(self):
+        self.msgids = [f"String {i}" for i in range(12)]
+        self.input_path = make_po_file(self.msgids)
+        fd, self.output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+    def tearDown(self):
+        for path in (self.input_path, self.output_path, journal_path(self.output_path)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def test_concurrent_batches_map_to_correct_entries(self):
+        """Batch tasks run concurrently and land on their own entries"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(2)
+        translator.set_concurrency(3)
+        state = {"in_flight": 0, "peak": 0}
+
+        async def fake_translate(texts, source_lang, target_lang):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            # Later batches finish first
+            await asyncio.sleep(0.02 / (1 + int(texts[0].split()[1])))
+            state["in_flight"] -= 1
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", new=fake_translate):
+            stats = run(translator.translate_po_file(self.input_path, self.output_path, "en", "zh"))
+
+        for entry in polib.pofile(self.output_path):
+            self.assertEqual(entry.msgstr, f"ZH {entry.msgid}")
+        self.assertEqual(state["peak"], 3)
+        self.assertEqual(stats["untranslated"], len(self.msgids))
+        self.assertFalse(os.path.exists(journal_path(self.output_path)))
+
+    def test_async_error_callback_can_stop(self):
+        """A coroutine error callback is awaited and 'stop' ends dispatch"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(1)
+        translator.set_concurrency(2)
+        calls = []
+
+        async def failing_translate(texts, source_lang, target_lang):
+            calls.append(texts)
+            return texts, False, "boom"
+
+        async def stop(error_msg, batch_num, total_batches):
+            return 'stop'
+
+        with patch.object(translator, "translate_batch", new=failing_translate):
+            run(translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh", error_callback=stop
+            ))
+
+        self.assertLessEqual(len(calls), 2)
+        self.assertTrue(all(not entry.msgstr for entry in polib.pofile(self.output_path)))
+
+    def test_stop_after_skip_matches_threaded_engine(self):
+        """Deferred texts are not retried after a stop, in either engine"""
+        def engine_stats(translator, translate_po_file, make_batch):
+            translator.set_batch_size(4)
+            translator.set_concurrency(1)
+            translator.set_max_attempts(1)
+            actions = iter(['skip', 'stop'])
+            with patch.object(translator, "translate_batch", new=make_batch()):
+                stats = translate_po_file(
+                    self.input_path, self.output_path, "en", "zh",
+                    error_callback=lambda error_msg, batch_num, total_batches: next(actions)
+                )
+            return stats["deferred"], stats["failed"], stats["unsent"], stats["stopped"]
+
+        def outcome(texts):
+            if texts[0] == "String 0":
+                return [f"ZH {text}" for text in texts], True, None
+            return texts, False, "boom"
+
+        def make_async():
+            async def translate_batch(texts, source_lang, target_lang):
+                return outcome(texts)
+            return translate_batch
+
+        def make_sync():
+            return lambda texts, source_lang, target_lang: outcome(texts)
+
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        async_stats = engine_stats(
+            translator, lambda *args, **kwargs: run(translator.translate_po_file(*args, **kwargs)), make_async
+        )
+        threaded = POTranslator(api_provider="openai", api_key="fake")
+        threaded_stats = engine_stats(threaded, threaded.translate_po_file, make_sync)
+
+        self.assertEqual(async_stats, (4, 4, 4, True))
+        self.assertEqual(async_stats, threaded_stats)
+
+    def test_cancellation_keeps_journal_for_resume(self):
+        """Cancelling the task cancels in-flight batches and the run can be resumed"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(2)
+        translator.set_concurrency(2)
+        cancelled = []
+
+        async def slow_after_first(texts, source_lang, target_lang):
+            if texts[0] != "String 0":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(texts)
+                    raise
+            return [f"ZH {text}" for text in texts], True, None
+
+        async def cancel_after_first_batch():
+            task = asyncio.ensure_future(
+                translator.translate_po_file(self.input_path, self.output_path, "en", "zh")
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with patch.object(translator, "translate_batch", new=slow_after_first):
+            run(cancel_after_first_batch())
+
+        self.assertEqual(len(cancelled), 2)
+        self.assertTrue(os.path.exists(journal_path(self.output_path)))
+
+        async def fake_translate(texts, source_lang, target_lang):
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", new=fake_translate):
+            stats = run(translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh", resume=True
+            ))
+        self.assertEqual(stats["resumed"], 2)
+        for entry in polib.pofile(self.output_path):
+            self.assertEqual(entry.msgstr, f"ZH {entry.msgid}")
+
+    def test_blocking_entry_points_are_refused(self):
+        """Entry points that would call the coroutine batches from threads raise instead of saving nothing"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        with self.assertRaises(TypeError):
+            translator.translate_po_file_multi(self.input_path, {"zh": self.output_path}, "en")
+        with self.assertRaises(TypeError):
+            translator.update_po_file(self.input_path, self.input_path, self.output_path, "en", "zh")
+
+
+@unittest.skipIf(async_translator.aiohttp is not None, "aiohttp is installed")
+class TestAsyncRequestsFallback(unittest.TestCase):
+    """Test requests sent through the pooled session on worker threads"""
+
+    def test_translate_batch_waits_out_429(self):
+        """A 429 is retried after asyncio.sleep and the batch succeeds"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "0"})
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"choices": [{"message": {"content": "1. 你好\n2. 世界"}}]}
+        metrics = RunMetrics()
+
+        async def translate():
+            try:
+                with metrics.activate():
+                    return await translator.translate_batch(["Hello", "World"], "en", "zh")
+            finally:
+                await translator.aclose()
+
+        with patch("requests.Session.post", side_effect=[throttled, ok]) as post:
+            translations, success, error = run(translate())
+
+        self.assertTrue(success, error)
+        self.assertEqual(translations, ["你好", "世界"])
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(metrics.counters["throttled"], 1)
+
+    def test_body_sizes_are_counted(self):
+        """Request and response bodies are counted like in the threaded engine"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+
+        ok = MagicMock(status_code=200)
+        ok.request.body = b'{"model": "gpt-4o"}'
+        ok.content = b'{"choices": []}'
+        ok.json.return_value = {"choices": [{"message": {"content": "1. 你好"}}]}
+        metrics = RunMetrics()
+
+        async def translate():
+            try:
+                with metrics.activate():
+                    return await translator.translate_batch(["Hello"], "en", "zh")
+            finally:
+                await translator.aclose()
+
+        with patch("requests.Session.post", return_value=ok):
+            _, success, error = run(translate())
+
+        self.assertTrue(success, error)
+        self.assertEqual(metrics.counters["bytes_sent"], len(ok.request.body))
+        self.assertEqual(metrics.counters["bytes_received"], len(ok.content))
+
+    def test_http_error_is_reported(self):
+        """A failing status is returned as an API error, not raised"""
+        translator = AsyncPOTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+
+        with patch("requests.Session.post", return_value=MagicMock(status_code=500, headers={})):
+            translations, success, error = run(translator.translate_batch(["Hello"], "en", "zh"))
+
+        self.assertFalse(success)
+        self.assertEqual(translations, ["Hello"])
+        self.assertIn("API request failed", error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Tests for the checkpoint journal"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import polib
+
+# Add src to path so we can import checkpoint
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from checkpoint import CheckpointJournal, atomic_save
+
+
+class TestCheckpointJournal(unittest.TestCase):
+    """Test journal buffering, torn writes and language pair checks"""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.output_dir, "out.po")
+
+    def tearDown(self):
+        for name in os.listdir(self.output_dir):
+            os.unlink(os.path.join(self.output_dir, name))
+        os.rmdir(self.output_dir)
+
+    def test_records_are_buffered_until_flush_interval(self):
+        """Nothing beyond the header reaches disk before every_batches batches"""
+        journal = CheckpointJournal(self.output_path, "en", "zh", every_batches=2, every_seconds=3600)
+        journal.start({})
+        journal.record_batch([("Save", None, "保存")])
+        self.assertEqual(CheckpointJournal(self.output_path, "en", "zh").load(), {})
+
+        journal.record_batch([("Open", "menu", "打开")])
+        self.assertEqual(
+            CheckpointJournal(self.output_path, "en", "zh").load(),
+            {(None, "Save"): "保存", ("menu", "Open"): "打开"},
+        )
+
+    def test_torn_line_and_other_language_pair_are_ignored(self):
+        """A half-written last record is dropped; other language pairs don't resume"""
+        journal = CheckpointJournal(self.output_path, "en", "zh", every_batches=1)
+        journal.start({})
+        journal.record_batch([("Save", None, "保存")])
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"msgctxt": null, "msgid": "Op')
+
+        self.assertEqual(journal.load(), {(None, "Save"): "保存"})
+        self.assertEqual(CheckpointJournal(self.output_path, "en", "ja").load(), {})
+
+
+    def test_runs_on_several_threads_share_a_journal(self):
+        """Records from concurrent threads are all journaled, one per line"""
+        journal = CheckpointJournal(self.output_path, "en", "zh", every_batches=3)
+        journal.start({})
+
+        def record(thread):
+            for i in range(200):
+                journal.record_batch([(f"Text {thread}-{i}", None, f"文本 {thread}-{i}")])
+
+        threads = [threading.Thread(target=record, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        journal.flush()
+
+        self.assertEqual(len(journal.load()), 800)
+
+    @unittest.skipIf(os.name == "nt", "POSIX file modes")
+    def test_saved_files_get_the_usual_mode(self):
+        """Outputs and journals are created under the umask and keep the mode of what they replace"""
+        with patch("checkpoint._UMASK", 0o022):
+            atomic_save(polib.POFile(), self.output_path)
+            journal = CheckpointJournal(self.output_path, "en", "zh")
+            journal.start({})
+        self.assertEqual(os.stat(self.output_path).st_mode & 0o777, 0o644)
+        self.assertEqual(os.stat(journal.path).st_mode & 0o777, 0o644)
+
+        os.chmod(self.output_path, 0o640)
+        atomic_save(polib.POFile(), self.output_path)
+        self.assertEqual(os.stat(self.output_path).st_mode & 0o777, 0o640)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Tests for the headless command-line interface"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import polib
+
+# Add src to path so we can import cli
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import cli
+from error_policy import BatchError
+from po_translator import POTranslator
+
+
+def fake_translate(self, texts, source_lang, target_lang):
+    return [f"{target_lang.upper()} {text}" for text in texts], True, None
+
+
+class TestCLI(unittest.TestCase):
+    """Test translating several files into several languages from the command line"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        for name, msgids in (("admin.pot", ["Save", "Cancel"]), ("front.pot", ["Hello"])):
+            po = polib.POFile()
+            po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+            for msgid in msgids:
+                po.append(polib.POEntry(msgid=msgid, msgstr=""))
+            po.save(os.path.join(self.work_dir, name))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_translates_every_file_into_every_language(self):
+        """Each input gets one output per target language and a summary record"""
+        summary_path = os.path.join(self.work_dir, "summary.json")
+        with patch.object(POTranslator, "translate_batch", fake_translate):
+            exit_code = cli.main([
+                self.work_dir, "-t", "zh,ja", "--api-key", "fake", "-j", "3",
+                "--memory", ":memory:", "--summary", summary_path, "-q",
+            ])
+
+        self.assertEqual(exit_code, 0)
+        output = polib.pofile(os.path.join(self.work_dir, "admin-ja.po"))
+        self.assertEqual({e.msgid: e.msgstr for e in output}, {"Save": "JA Save", "Cancel": "JA Cancel"})
+        self.assertEqual(output.metadata["Language"], "ja")
+
+        with open(summary_path, encoding='utf-8') as f:
+            summary = json.load(f)
+        self.assertEqual((summary["files"], summary["jobs"], summary["failed"]), (2, 4, 0))
+        self.assertEqual(
+            sorted(os.path.basename(result["output"]) for result in summary["results"]),
+            ["admin-ja.po", "admin-zh.po", "front-ja.po", "front-zh.po"],
+        )
+
+        # Outputs of a previous run are not picked up as inputs
+        self.assertEqual(
+            [os.path.basename(path) for path in cli.find_input_files([self.work_dir], ["zh", "ja"], "{stem}-{lang}.po")],
+            ["admin.pot", "front.pot"],
+        )
+
+    def test_stopped_run_fails_the_command(self):
+        """A run stopped by a rejected key is an error in the summary and the exit code"""
+        def rejected(self, texts, source_lang, target_lang):
+            return texts, False, BatchError("401 Unauthorized", "auth", 401)
+
+        summary_path = os.path.join(self.work_dir, "summary.json")
+        with patch.object(POTranslator, "translate_batch", rejected):
+            exit_code = cli.main([
+                os.path.join(self.work_dir, "front.pot"), "-t", "zh", "--api-key", "fake",
+                "--summary", summary_path, "-q",
+            ])
+
+        self.assertEqual(exit_code, 1)
+        with open(summary_path, encoding='utf-8') as f:
+            result = json.load(f)["results"][0]
+        self.assertEqual(result["status"], "error")
+        self.assertTrue(result["stats"]["stopped"])
+        self.assertEqual(result["stats"]["unsent"], 1)
+
+    def test_does_not_import_tkinter(self):
+        """The CLI must run in containers without a display or tkinter"""
+        code = "import sys; import cli; print('tkinter' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Tests for the error policy deciding about failed batches"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import polib
+import requests
+
+# Add src to path so we can import error_policy
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from checkpoint import journal_path
+from error_policy import BatchError, ErrorPolicy, classify_request_error
+from po_translator import POTranslator
+
+
+class TestClassification(unittest.TestCase):
+    """Test telling transient from permanent failures"""
+
+    def test_request_errors(self):
+        """Timeouts, connection errors and HTTP statuses map to their kinds"""
+        unauthorized = requests.exceptions.HTTPError(response=MagicMock(status_code=401))
+        self.assertEqual(classify_request_error(unauthorized), ("auth", 401))
+        self.assertEqual(classify_request_error(requests.exceptions.ReadTimeout()), ("timeout", None))
+        self.assertEqual(classify_request_error(requests.exceptions.ConnectionError()), ("connection", None))
+        # Status only in the message, as raised for the asyncio engine
+        self.assertEqual(
+            classify_request_error(requests.exceptions.HTTPError("503 Error for url: x")), ("server", 503)
+        )
+        self.assertEqual(classify_request_error(requests.exceptions.HTTPError("Prompt too long")), ("unknown", None))
+
+    def test_http_failure_of_a_batch_carries_its_kind(self):
+        """translate_batch reports failures as BatchError, still usable as the message"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        response = MagicMock(status_code=401)
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "401 Client Error: Unauthorized", response=response
+        )
+        with patch("requests.Session.post", return_value=response):
+            _, success, error = translator.translate_batch(["Hello"], "en", "zh")
+
+        self.assertFalse(success)
+        self.assertEqual((error.kind, error.status), ("auth", 401))
+        self.assertIn("Unauthorized", error)
+
+
+class TestErrorPolicy(unittest.TestCase):
+    """Test the decisions of the rules"""
+
+    def test_retries_then_falls_back(self):
+        """Transient errors are retried with growing backoff, then left to the fallback action"""
+        policy = ErrorPolicy()
+        policy.set_rule("timeout", "retry", retries=2, then="skip", backoff_base=1.0, backoff_cap=1.5)
+        timeout = BatchError("timed out", "timeout")
+
+        action, delay = policy.decide(timeout, 1)
+        self.assertEqual(action, "retry")
+        self.assertTrue(0 <= delay <= 1.0)
+        self.assertEqual(policy.decide(timeout, 2)[0], "retry")
+        self.assertEqual(policy.decide(timeout, 3), ("skip", 0.0))
+        self.assertEqual(policy.decide(BatchError("denied", "auth"), 1), ("stop", 0.0))
+        self.assertEqual(policy.decide("plain message", 1), ("ask", 0.0))
+
+
+class TestPolicyInEngine(unittest.TestCase):
+    """Test that the engine applies the policy before asking the user"""
+
+    def setUp(self):
+        po = polib.POFile()
+        po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+        for msgid in ("One", "Two"):
+            po.append(polib.POEntry(msgid=msgid, msgstr=""))
+        fd, self.input_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+        po.save(self.input_path)
+        fd, self.output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+        self.translator = POTranslator(api_provider="openai", api_key="fake")
+        policy = ErrorPolicy()
+        policy.set_rule("timeout", "retry", retries=2, backoff_base=0.0)
+        self.translator.set_error_policy(policy)
+        # Only the first decision matters here; no end-of-run round for skipped texts
+        self.translator.set_max_attempts(3, deferred_retries=0)
+        self.asked = []
+
+    def tearDown(self):
+        for path in (self.input_path, self.output_path, journal_path(self.output_path)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def translate(self, responses):
+        def error_callback(error_msg, batch_num, total_batches):
+            self.asked.append(error_msg)
+            return 'skip'
+
+        with patch.object(self.translator, "translate_batch", side_effect=lambda *args: next(responses)):
+            return self.translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh", error_callback=error_callback
+            )
+
+    def test_transient_failure_is_retried_without_asking(self):
+        """A timeout is retried on its own and the run completes"""
+        timeout = BatchError("API request timed out", "timeout")
+        stats = self.translate(iter([
+            (["One", "Two"], False, timeout),
+            (["一", "二"], True, None),
+        ]))
+
+        self.assertEqual(self.asked, [])
+        self.assertEqual(stats["attempts"], {2: 2})
+        self.assertEqual((stats["stopped"], stats["unsent"]), (False, 0))
+        self.assertEqual([e.msgstr for e in polib.pofile(self.output_path)], ["一", "二"])
+
+    def test_rejected_key_stops_and_unknown_errors_ask(self):
+        """An auth failure stops the run without a prompt; unclassified errors go to the callback"""
+        stats = self.translate(iter([(["One", "Two"], False, BatchError("401 Unauthorized", "auth", 401))]))
+        self.assertEqual(self.asked, [])
+        self.assertTrue(self.translator.should_stop)
+        # A stopped run says so, with the texts it never got translated
+        self.assertEqual((stats["stopped"], stats["unsent"], stats["failed"]), (True, 2, 0))
+
+        self.translate(iter([(["One", "Two"], False, "something odd")]))
+        self.assertEqual(self.asked, ["something odd"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Tests for run metrics and their export"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import polib
+
+# Add src to path so we can import metrics
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import RunMetrics, current_metrics, export_prometheus, timed_phase
+from po_translator import POTranslator
+
+
+class TestRunMetrics(unittest.TestCase):
+    """Test recording into the active metrics and exporting them"""
+
+    def test_phases_record_only_into_active_metrics(self):
+        """timed_phase is a no-op without active metrics and nests activations"""
+        metrics = RunMetrics()
+        with timed_phase("parse"):
+            pass
+        self.assertIsNone(current_metrics())
+
+        with metrics.activate():
+            with timed_phase("parse"):
+                pass
+            with timed_phase("parse"):
+                pass
+        self.assertIsNone(current_metrics())
+        self.assertEqual(metrics.to_dict()["phases"]["parse"]["calls"], 2)
+
+    def test_batch_quantiles(self):
+        """Latencies are summarized with nearest-rank quantiles"""
+        metrics = RunMetrics()
+        for i in range(1, 101):
+            metrics.record_batch(i / 100)
+
+        batches = metrics.to_dict()["batches"]
+        self.assertEqual(batches["count"], 100)
+        self.assertEqual((batches["p50"], batches["p99"], batches["max"]), (0.51, 1.0, 1.0))
+
+    def test_prometheus_text(self):
+        """Runs export as labelled samples, one HELP/TYPE header per family"""
+        zh, ja = RunMetrics(), RunMetrics()
+        zh.count(http_requests=3, tokens_in=120)
+        ja.count(http_requests=1)
+        zh.add_phase("http", 1.5)
+
+        text = export_prometheus([(zh, {"lang": "zh"}), (ja, {"lang": 'j"a'})])
+
+        self.assertEqual(text.count("# TYPE po_translator_http_requests_total counter"), 1)
+        self.assertIn('po_translator_http_requests_total{lang="zh"} 3', text)
+        self.assertIn('po_translator_http_requests_total{lang="j\\"a"} 1', text)
+        self.assertIn('po_translator_phase_seconds_total{lang="zh",phase="http"} 1.5', text)
+        self.assertIn('po_translator_tokens_total{direction="in",lang="zh"} 120', text)
+        self.assertIn('po_translator_batch_latency_seconds_count{lang="zh"} 0', text)
+
+
+class TestTranslationMetrics(unittest.TestCase):
+    """Test the metrics returned with the statistics of a run"""
+
+    def test_run_reports_phases_usage_and_bytes(self):
+        """Loading, HTTP, parsing and saving are timed; usage and body sizes are counted"""
+        po = polib.POFile()
+        po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+        for msgid in ("Hello", "World"):
+            po.append(polib.POEntry(msgid=msgid, msgstr=""))
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        input_path = os.path.join(work_dir, "in.po")
+        output_path = os.path.join(work_dir, "out.po")
+        po.save(input_path)
+
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        response = MagicMock(status_code=200, content=b"x" * 80)
+        response.request.body = b"y" * 300
+        response.json.return_value = {
+            "choices": [{"message": {"content": "1. 你好\n2. 世界"}}],
+            "usage": {"prompt_tokens": 42, "completion_tokens": 7}
+        }
+        with patch("requests.Session.post", return_value=response):
+            stats = translator.translate_po_file(input_path, output_path, "en", "zh")
+
+        data = stats["metrics"].to_dict()
+        json.dumps(data)
+        for phase in ("sanitize", "parse", "scan", "prompt_build", "http", "response_parse", "save"):
+            self.assertEqual(data["phases"][phase]["calls"], 1, phase)
+        self.assertEqual(data["batches"]["count"], 1)
+        self.assertEqual((data["http_requests"], data["tokens_in"], data["tokens_out"]), (1, 42, 7))
+        self.assertEqual((data["bytes_sent"], data["bytes_received"]), (300, 80))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+"""Tests for reading and writing PO files entry by entry"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import polib
+
+# Add src to path so we can import po_stream
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from po_stream import POReader, POWriter
+from po_translator import POTranslator, iter_sanitized_lines, load_po_file
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+ENTRY_FIELDS = (
+    "msgctxt", "msgid", "msgid_plural", "msgstr", "msgstr_plural", "flags", "tcomment",
+    "comment", "occurrences", "obsolete", "previous_msgctxt", "previous_msgid",
+)
+
+CATALOG = '''# Example catalog
+# Copyright holder
+#
+#, fuzzy
+msgid ""
+msgstr ""
+"Project-Id-Version: example 1.0\\n"
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\\n"
+
+# Shown on the toolbar
+#. Extracted comment
+#: src/app.py:12 src/menu.py
+#, python-format
+#| msgid "Open %s"
+msgid "Open %s file"
+msgstr ""
+
+msgctxt "menu"
+msgid "Open"
+msgstr ""
+
+msgid "Open"
+msgstr ""
+
+msgid ""
+"A long "
+"message"
+msgstr "Already translated"
+
+msgid "%d file"
+msgid_plural "%d files"
+msgstr[0] ""
+msgstr[1] ""
+msgid "Close"
+msgstr ""
+
+#, fuzzy
+msgid "Maybe"
+msgstr "Peut-être"
+
+#~ msgid "Gone"
+#~ msgstr "Parti"
+
+msgid "Quit"
+msgstr ""
+'''
+
+
+def fake_translate(texts, source_lang, target_lang):
+    """Tag every text with the language; plural texts get two forms"""
+    translations = []
+    for text in texts:
+        if text.startswith('["'):
+            translations.append(f'["{target_lang} one", "{target_lang} many"]')
+        else:
+            translations.append(f"{target_lang}: {text}")
+    return translations, True, None
+
+
+class TestPOReaderWriter(unittest.TestCase):
+    """Test that streamed reading and writing matches polib"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.path = os.path.join(self.work_dir, "catalog.po")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(CATALOG)
+
+    def test_reader_yields_polib_entries(self):
+        """Header, metadata and every entry field match polib's parse"""
+        for path in (self.path, os.path.join(FIXTURES_DIR, 'malformed_quotes.po')):
+            po = load_po_file(path)
+            with POReader(path, iter_sanitized_lines) as reader:
+                entries = list(reader)
+                self.assertEqual(
+                    (reader.header, reader.metadata, reader.metadata_is_fuzzy),
+                    (po.header, po.metadata, po.metadata_is_fuzzy),
+                )
+            self.assertEqual(len(entries), len(po))
+            for entry, expected in zip(entries, po):
+                for field in ENTRY_FIELDS:
+                    self.assertEqual(getattr(entry, field), getattr(expected, field), field)
+
+    def test_reader_parses_lazily(self):
+        """Only the header has been read before iterating"""
+        with POReader(self.path) as reader:
+            self.assertEqual(reader.metadata["Project-Id-Version"], "example 1.0")
+            self.assertEqual(next(iter(reader)).msgid, "Open %s file")
+
+    def test_writer_orders_entries_like_polib_save(self):
+        """Entries handed in out of order come out as polib writes the catalog"""
+        po = polib.pofile(self.path)
+        po.wrapwidth = 0
+        expected_path = os.path.join(self.work_dir, "expected.po")
+        po.save(expected_path)
+
+        output_path = os.path.join(self.work_dir, "out.po")
+        writer = POWriter(output_path, po.header, po.metadata, po.metadata_is_fuzzy)
+        for index in reversed(range(len(po))):
+            writer.write(index, po[index])
+            self.assertFalse(os.path.exists(output_path))
+        writer.close()
+
+        with open(output_path, encoding="utf-8") as f, open(expected_path, encoding="utf-8") as g:
+            self.assertEqual(f.read(), g.read())
+        if os.name != "nt":
+            # Not the owner-only mode of the temporary file
+            self.assertEqual(os.stat(output_path).st_mode & 0o777, os.stat(expected_path).st_mode & 0o777)
+
+    def test_writer_refuses_missing_entries(self):
+        """Closing with a gap discards the output instead of writing a partial file"""
+        output_path = os.path.join(self.work_dir, "out.po")
+        writer = POWriter(output_path)
+        writer.write(1, polib.POEntry(msgid="Second"))
+        with self.assertRaises(ValueError):
+            writer.close()
+        self.assertEqual(os.listdir(self.work_dir), ["catalog.po"])
+
+
+class TestStreamedTranslation(unittest.TestCase):
+    """Test translating a file window by window"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.input_path = os.path.join(self.work_dir, "catalog.po")
+        with open(self.input_path, "w", encoding="utf-8") as f:
+            f.write(CATALOG)
+
+    def translate(self, output_name, streaming, **kwargs):
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_concurrency(2)
+        translator.set_batch_size(2)
+        translator.set_catalog_streaming(streaming, window_size=2)
+        output_path = os.path.join(self.work_dir, output_name)
+        with patch.object(translator, "translate_batch", side_effect=kwargs.pop("translate", fake_translate)):
+            stats = translator.translate_po_file(self.input_path, output_path, "en", "fr", **kwargs)
+        with open(output_path, encoding="utf-8") as f:
+            return stats, f.read()
+
+    def test_streamed_output_matches_whole_file_translation(self):
+        """Windows written as they complete give the same file and counts as loading it whole"""
+        progress = []
+        streamed_stats, streamed = self.translate(
+            "streamed.po", True, progress_callback=lambda done, total, message: progress.append((done, total))
+        )
+        loaded_stats, loaded = self.translate("loaded.po", False)
+
+        self.assertEqual(streamed, loaded)
+        for key in ("total", "translated", "fuzzy", "untranslated", "plural", "unique", "dedup_ratio"):
+            self.assertEqual(streamed_stats[key], loaded_stats[key], key)
+        self.assertEqual(progress[-1], (6, 6))
+        # Each of the five windows is written as it completes, then the file is moved into place
+        self.assertEqual(streamed_stats["metrics"].to_dict()["phases"]["save"]["calls"], 6)
+        self.assertFalse(os.path.exists(os.path.join(self.work_dir, "streamed.po.journal")))
+
+    def test_stopped_run_still_writes_the_whole_file(self):
+        """Entries after a stop are passed through untranslated"""
+        calls = []
+
+        def stop_after_first(texts, source_lang, target_lang):
+            calls.append(texts)
+            if len(calls) == 1:
+                return fake_translate(texts, source_lang, target_lang)
+            return None, False, "boom"
+
+        stats, content = self.translate(
+            "stopped.po", True, translate=stop_after_first,
+            error_callback=lambda error_msg, batch_num, total_batches: 'stop'
+        )
+
+        output = polib.pofile(content)
+        self.assertEqual(len(output), len(polib.pofile(CATALOG)))
+        self.assertEqual(output[0].msgstr, "fr: Open %s file")
+        self.assertEqual(output.find("Quit").msgstr, "")
+        self.assertEqual(stats["total"], 9)
+        self.assertTrue(stats["stopped"])
+        self.assertGreater(stats["unsent"], 0)
+
+    def test_multi_language_reads_the_file_once(self):
+        """Every language gets its own file from a single pass over the source"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_catalog_streaming(window_size=3)
+        output_files = {lang: os.path.join(self.work_dir, f"{lang}.po") for lang in ("fr", "de")}
+
+        with patch.object(translator, "translate_batch", side_effect=fake_translate), \
+                patch("po_translator.POReader", wraps=POReader) as reader:
+            results = translator.translate_po_file_multi(self.input_path, output_files, "en")
+
+        self.assertEqual(reader.call_count, 1)
+        for lang, output_file in output_files.items():
+            output = polib.pofile(output_file)
+            self.assertEqual(output.find("Quit").msgstr, f"{lang}: Quit")
+            self.assertEqual(output.metadata["Language"], lang)
+            self.assertEqual(results[lang]["untranslated"], 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
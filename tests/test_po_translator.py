@@ -1,21 +1,57 @@
 """Tests for PO Translator core translation engine"""
 
+import json
 import os
+import shutil
 import sys
 import tempfile
+import threading
+import time
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import polib
+import requests
 
 # Add src to path so we can import po_translator
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from po_translator import POTranslator, sanitize_po_file
+from checkpoint import journal_path
+from metrics import RunMetrics
+from po_translator import (
+    BatchPlanner,
+    ContextWindowError,
+    EntryGroups,
+    POTranslator,
+    StreamParser,
+    TranslationRun,
+    _escape_inner_quotes,
+    iter_sanitized_lines,
+    load_po_file,
+    merge_catalog,
+    parse_json_translations,
+    parse_numbered_translations,
+    plural_forms_for,
+    sanitize_po_file,
+    set_entry_translation,
+)
+from translation_memory import TranslationMemory
 
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
 
 
+def make_po_file(msgids):
+    """Write a PO file with one untranslated entry per msgid and return its path"""
+    po = polib.POFile()
+    po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+    for msgid in msgids:
+        po.append(polib.POEntry(msgid=msgid, msgstr=""))
+    fd, path = tempfile.mkstemp(suffix=".po")
+    os.close(fd)
+    po.save(path)
+    return path
+
+
 class TestQuoteEscaping(unittest.TestCase):
     """Test that quotes and backslashes in translations are not double-escaped"""
 
@@ -138,6 +174,67 @@ class TestSanitizePOFile(unittest.TestCase):
         finally:
             os.unlink(sanitized_path)
 
+    def test_escape_inner_quotes_edge_cases(self):
+        """Only bare quotes are escaped; escape sequences and valid lines are returned as-is"""
+        cases = {
+            'plain text': 'plain text',
+            'already \\"escaped\\"': 'already \\"escaped\\"',
+            'bare "quote"': 'bare \\"quote\\"',
+            'backslash then quote \\\\"': 'backslash then quote \\\\\\"',
+            '"': '\\"',
+            'trailing backslash \\': 'trailing backslash \\',
+            'mixed \\" and "': 'mixed \\" and \\"',
+        }
+        for content, expected in cases.items():
+            self.assertEqual(_escape_inner_quotes(content), expected, content)
+
+        valid = 'no quotes here'
+        self.assertIs(_escape_inner_quotes(valid), valid)
+
+    def test_load_po_file_sanitizes_in_memory(self):
+        """load_po_file parses a malformed file without an intermediate file"""
+        malformed_path = os.path.join(FIXTURES_DIR, 'malformed_quotes.po')
+
+        with patch("tempfile.mkstemp") as mkstemp:
+            po = load_po_file(malformed_path)
+        mkstemp.assert_not_called()
+
+        sanitized_path = tempfile.mkstemp(suffix=".po")[1]
+        try:
+            sanitize_po_file(malformed_path, sanitized_path)
+            expected = polib.pofile(sanitized_path)
+        finally:
+            os.unlink(sanitized_path)
+        self.assertEqual(
+            [(e.msgctxt, e.msgid) for e in po],
+            [(e.msgctxt, e.msgid) for e in expected],
+        )
+
+    def test_sanitizer_is_lazy_and_in_place_safe(self):
+        """Lines are produced one at a time, and sanitizing a file onto itself works"""
+        consumed = []
+
+        def source():
+            for line in ['msgid "a "b""\n', '# comment\n', 'msgstr ""\n']:
+                consumed.append(line)
+                yield line
+
+        sanitized = iter_sanitized_lines(source())
+        self.assertEqual(next(sanitized), 'msgid "a \\"b\\""\n')
+        self.assertEqual(len(consumed), 1)
+
+        fd, path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+        try:
+            with open(os.path.join(FIXTURES_DIR, 'malformed_quotes.po'), encoding='utf-8') as f:
+                original = f.read()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(original)
+            sanitize_po_file(path, path)
+            self.assertEqual(len([e for e in polib.pofile(path) if e.msgid]), 3)
+        finally:
+            os.unlink(path)
+
     def test_translate_po_file_handles_malformed_input(self):
         """translate_po_file should handle malformed PO files via built-in sanitization"""
         malformed_path = os.path.join(FIXTURES_DIR, 'malformed_quotes.po')
@@ -168,5 +265,885 @@ class TestSanitizePOFile(unittest.TestCase):
             os.unlink(output_path)
 
 
+class TestConcurrentBatches(unittest.TestCase):
+    """Test that batches dispatched concurrently are applied to the right entries"""
+
+    def setUp(self):
+        self.msgids = [f"String {i}" for i in range(23)]
+        self.input_path = make_po_file(self.msgids)
+        fd, self.output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+    def tearDown(self):
+        for path in (self.input_path, self.output_path, journal_path(self.output_path)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def test_out_of_order_completion_maps_to_correct_entries(self):
+        """Translations land on their own entries even when batches finish out of order"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(3)
+        translator.set_concurrency(4)
+
+        lock = threading.Lock()
+        state = {"in_flight": 0, "peak": 0}
+
+        def fake_translate(texts, source_lang, target_lang):
+            with lock:
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+            # Later batches finish first
+            time.sleep(0.05 / (1 + int(texts[0].split()[1])))
+            with lock:
+                state["in_flight"] -= 1
+            return [f"ZH {text}" for text in texts], True, None
+
+        progress = []
+        with patch.object(translator, "translate_batch", side_effect=fake_translate):
+            translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh",
+                progress_callback=lambda current, total, message: progress.append(current)
+            )
+
+        output_po = polib.pofile(self.output_path)
+        for entry in output_po:
+            self.assertEqual(entry.msgstr, f"ZH {entry.msgid}")
+        self.assertGreater(state["peak"], 1)
+        self.assertLessEqual(state["peak"], 4)
+        self.assertEqual(progress[-1], len(self.msgids))
+
+    def test_stop_from_error_callback_stops_dispatch(self):
+        """Choosing 'stop' prevents further batches from being sent"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(1)
+        translator.set_concurrency(2)
+
+        calls = []
+
+        def failing_translate(texts, source_lang, target_lang):
+            calls.append(texts)
+            return texts, False, "boom"
+
+        with patch.object(translator, "translate_batch", side_effect=failing_translate):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh",
+                error_callback=lambda error_msg, batch_num, total_batches: 'stop'
+            )
+
+        self.assertLessEqual(len(calls), 2)
+        self.assertEqual(stats["untranslated"], len(self.msgids))
+        output_po = polib.pofile(self.output_path)
+        self.assertTrue(all(not entry.msgstr for entry in output_po))
+
+
+class TestDeduplication(unittest.TestCase):
+    """Test that repeated strings are translated once and fanned out"""
+
+    def setUp(self):
+        po = polib.POFile()
+        for msgctxt, msgid in [(None, "Save"), ("toolbar", "Save"), (None, "Cancel"),
+                               (None, "Save"), ("toolbar", "Save")]:
+            po.append(polib.POEntry(msgctxt=msgctxt, msgid=msgid, msgstr=""))
+        fd, self.input_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+        po.save(self.input_path)
+        fd, self.output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+    def tearDown(self):
+        for path in (self.input_path, self.output_path, journal_path(self.output_path)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _translate(self, translator):
+        calls = []
+
+        def fake_translate(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=fake_translate):
+            stats = translator.translate_po_file(self.input_path, self.output_path, "en", "zh")
+        return calls, stats
+
+    def test_identical_strings_sent_once_per_context(self):
+        """Each (msgctxt, msgid) pair is sent once and applied to every entry"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        calls, stats = self._translate(translator)
+
+        self.assertEqual(calls, [["Save", "Save", "Cancel"]])
+        self.assertEqual(stats["unique"], 3)
+        self.assertEqual(stats["dedup_ratio"], round(5 / 3, 2))
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+
+    def test_ignore_context_merges_across_contexts(self):
+        """With ignore_context, identical msgids are sent once regardless of msgctxt"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_deduplication(ignore_context=True)
+        calls, stats = self._translate(translator)
+
+        self.assertEqual(calls, [["Save", "Cancel"]])
+        self.assertEqual(stats["dedup_ratio"], 2.5)
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+
+
+class TestConnectionPooling(unittest.TestCase):
+    """Test that API requests reuse a pooled keep-alive session"""
+
+    def test_batches_share_one_session_per_endpoint(self):
+        """Every batch goes through the same session with the configured timeouts"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_http_options(pool_size=4, connect_timeout=3, read_timeout=30)
+
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "1. 你好"}}]}
+
+        with patch("requests.Session.post", return_value=response) as post:
+            for _ in range(3):
+                translations, success, _ = translator.translate_batch(["Hello"], "en", "zh")
+                self.assertTrue(success)
+                self.assertEqual(translations, ["你好"])
+
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(post.call_args.kwargs["timeout"], (3, 30))
+        self.assertEqual(len(translator._sessions), 1)
+        session = translator._get_session(translator.api_endpoints["openai"])
+        self.assertEqual(session.get_adapter("https://").poolmanager.connection_pool_kw["maxsize"], 4)
+        translator.close()
+        self.assertEqual(translator._sessions, {})
+
+
+class TestCheckpointResume(unittest.TestCase):
+    """Test that an interrupted run can be resumed from its checkpoint journal"""
+
+    def setUp(self):
+        self.msgids = [f"String {i}" for i in range(6)]
+        self.input_path = make_po_file(self.msgids)
+        self.output_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.output_dir, "out.po")
+
+    def tearDown(self):
+        os.unlink(self.input_path)
+        for name in os.listdir(self.output_dir):
+            os.unlink(os.path.join(self.output_dir, name))
+        os.rmdir(self.output_dir)
+
+    def test_resume_skips_journaled_entries(self):
+        """A crash keeps finished batches; resuming only translates the rest"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(2)
+        translator.set_checkpointing(every_batches=1)
+
+        def crash_on_third_batch(texts, source_lang, target_lang):
+            if texts[0] == "String 4":
+                raise KeyboardInterrupt
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=crash_on_third_batch):
+            with self.assertRaises(KeyboardInterrupt):
+                translator.translate_po_file(self.input_path, self.output_path, "en", "zh")
+
+        self.assertFalse(os.path.exists(self.output_path))
+        self.assertTrue(translator.has_checkpoint(self.output_path))
+
+        calls = []
+
+        def fake_translate(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=fake_translate):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh", resume=True
+            )
+
+        self.assertEqual(calls, [["String 4", "String 5"]])
+        self.assertEqual(stats["resumed"], 4)
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+        # The journal is gone and no temporary files are left behind
+        self.assertEqual(os.listdir(self.output_dir), ["out.po"])
+
+    def test_stopped_run_keeps_journal_for_resume(self):
+        """Stopping keeps the journal; resuming sends only what was not translated"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(2)
+        translator.set_concurrency(1)
+        translator.set_checkpointing(every_batches=5)
+
+        def fail_second_batch(texts, source_lang, target_lang):
+            if texts[0] == "String 2":
+                return None, False, "boom"
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=fail_second_batch):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh",
+                error_callback=lambda error_msg, batch_num, total_batches: 'stop'
+            )
+
+        self.assertEqual((stats["stopped"], stats["unsent"]), (True, 4))
+        self.assertTrue(translator.has_checkpoint(self.output_path))
+
+        calls = []
+
+        def fake_translate(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=fake_translate):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh", resume=True
+            )
+
+        self.assertEqual(calls, [["String 2", "String 3"], ["String 4", "String 5"]])
+        self.assertEqual((stats["resumed"], stats["stopped"]), (2, False))
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+        self.assertFalse(translator.has_checkpoint(self.output_path))
+
+
+class TestTokenAwareBatching(unittest.TestCase):
+    """Test token-budget batch packing and adaptation to truncated responses"""
+
+    def test_numbered_response_maps_by_number(self):
+        """A missing line only affects its own text; wrapped lines stay together"""
+        texts = ["One", "Two\nlines", "Three", "Four"]
+        content = "1. 一\n2. 两\n行\n4. 四\nNote: extra commentary"
+        self.assertEqual(
+            parse_numbered_translations(content, texts),
+            ["一", "两\n行", None, "四"],
+        )
+        # A truncated response drops its possibly cut-off last item
+        self.assertEqual(
+            parse_numbered_translations("1. 一\n2. 两", texts, truncated=True),
+            ["一", None, None, None],
+        )
+
+    def test_planner_packs_by_output_budget(self):
+        """Long texts get smaller batches than short ones under the same budget"""
+        planner = BatchPlanner([400, 400, 400, 5, 5, 5, 5], max_items=100, max_output_tokens=2000)
+        self.assertEqual(planner.estimate_batches(), 3)
+        self.assertEqual(planner.next_batch(), [0])
+        self.assertEqual(planner.next_batch(), [1])
+        self.assertEqual(planner.next_batch(), [2, 3, 4, 5, 6])
+        self.assertFalse(planner.has_next())
+
+    def test_shrink_halves_budget(self):
+        """A truncated response halves the budget for the batches that follow"""
+        planner = BatchPlanner([16] * 40, max_items=100, max_output_tokens=1000)
+        self.assertEqual(len(planner.next_batch()), 20)
+        planner.shrink()
+        self.assertEqual(len(planner.next_batch()), 10)
+
+    def test_completion_fits_context_window(self):
+        """max_tokens leaves room for the prompt in models with a small context window"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4")
+        self.assertEqual(translator.get_max_output_tokens(), 4096)
+        # 80% of the 8192-token window is planned for, as in BatchPlanner
+        self.assertEqual(translator.get_max_output_tokens(6000), 553)
+
+        _, _, payload, _ = translator._build_request(["Hello"] * 2000, "en", "zh")
+        prompt_tokens = sum(translator.token_estimator(message["content"]) for message in payload["messages"])
+        self.assertLess(payload["max_tokens"], 4096)
+        self.assertLessEqual(payload["max_tokens"] + prompt_tokens, 8192 * 0.8)
+
+        # Too little room left: the batch fails as a client error without being sent
+        with self.assertRaises(ContextWindowError):
+            translator.get_max_output_tokens(6400)
+        with patch("requests.Session.post") as post:
+            translations, success, error = translator.translate_batch(["Hello"] * 3000, "en", "zh")
+        post.assert_not_called()
+        self.assertFalse(success)
+        self.assertEqual(error.kind, "client")
+        self.assertIn("context window", error)
+
+        # The planner keeps batches whose prompt and response fit the window together
+        planner = BatchPlanner([100] * 40, max_items=100, context_tokens=1000)
+        self.assertEqual(len(planner.next_batch()), 2)
+
+
+class TestPartialRetry(unittest.TestCase):
+    """Test that only failed or missing items are sent again"""
+
+    def setUp(self):
+        self.input_path = make_po_file([f"String {i}" for i in range(12)])
+        fd, self.output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+    def tearDown(self):
+        for path in (self.input_path, self.output_path, journal_path(self.output_path)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def test_missing_item_is_merged_into_next_batch(self):
+        """Items that came back are kept; the missing one rides along with the next batch"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(8)
+        calls = []
+
+        def short_first_response(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            translations = [f"ZH {text}" for text in texts]
+            if len(calls) == 1:
+                translations[-1] = None
+            return translations, True, None
+
+        with patch.object(translator, "translate_batch", side_effect=short_first_response):
+            stats = translator.translate_po_file(self.input_path, self.output_path, "en", "zh")
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1], ["String 7", "String 8", "String 9", "String 10", "String 11"])
+        self.assertEqual(stats["requeued"], 1)
+        self.assertEqual(stats["attempts"], {1: 11, 2: 1})
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+
+    def test_failed_call_retry_requeues_until_max_attempts(self):
+        """'retry' re-queues the batch; texts that keep failing are deferred, then left untranslated"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(12)
+        translator.set_max_attempts(2)
+        calls = []
+
+        def failing_translate(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            return texts, False, "boom"
+
+        with patch.object(translator, "translate_batch", side_effect=failing_translate):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh",
+                error_callback=lambda error_msg, batch_num, total_batches: 'retry'
+            )
+
+        # Two attempts, then one more in the deferred round at the end
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(stats["attempts"], {3: 12})
+        self.assertEqual((stats["deferred"], stats["failed"]), (12, 12))
+        self.assertTrue(all(e.msgstr == "" for e in polib.pofile(self.output_path)))
+
+    def test_skipped_batch_is_retried_at_end_of_run(self):
+        """A skipped batch is deferred past the other batches and translated in the final round"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(6)
+        calls = []
+
+        def first_call_fails(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            if len(calls) == 1:
+                return None, False, "boom"
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=first_call_fails):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh",
+                error_callback=lambda error_msg, batch_num, total_batches: 'skip'
+            )
+
+        self.assertEqual([call[0] for call in calls], ["String 0", "String 6", "String 0"])
+        self.assertEqual((stats["deferred"], stats["failed"]), (6, 0))
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+
+    def test_unexpected_error_defers_instead_of_stopping(self):
+        """An exception in a batch goes through the error handling like a failed call"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(6)
+        progress = []
+        calls = []
+
+        def first_call_raises(texts, source_lang, target_lang):
+            calls.append(list(texts))
+            if len(calls) == 1:
+                raise ValueError("bad response")
+            return [f"ZH {text}" for text in texts], True, None
+
+        with patch.object(translator, "translate_batch", side_effect=first_call_raises):
+            stats = translator.translate_po_file(
+                self.input_path, self.output_path, "en", "zh",
+                progress_callback=lambda done, total, message: progress.append(message)
+            )
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual((stats["errors"], stats["deferred"], stats["failed"], stats["stopped"]), (6, 6, 0, False))
+        self.assertTrue(any("Error in batch 1: Unexpected error: bad response" in message for message in progress))
+        self.assertTrue(all(e.msgstr == f"ZH {e.msgid}" for e in polib.pofile(self.output_path)))
+
+
+class TestJSONProtocol(unittest.TestCase):
+    """Test the id-keyed JSON protocol and re-requesting only missing ids"""
+
+    def test_parse_maps_by_id_and_salvages_truncated_json(self):
+        """Ids are matched regardless of order; a cut-off object still yields its complete pairs"""
+        texts = ["One", "Two\nlines", "Three"]
+        self.assertEqual(
+            parse_json_translations('```json\n{"3": "三", "2": "两\\n行"}\n```', texts),
+            [None, "两\n行", "三"],
+        )
+        self.assertEqual(
+            parse_json_translations('{"1": "一", "2": "两\\n行", "3": "三', texts),
+            ["一", "两\n行", None],
+        )
+
+    def test_only_missing_ids_are_requested_again(self):
+        """A follow-up call carries only the texts missing from the first response"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_protocol("json")
+
+        first = MagicMock()
+        first.json.return_value = {"choices": [{"message": {"content": '{"1": "一", "3": "三"}'}}]}
+        second = MagicMock()
+        second.json.return_value = {"choices": [{"message": {"content": '{"1": "二"}'}}]}
+
+        with patch("requests.Session.post", side_effect=[first, second]) as post:
+            translations, success, _ = translator.translate_batch(["One", "Two", "Three"], "en", "zh")
+
+        self.assertTrue(success)
+        self.assertEqual(translations, ["一", "二", "三"])
+        payload = post.call_args_list[1].kwargs["json"]
+        self.assertEqual(payload["response_format"], {"type": "json_object"})
+        self.assertIn('"1": "Two"', payload["messages"][1]["content"])
+        self.assertNotIn("One", payload["messages"][1]["content"])
+
+
+class TestRateLimitHandling(unittest.TestCase):
+    """Test that 429 responses are waited out instead of surfacing as errors"""
+
+    def test_retry_after_is_honored(self):
+        """A 429 with Retry-After is retried automatically and counted"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "0"})
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"choices": [{"message": {"content": "1. 你好"}}]}
+
+        metrics = RunMetrics()
+
+        with patch("requests.Session.post", side_effect=[throttled, throttled, ok]) as post, metrics.activate():
+            translations, success, error = translator.translate_batch(["Hello"], "en", "zh")
+
+        self.assertTrue(success, error)
+        self.assertEqual(translations, ["你好"])
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(metrics.counters["throttled"], 2)
+
+    def test_throttles_are_counted_per_run(self):
+        """Each language of a multi-language run reports only its own 429s"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        input_path = make_po_file(["Hello"])
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        self.addCleanup(os.unlink, input_path)
+        throttled = []
+
+        def post(url, json=None, **kwargs):
+            if " to ja." in json["messages"][-1]["content"] and not throttled:
+                throttled.append(True)
+                return MagicMock(status_code=429, headers={"Retry-After": "0"})
+            response = MagicMock(status_code=200, content=b"")
+            response.json.return_value = {"choices": [{"message": {"content": "1. X"}}]}
+            return response
+
+        with patch("requests.Session.post", side_effect=post):
+            results = translator.translate_po_file_multi(
+                input_path, {lang: os.path.join(work_dir, f"{lang}.po") for lang in ("zh", "ja")}, "en"
+            )
+
+        self.assertEqual((results["zh"]["throttled"], results["ja"]["throttled"]), (0, 1))
+        self.assertEqual(results["ja"]["metrics"].to_dict()["throttled"], 1)
+
+
+def sse_response(deltas, error=None):
+    """Fake a streamed chat completion sending `deltas`, optionally breaking off with `error`"""
+    def iter_lines():
+        for delta in deltas:
+            chunk = {"choices": [{"delta": {"content": delta}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}".encode("utf-8")
+            yield b""
+        if error is not None:
+            raise error
+        yield b"data: [DONE]"
+
+    response = MagicMock(status_code=200)
+    response.iter_lines.side_effect = iter_lines
+    return response
+
+
+class TestStreaming(unittest.TestCase):
+    """Test applying translations while the response streams in"""
+
+    def test_parser_waits_for_the_next_item(self):
+        """A numbered translation is complete once the next one starts; JSON pairs once closed"""
+        parser = StreamParser("numbered", ["One", "Two\nlines", "Three"])
+        self.assertEqual(parser.feed("1. 一\n2. 两"), [])
+        self.assertEqual(parser.feed("\n行\n3"), [(0, "一")])
+        self.assertEqual(parser.feed(". 三\n"), [(1, "两\n行")])
+        self.assertEqual(parser.finish(), ["一", "两\n行", "三"])
+
+        parser = StreamParser("json", ["One", "Two"])
+        self.assertEqual(parser.feed('{"1": "一'), [])
+        self.assertEqual(parser.feed('", "2": "'), [(0, "一")])
+        self.assertEqual(parser.finish(truncated=True), ["一", None])
+
+    def test_items_survive_a_broken_stream(self):
+        """Translations that arrived before the connection broke are kept; only the rest is requested again"""
+        input_path = make_po_file(["One", "Two", "Three"])
+        fd, output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+        self.addCleanup(os.unlink, input_path)
+        self.addCleanup(os.unlink, output_path)
+
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_streaming()
+        broken = sse_response(["1. 一\n2.", " 二\n3. 三"], requests.exceptions.ChunkedEncodingError("reset"))
+        refill = sse_response(["1. 三\n"])
+        progress = []
+
+        with patch("requests.Session.post", side_effect=[broken, refill]) as post:
+            stats = translator.translate_po_file(
+                input_path, output_path, "en", "zh",
+                progress_callback=lambda current, total, message: progress.append(current)
+            )
+
+        self.assertEqual(post.call_count, 2)
+        self.assertTrue(post.call_args_list[0].kwargs["stream"])
+        self.assertTrue(post.call_args_list[0].kwargs["json"]["stream"])
+        self.assertNotIn("Two", post.call_args_list[1].kwargs["json"]["messages"][1]["content"])
+        self.assertEqual([e.msgstr for e in polib.pofile(output_path)], ["一", "二", "三"])
+        self.assertEqual(stats["attempts"], {1: 3})
+        # The first translation was counted as it arrived, the rest with the end of the batch
+        self.assertEqual(sorted(set(progress)), [0, 1, 3])
+
+
+    def test_failed_stream_is_closed(self):
+        """A streamed request answered with an error status releases its connection"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_streaming()
+        failed = MagicMock(status_code=500)
+        failed.raise_for_status.side_effect = requests.exceptions.HTTPError("500 Server Error")
+
+        with patch("requests.Session.post", return_value=failed):
+            _, success, error = translator.translate_batch(["One"], "en", "zh", on_item=lambda i, text: None)
+
+        self.assertFalse(success)
+        self.assertEqual(error.kind, "server")
+        failed.close.assert_called_once()
+
+class TestTranslationMemoryIntegration(unittest.TestCase):
+    """Test that translate_po_file consults and fills the translation memory"""
+
+    def test_cache_hits_never_reach_translate_batch(self):
+        """Strings translated in an earlier run are served from memory"""
+        input_path = make_po_file(["Save", "Cancel", "Delete"])
+        fd, output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+        memory = TranslationMemory(":memory:")
+        memory.store("Save", None, "保存", "en", "zh", "gpt-4o")
+
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_translation_memory(memory)
+
+        try:
+            with patch.object(
+                translator,
+                "translate_batch",
+                return_value=(["取消", "删除"], True, None),
+            ) as translate_batch:
+                stats = translator.translate_po_file(input_path, output_path, "en", "zh")
+
+            translate_batch.assert_called_once_with(["Cancel", "Delete"], "en", "zh")
+            self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (1, 2))
+            self.assertEqual(
+                {e.msgid: e.msgstr for e in polib.pofile(output_path)},
+                {"Save": "保存", "Cancel": "取消", "Delete": "删除"},
+            )
+            self.assertEqual(memory.lookup("Delete", None, "en", "zh", "gpt-4o"), "删除")
+        finally:
+            os.unlink(input_path)
+            os.unlink(output_path)
+
+    def test_near_matches_are_hinted_or_filled(self):
+        """Close matches are filled in as fuzzy; looser ones are shown to the model"""
+        input_path = make_po_file(["Delete the selected file.", "Delete the selected items now", "Print"])
+        fd, output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+        memory = TranslationMemory(":memory:")
+        memory.store("Delete the selected file", None, "删除所选文件", "en", "zh", "gpt-4o")
+        memory.store("Delete the selected items", None, "删除所选项目", "en", "zh", "gpt-4o")
+
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_translation_memory(memory)
+        translator.set_fuzzy_matching(hint_threshold=0.6, fill_threshold=0.87)
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"choices": [{"message": {"content": "1. 立即删除所选项目\n2. 打印"}}]}
+        try:
+            with patch("requests.Session.post", return_value=response) as post:
+                stats = translator.translate_po_file(input_path, output_path, "en", "zh")
+
+            prompt = post.call_args.kwargs["json"]["messages"][1]["content"]
+            self.assertIn('"Delete the selected items" => "删除所选项目"', prompt)
+            self.assertNotIn("Delete the selected file", prompt)
+            self.assertEqual((stats["fuzzy_filled"], stats["fuzzy_hints"]), (1, 1))
+
+            output_po = polib.pofile(output_path)
+            self.assertEqual(output_po[0].msgstr, "删除所选文件")
+            self.assertIn("fuzzy", output_po[0].flags)
+            self.assertEqual(output_po[1].msgstr, "立即删除所选项目")
+        finally:
+            os.unlink(input_path)
+            os.unlink(output_path)
+
+
+class TestMultiLanguage(unittest.TestCase):
+    """Test translating one parsed catalog into several languages"""
+
+    def setUp(self):
+        self.input_path = make_po_file([f"String {i}" for i in range(6)])
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        os.unlink(self.input_path)
+        shutil.rmtree(self.output_dir)
+
+    def test_parses_once_and_interleaves_languages(self):
+        """The input is loaded once and batches of every language share the executor"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_batch_size(3)
+        translator.set_concurrency(1)
+        order = []
+
+        def fake_translate(texts, source_lang, target_lang):
+            order.append(target_lang)
+            return [f"{target_lang.upper()} {text}" for text in texts], True, None
+
+        output_files = {lang: os.path.join(self.output_dir, f"{lang}.po") for lang in ("zh", "ja", "fr")}
+        with patch("po_translator.load_po_file", wraps=load_po_file) as load, \
+                patch.object(translator, "translate_batch", side_effect=fake_translate):
+            results = translator.translate_po_file_multi(self.input_path, output_files, "en")
+
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(order, ["zh", "ja", "fr"] * 2)
+        for lang, output_file in output_files.items():
+            output_po = polib.pofile(output_file)
+            self.assertEqual(output_po.metadata["Language"], lang)
+            for entry in output_po:
+                self.assertEqual(entry.msgstr, f"{lang.upper()} {entry.msgid}")
+            self.assertEqual(results[lang]["untranslated"], 6)
+
+
+class TestIncrementalUpdate(unittest.TestCase):
+    """Test merging a new template into a translated catalog"""
+
+    def setUp(self):
+        self.pot_path = make_po_file(["Open", "Save", "Export"])
+        previous = polib.POFile()
+        previous.metadata = {"Content-Type": "text/plain; charset=UTF-8", "Language": "zh"}
+        previous.append(polib.POEntry(msgid="Open", msgstr="打开", tcomment="Menu item"))
+        previous.append(polib.POEntry(msgid="Save", msgstr="保存", flags=["fuzzy"]))
+        previous.append(polib.POEntry(msgid="Close", msgstr="关闭"))
+        fd, self.po_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+        previous.save(self.po_path)
+
+    def tearDown(self):
+        os.unlink(self.pot_path)
+        os.unlink(self.po_path)
+
+    def test_merge_carries_translations_and_counts_changes(self):
+        """Matched entries keep translation, flags and comments; the template is untouched"""
+        template = load_po_file(self.pot_path)
+        merged, changes = merge_catalog(template, load_po_file(self.po_path))
+
+        self.assertEqual(changes, {"added": 1, "changed": 0, "removed": 1, "carried": 2})
+        self.assertEqual([e.msgstr for e in merged], ["打开", "保存", ""])
+        self.assertEqual(merged[0].tcomment, "Menu item")
+        self.assertIn("fuzzy", merged[1].flags)
+        self.assertEqual(merged.metadata["Language"], "zh")
+        self.assertTrue(all(not e.msgstr and not e.flags for e in template))
+
+    def test_only_new_strings_are_translated(self):
+        """update_po_file sends only the delta and writes the merged catalog in place"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+
+        with patch.object(translator, "translate_batch", return_value=(["导出"], True, None)) as translate_batch:
+            stats = translator.update_po_file(self.pot_path, self.po_path, self.po_path, "en", "zh")
+
+        translate_batch.assert_called_once_with(["Export"], "en", "zh")
+        self.assertEqual((stats["untranslated"], stats["added"], stats["removed"]), (1, 1, 1))
+        self.assertEqual(
+            {e.msgid: e.msgstr for e in polib.pofile(self.po_path)},
+            {"Open": "打开", "Save": "保存", "Export": "导出"},
+        )
+
+
+class TestPluralForms(unittest.TestCase):
+    """Test that plural entries are batched with the others and fill every form"""
+
+    def setUp(self):
+        po = polib.POFile()
+        po.metadata = {"Content-Type": "text/plain; charset=UTF-8", "Plural-Forms": "nplurals=INTEGER; plural=EXPRESSION;"}
+        po.append(polib.POEntry(msgid="File", msgstr=""))
+        po.append(polib.POEntry(msgid="%d file", msgid_plural="%d files", msgstr_plural={0: "", 1: ""}))
+        fd, self.input_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+        po.save(self.input_path)
+        fd, self.output_path = tempfile.mkstemp(suffix=".po")
+        os.close(fd)
+
+    def tearDown(self):
+        for path in (self.input_path, self.output_path, journal_path(self.output_path)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def test_plural_entry_fills_all_forms_from_one_batch(self):
+        """Singular and plural msgids go out together and the response fills msgstr_plural"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"choices": [{"message": {
+            "content": '1. Файл\n2. ["%d файл", "%d файла", "%d файлов"]'
+        }}]}
+
+        with patch("requests.Session.post", return_value=response) as post:
+            stats = translator.translate_po_file(self.input_path, self.output_path, "en", "ru")
+
+        self.assertEqual(post.call_count, 1)
+        prompt = post.call_args.kwargs["json"]["messages"][1]["content"]
+        self.assertIn('2. ["%d file", "%d files"]', prompt)
+        self.assertIn("exactly 3 strings", prompt)
+        self.assertEqual(stats["plural"], 1)
+
+        output_po = polib.pofile(self.output_path)
+        self.assertEqual(output_po[0].msgstr, "Файл")
+        self.assertEqual(output_po[1].msgstr_plural, {0: "%d файл", 1: "%d файла", 2: "%d файлов"})
+        self.assertEqual(output_po.metadata["Plural-Forms"], plural_forms_for("ru"))
+
+    def test_wrong_number_of_forms_is_requeued(self):
+        """A plural translation with the wrong number of forms is asked for again"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        responses = iter([
+            (["Файл", '["%d файл", "%d файлов"]'], True, None),
+            (['["%d файл", "%d файла", "%d файлов"]'], True, None),
+        ])
+
+        with patch.object(translator, "translate_batch", side_effect=lambda *args: next(responses)):
+            stats = translator.translate_po_file(self.input_path, self.output_path, "en", "ru")
+
+        self.assertEqual(stats["requeued"], 1)
+        self.assertEqual(polib.pofile(self.output_path)[1].msgstr_plural[2], "%d файлов")
+
+    def test_memory_hit_with_wrong_number_of_forms_is_a_miss(self):
+        """A remembered plural translation is only used if it has the target language's forms"""
+        memory = TranslationMemory(":memory:")
+        memory.store('["%d file", "%d files"]', None, '["%d файл", "%d файлов"]', "en", "ru", "gpt-4o")
+        memory.store("File", None, "Файл", "en", "ru", "gpt-4o")
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_translation_memory(memory)
+
+        with patch.object(
+            translator, "translate_batch", return_value=(['["%d файл", "%d файла", "%d файлов"]'], True, None)
+        ) as translate_batch:
+            stats = translator.translate_po_file(self.input_path, self.output_path, "en", "ru")
+
+        translate_batch.assert_called_once_with(['["%d file", "%d files"]'], "en", "ru")
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (1, 1))
+        self.assertEqual(polib.pofile(self.output_path)[1].msgstr_plural[2], "%d файлов")
+
+    def test_invalid_forms_leave_entry_untranslated(self):
+        """Only a full set of plural forms is written; the source text never is"""
+        entry = polib.POEntry(msgid="%d file", msgid_plural="%d files", msgstr_plural={0: "", 1: "", 2: ""})
+        set_entry_translation(entry, "%d file", 3)
+        set_entry_translation(entry, '["%d файл", "%d файлов"]', 3)
+        self.assertEqual(entry.msgstr_plural, {0: "", 1: "", 2: ""})
+
+    def test_json_protocol_sends_forms_as_array(self):
+        """The JSON protocol sends plural forms as an array and accepts an array back"""
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_protocol("json")
+
+        with patch("requests.Session.post") as post:
+            post.return_value.status_code = 200
+            post.return_value.json.return_value = {"choices": [{"message": {
+                "content": '{"1": "文件", "2": ["%d 个文件"]}'
+            }}]}
+            translator.translate_po_file(self.input_path, self.output_path, "en", "zh")
+
+        self.assertIn('"2": [\n"%d file",\n"%d files"\n]', post.call_args.kwargs["json"]["messages"][1]["content"])
+        output_po = polib.pofile(self.output_path)
+        self.assertEqual(output_po[1].msgstr_plural, {0: "%d 个文件"})
+        self.assertEqual(output_po.metadata["Plural-Forms"], "nplurals=1; plural=0;")
+
+
+class TestLowMemory(unittest.TestCase):
+    """Test the compact work list and releasing the catalog during requests"""
+
+    def setUp(self):
+        po = polib.POFile()
+        po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+        po.append(polib.POEntry(msgid="Save", msgstr=""))
+        po.append(polib.POEntry(msgid="Open", msgstr=""))
+        po.append(polib.POEntry(msgid="Open", msgctxt="menu", msgstr=""))
+        po.append(polib.POEntry(msgid="Quit", msgstr="退出"))
+        po.append(polib.POEntry(msgid="%d file", msgid_plural="%d files", msgstr_plural={0: "", 1: ""}))
+        po.append(polib.POEntry(msgid="Open", msgstr=""))
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.input_path = os.path.join(self.work_dir, "in.po")
+        po.save(self.input_path)
+
+    def translate(self, output_name, low_memory, on_batch=None):
+        memory = TranslationMemory(":memory:")
+        memory.store("Save", None, "保存", "en", "zh", "gpt-4o")
+        translator = POTranslator(api_provider="openai", api_key="fake")
+        translator.set_model("gpt-4o")
+        translator.set_translation_memory(memory)
+        translator.set_low_memory(low_memory)
+
+        def fake_translate(texts, source_lang, target_lang):
+            if on_batch:
+                on_batch()
+            return [json.dumps(["%d 个文件"]) if text.startswith('["') else f"ZH {text}" for text in texts], True, None
+
+        output_path = os.path.join(self.work_dir, output_name)
+        with patch.object(translator, "translate_batch", side_effect=fake_translate):
+            translator.translate_po_file(self.input_path, output_path, "en", "zh")
+        return polib.pofile(output_path), memory
+
+    def test_entry_groups_pack_indices(self):
+        """Each item's entries are a slice of one flat array"""
+        groups = EntryGroups([[0, 5], [], [3]])
+        self.assertEqual(len(groups), 3)
+        self.assertEqual([list(groups[item]) for item in range(3)], [[0, 5], [], [3]])
+
+    def test_released_run_saves_the_same_output(self):
+        """With low_memory the catalog is dropped while batches run and reloaded to save"""
+        release = patch.object(TranslationRun, "release", autospec=True, side_effect=TranslationRun.release)
+        with release as released:
+            compact, memory = self.translate(
+                "compact.po", True, on_batch=lambda: self.assertIsNone(released.call_args.args[0].po)
+            )
+        full, _ = self.translate("full.po", False)
+
+        self.assertEqual(released.call_count, 1)
+        self.assertEqual(
+            [(e.msgstr, e.msgstr_plural, e.flags) for e in compact],
+            [(e.msgstr, e.msgstr_plural, e.flags) for e in full],
+        )
+        self.assertEqual([e.msgstr for e in compact][:4], ["保存", "ZH Open", "ZH Open", "退出"])
+        self.assertEqual(compact[4].msgstr_plural, {0: "%d 个文件"})
+        # Contexts are kept for the translation memory after the catalog is gone
+        self.assertEqual(memory.lookup("Open", "menu", "en", "zh", "gpt-4o"), "ZH Open")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,130 @@
+"""Tests for the provider request/response adapters"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add src to path so we can import providers
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import providers
+from po_translator import POTranslator
+from providers import OpenAICompatibleAdapter, ZhipuAdapter, get_adapter, register_adapter
+
+
+def decode_segment(segment):
+    return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+
+
+class TestZhipuAdapter(unittest.TestCase):
+    """Test the Zhipu JWT signing and native request format"""
+
+    def test_token_is_signed_with_the_key_secret(self):
+        """The id.secret key becomes an HS256 token that verifies with the secret"""
+        token = ZhipuAdapter().auth_token("my-id.my-secret")
+        header, claims, signature = token.split(".")
+
+        self.assertEqual(decode_segment(header), {"alg": "HS256", "sign_type": "SIGN"})
+        self.assertEqual(decode_segment(claims)["api_key"], "my-id")
+        expected = hmac.new(b"my-secret", f"{header}.{claims}".encode(), hashlib.sha256).digest()
+        self.assertEqual(base64.urlsafe_b64encode(expected).rstrip(b"=").decode(), signature)
+
+    def test_whole_batch_goes_in_one_native_request(self):
+        """zhipu batches are sent once, to the model's invoke URL, and parsed from data.choices"""
+        translator = POTranslator(api_provider="zhipu", api_key="my-id.my-secret")
+        translator.set_model("chatglm_std")
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = {
+            "code": 200, "success": True,
+            "data": {"choices": [{"role": "assistant", "content": '"1. 你好\\n2. 世界"'}]}
+        }
+        with patch("requests.Session.post", return_value=response) as post:
+            translations, success, error = translator.translate_batch(["Hello", "World"], "en", "zh")
+
+        self.assertTrue(success, error)
+        self.assertEqual(translations, ["你好", "世界"])
+        self.assertEqual(post.call_count, 1)
+        self.assertTrue(post.call_args.args[0].endswith("/model-api/chatglm_std/invoke"))
+        self.assertIn("prompt", post.call_args.kwargs["json"])
+        self.assertEqual(post.call_args.kwargs["headers"]["Authorization"].count("."), 2)
+
+    def test_error_body_is_reported(self):
+        """A failure reported in the body surfaces as an API error"""
+        translator = POTranslator(api_provider="zhipu", api_key="my-id.my-secret")
+        translator.set_model("chatglm_pro")
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"code": 1261, "msg": "Prompt too long", "success": False}
+        with patch("requests.Session.post", return_value=response):
+            _, success, error = translator.translate_batch(["Hello"], "en", "zh")
+
+        self.assertFalse(success)
+        self.assertIn("Prompt too long", error)
+
+
+class TestDashScopeAdapter(unittest.TestCase):
+    """Test the DashScope input/parameters format used for Qwen"""
+
+    def test_whole_batch_goes_in_one_native_request(self):
+        """qwen batches use input.messages and are parsed from output.choices"""
+        translator = POTranslator(api_provider="qwen", api_key="fake")
+        translator.set_model("qwen-plus")
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"output": {"choices": [
+            {"finish_reason": "stop", "message": {"role": "assistant", "content": "1. 你好\n2. 世界"}}
+        ]}}
+        with patch("requests.Session.post", return_value=response) as post:
+            translations, success, error = translator.translate_batch(["Hello", "World"], "en", "zh")
+
+        self.assertTrue(success, error)
+        self.assertEqual(translations, ["你好", "世界"])
+        self.assertEqual(post.call_count, 1)
+        payload = post.call_args.kwargs["json"]
+        self.assertEqual(payload["model"], "qwen-plus")
+        self.assertEqual(payload["input"]["messages"][1]["role"], "user")
+        self.assertEqual(payload["parameters"]["result_format"], "message")
+
+
+    def test_stream_request_and_events(self):
+        """Streaming enables SSE with incremental output; each event carries only new text"""
+        adapter = providers.DashScopeAdapter()
+        _, headers, payload = adapter.build_request(
+            "https://dashscope.example.com", "fake", "qwen-plus", "prompt", 100, stream=True
+        )
+
+        self.assertEqual(headers["X-DashScope-SSE"], "enable")
+        self.assertTrue(payload["parameters"]["incremental_output"])
+        chunk = {"output": {"choices": [{"finish_reason": "null", "message": {"content": "1. 你"}}]}}
+        self.assertEqual(adapter.parse_stream_chunk(chunk), ("1. 你", False))
+
+
+class TestAdapterRegistry(unittest.TestCase):
+    """Test registering adapters for additional providers"""
+
+    def test_registered_adapter_is_used(self):
+        """A provider added to api_endpoints uses the adapter registered under its name"""
+        adapter = OpenAICompatibleAdapter()
+        adapter.parse_response = MagicMock(return_value=("1. 你好", False))
+        register_adapter("example", adapter)
+        self.addCleanup(providers.PROVIDER_ADAPTERS.pop, "example")
+
+        translator = POTranslator(api_provider="example", api_key="fake")
+        translator.api_endpoints["example"] = "https://llm.example.com/v1/chat"
+        with patch("requests.Session.post", return_value=MagicMock(status_code=200)) as post:
+            translations, success, _ = translator.translate_batch(["Hello"], "en", "zh")
+
+        self.assertEqual(translations, ["你好"])
+        self.assertEqual(post.call_args.args[0], "https://llm.example.com/v1/chat")
+        self.assertIs(get_adapter("example"), adapter)
+        self.assertIsInstance(get_adapter("unknown"), OpenAICompatibleAdapter)
+
+
+if __name__ == "__main__":
+    unittest.main()
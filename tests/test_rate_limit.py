@@ -0,0 +1,74 @@
+"""Tests for rate limiting and backoff helpers"""
+
+import os
+import sys
+import unittest
+from email.utils import formatdate
+import time
+
+# Add src to path so we can import rate_limit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rate_limit import RateLimiter, backoff_delay, parse_retry_after
+
+
+class FakeClock:
+    """Clock that only advances when the limiter sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test the token-bucket limiter and Retry-After handling"""
+
+    def test_requests_per_minute_spaces_out_calls(self):
+        """Once the burst is used up, requests are spaced at the refill rate"""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+        for _ in range(60):
+            limiter.acquire()
+        self.assertEqual(clock.now, 0.0)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.assertAlmostEqual(clock.now, 2.0)
+
+    def test_tokens_per_minute_and_pause(self):
+        """Token budget and a 429 pause both hold back the next request"""
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+        limiter.acquire(tokens=600)
+        limiter.acquire(tokens=100)
+        self.assertAlmostEqual(clock.now, 10.0)
+
+        limiter.pause(30)
+        limiter.acquire(tokens=0)
+        self.assertAlmostEqual(clock.now, 40.0)
+
+    def test_cancelled_wait_returns_false(self):
+        """A stopped translation does not keep waiting for the limiter"""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=1, clock=clock, sleep=clock.sleep)
+        limiter.acquire()
+        self.assertFalse(limiter.acquire(cancelled=lambda: clock.now > 1))
+
+    def test_retry_after_and_backoff(self):
+        """Retry-After accepts seconds and HTTP dates; backoff is jittered and capped"""
+        self.assertEqual(parse_retry_after("12"), 12.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        in_a_minute = parse_retry_after(formatdate(time.time() + 60, usegmt=True))
+        self.assertTrue(55 <= in_a_minute <= 60)
+        for attempt in range(10):
+            self.assertTrue(0 <= backoff_delay(attempt, base=1, cap=8) <= 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Tests for the persistent translation memory"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add src to path so we can import translation_memory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from translation_memory import NGramIndex, TranslationMemory
+
+
+class TestTranslationMemory(unittest.TestCase):
+    """Test lookups, persistence, eviction and invalidation"""
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_translations_persist_across_instances(self):
+        """A translation stored in one run is found by the next one"""
+        memory = TranslationMemory(self.db_path)
+        memory.store("Save", None, "保存", "en", "zh", "gpt-4o")
+        memory.close()
+
+        memory = TranslationMemory(self.db_path)
+        self.assertEqual(memory.lookup("Save", None, "en", "zh", "gpt-4o"), "保存")
+        self.assertIsNone(memory.lookup("Save", "verb", "en", "zh", "gpt-4o"))
+        self.assertIsNone(memory.lookup("Save", None, "en", "ja", "gpt-4o"))
+        self.assertIsNone(memory.lookup("Save", None, "en", "zh", "gpt-4o-mini"))
+        self.assertEqual((memory.hits, memory.misses), (1, 3))
+        memory.close()
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """The memory never grows beyond max_entries"""
+        memory = TranslationMemory(":memory:", max_entries=2)
+        memory.store("One", None, "一", "en", "zh", "m")
+        memory.store("Two", None, "二", "en", "zh", "m")
+        memory.lookup("One", None, "en", "zh", "m")
+        memory.store("Three", None, "三", "en", "zh", "m")
+
+        self.assertEqual(len(memory), 2)
+        self.assertIsNone(memory.lookup("Two", None, "en", "zh", "m"))
+        self.assertEqual(memory.lookup("One", None, "en", "zh", "m"), "一")
+
+    def test_invalidate_by_model_and_language_pair(self):
+        """Invalidation only drops translations matching every criterion"""
+        memory = TranslationMemory(":memory:")
+        memory.store("Save", None, "保存", "en", "zh", "old-model")
+        memory.store("Save", None, "保存", "en", "zh", "new-model")
+        memory.store("Save", None, "保存する", "en", "ja", "old-model")
+
+        self.assertEqual(memory.invalidate(model="old-model", target_lang="zh"), 1)
+        self.assertIsNone(memory.lookup("Save", None, "en", "zh", "old-model"))
+        self.assertEqual(memory.lookup("Save", None, "en", "ja", "old-model"), "保存する")
+        self.assertEqual(memory.invalidate(), 2)
+        self.assertEqual(len(memory), 0)
+
+
+class TestFuzzyLookup(unittest.TestCase):
+    """Test near-match lookups through the n-gram index"""
+
+    def test_index_finds_near_matches_only(self):
+        """Similar strings are found, most similar first; unrelated ones are not"""
+        index = NGramIndex()
+        index.add("Delete the selected file", "删除所选文件")
+        index.add("Delete the selected files", "删除所选的文件")
+        index.add("Open a new window", "打开新窗口")
+
+        matches = index.search("Delete the selected file?", threshold=0.7, limit=2)
+        self.assertEqual([msgid for _, msgid, _ in matches], ["Delete the selected file", "Delete the selected files"])
+        self.assertGreater(matches[0][0], matches[1][0])
+        self.assertEqual(index.search("Print preview", threshold=0.7), [])
+
+    def test_memory_index_follows_stores_and_invalidation(self):
+        """The index is built on first lookup, updated by stores and dropped on invalidation"""
+        memory = TranslationMemory(":memory:")
+        memory.store("Save the document", None, "保存文档", "en", "zh", "m")
+
+        self.assertEqual(memory.fuzzy_lookup("Save the document?", "en", "zh", "m")[0][2], "保存文档")
+        self.assertEqual(memory.fuzzy_lookup("Save the document?", "en", "ja", "m"), [])
+
+        memory.store("Close the document", None, "关闭文档", "en", "zh", "m")
+        self.assertEqual(memory.fuzzy_lookup("Close the document!", "en", "zh", "m")[0][1], "Close the document")
+
+        memory.invalidate(target_lang="zh")
+        self.assertEqual(memory.fuzzy_lookup("Save the document?", "en", "zh", "m"), [])
+
+
+    def test_index_is_built_without_blocking_the_memory(self):
+        """Exact lookups and stores go on while an index is built; what they store gets indexed"""
+        memory = TranslationMemory(":memory:")
+        memory.store("Save the document", None, "保存文档", "en", "zh", "m")
+        building = threading.Event()
+        release = threading.Event()
+        add = NGramIndex.add
+
+        def slow_add(index, msgid, msgstr):
+            building.set()
+            release.wait(5)
+            add(index, msgid, msgstr)
+
+        results = []
+        with patch.object(NGramIndex, "add", slow_add):
+            thread = threading.Thread(
+                target=lambda: results.append(memory.fuzzy_lookup("Close the document!", "en", "zh", "m"))
+            )
+            thread.start()
+            self.assertTrue(building.wait(5))
+            # Would deadlock if the build held the lock
+            self.assertEqual(memory.lookup("Save the document", None, "en", "zh", "m"), "保存文档")
+            memory.store("Close the document", None, "关闭文档", "en", "zh", "m")
+            release.set()
+            thread.join(5)
+
+        self.assertEqual(results[0][0][1], "Close the document")
+
+if __name__ == "__main__":
+    unittest.main()